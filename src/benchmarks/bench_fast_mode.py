@@ -0,0 +1,117 @@
+"""
+Benchmark the fused single-call "fast mode" against the full chain on recorded weeks.
+
+Example (real API, first 30 rows of two weeks):
+    python -m src.benchmarks.bench_fast_mode --weeks 2025-05 2025-06 --limit 30
+
+Against the local mock server:
+    LLM_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock python -m src.benchmarks.bench_fast_mode --weeks 2025-05
+
+Reports wall-clock latency, LLM calls, tokens and cost for both modes, and
+the label agreement of the fast records with the full-chain records.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def label_agreement(full: List, fast: List) -> Dict[str, float]:
+    """
+    Row-level agreement between two lists of SimpleMaintenanceRecord.
+    """
+    n = len(full)
+    if n == 0:
+        return {}
+    relevant = scheduled = scheduled_type = 0
+    pieces = jobs = systems = 0.0
+    for a, b in zip(full, fast):
+        relevant += (len(a.jobs) > 0) == (len(b.jobs) > 0)
+        scheduled += a.is_scheduled == b.is_scheduled
+        scheduled_type += (a.scheduled_type or "") == (b.scheduled_type or "")
+        pieces += _jaccard({j.piece for j in a.jobs}, {j.piece for j in b.jobs})
+        jobs += _jaccard({(j.piece, j.job_type) for j in a.jobs}, {(j.piece, j.job_type) for j in b.jobs})
+        systems += _jaccard(
+            {m.hierarchy.system for m in a.component_mapping},
+            {m.hierarchy.system for m in b.component_mapping},
+        )
+    return {
+        "relevance": round(relevant / n, 4),
+        "is_scheduled": round(scheduled / n, 4),
+        "scheduled_type": round(scheduled_type / n, 4),
+        "pieces_jaccard": round(pieces / n, 4),
+        "jobs_jaccard": round(jobs / n, 4),
+        "systems_jaccard": round(systems / n, 4),
+    }
+
+
+def run_mode(observations, fast_mode: bool) -> dict:
+    from src.llm_apply.generate_simple_records import generate_maintenance_records
+    from src.llm_metrics import summarize
+    from src.utils import run_context, get_log_dir, llm_calls
+
+    # a run of its own, so the calls of the other mode are not counted
+    with run_context(get_log_dir()):
+        start = time.perf_counter()
+        records = generate_maintenance_records(observations, fast_mode=fast_mode)
+        elapsed = time.perf_counter() - start
+        calls = llm_calls().snapshot()
+    total = summarize(calls).get("__total__", {})
+    fallback_rows = {c["row"] for c in calls if c["stage"] == "SystemFreeToSummary"}
+    return {
+        "records": records,
+        "report": {
+            "elapsed_s": round(elapsed, 2),
+            "calls": total.get("calls", 0),
+            "calls_per_row": round(total.get("calls", 0) / max(len(observations), 1), 2),
+            "prompt_tokens": total.get("prompt_tokens", 0),
+            "completion_tokens": total.get("completion_tokens", 0),
+            "cost_usd": total.get("cost_usd", 0.0),
+            "latency_p95_s": total.get("latency_p95_s"),
+            "full_chain_rows": len(fallback_rows),
+        },
+    }
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Fast mode vs full chain benchmark")
+    p.add_argument("--weeks", nargs="+", required=True, help="recorded weeks as YYYY-WW")
+    p.add_argument("--limit", type=int, default=None, help="max rows per week")
+    p.add_argument("--out", default=None, help="optional JSON report path")
+    args = p.parse_args()
+
+    os.environ.setdefault("LOG_DIR", os.path.join("logs", "benchmarks", "fast_mode"))
+    from src.data_handler import read_and_process_data
+
+    report = {}
+    for yw in args.weeks:
+        year, week = yw.split("-")
+        path = os.path.join("data", "to_process", f"maintenance_data_{year}-{week}.xlsx")
+        observations = read_and_process_data(path, year, week)["observation"]
+        if args.limit:
+            observations = observations.iloc[:args.limit]
+
+        full = run_mode(observations, fast_mode=False)
+        fast = run_mode(observations, fast_mode=True)
+        report[yw] = {
+            "rows": len(observations),
+            "full_chain": full["report"],
+            "fast_mode": fast["report"],
+            "agreement": label_agreement(full["records"], fast["records"]),
+        }
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,69 @@
+"""
+Benchmark the datetime assembly and week filter of process_data_structure.
+
+    python -m src.benchmarks.bench_ingest
+    python -m src.benchmarks.bench_ingest --file data/base/maintenance_data.xlsx --weeks 2020-05 2021-30 --repeat 5
+
+The workbook is read once; every repeat processes a copy of it with the
+vectorized path (fast_dates=True) and with the text-parsing path, once
+without a week filter (whole workbook) and once per requested week.
+Reports median seconds per variant and checks both paths return the same
+frame.
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import List, Optional
+
+import pandas as pd
+
+from src.data_handler import read_data, process_data_structure, d_cols
+
+BASE_FILE = "data/base/maintenance_data.xlsx"
+
+
+def _process(raw: pd.DataFrame, year: Optional[str], week: Optional[str], fast_dates: bool) -> pd.DataFrame:
+    return process_data_structure(raw.copy(), d_cols, year, week, fast_dates=fast_dates)
+
+
+def time_variant(raw: pd.DataFrame, year: Optional[str], week: Optional[str], repeat: int) -> dict:
+    timings = {"fast": [], "legacy": []}
+    for _ in range(repeat):
+        for name, fast_dates in (("fast", True), ("legacy", False)):
+            start = time.perf_counter()
+            _process(raw, year, week, fast_dates)
+            timings[name].append(time.perf_counter() - start)
+    fast, legacy = _process(raw, year, week, True), _process(raw, year, week, False)
+    fast_s, legacy_s = statistics.median(timings["fast"]), statistics.median(timings["legacy"])
+    return {
+        "rows": len(fast),
+        "fast_s": round(fast_s, 4),
+        "legacy_s": round(legacy_s, 4),
+        "speedup": round(legacy_s / fast_s, 2),
+        "identical": fast.equals(legacy) and list(fast.dtypes) == list(legacy.dtypes),
+    }
+
+
+def run(path: str, weeks: List[str], repeat: int) -> dict:
+    start = time.perf_counter()
+    raw = read_data(path)
+    results = {"file": path, "input_rows": len(raw), "read_s": round(time.perf_counter() - start, 2)}
+    results["all_weeks"] = time_variant(raw, None, None, repeat)
+    for year_week in weeks:
+        year, week = year_week.split("-")
+        results[year_week] = time_variant(raw, year, week, repeat)
+    return results
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Benchmark process_data_structure date handling")
+    p.add_argument("--file", default=BASE_FILE)
+    p.add_argument("--weeks", nargs="*", default=["2020-05"], help="YYYY-WW (strftime %%U weeks)")
+    p.add_argument("--repeat", type=int, default=5)
+    args = p.parse_args()
+    print(json.dumps(run(args.file, args.weeks, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    _cli()
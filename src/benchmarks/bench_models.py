@@ -0,0 +1,156 @@
+"""
+Micro-benchmark of Pydantic model construction (string normalization + alias maps).
+
+    OPENAI_API_KEY=mock python -m src.benchmarks.bench_models --records 5000
+    OPENAI_API_KEY=mock python -m src.benchmarks.bench_models --from jsondata/final_records/maintenance_records_2025_05.json
+
+Builds FinalMaintenanceRecord objects (jobs included) from plain dicts, once
+with the memoized normalize_name and once with the raw function, and
+reports records/s for both. Without --from, the payloads are synthetic: a
+small vocabulary of accented / miscased labels, as the LLM returns them.
+
+It then times the internal rebuild of those validated records (as
+_final_record and _review_job do) through the validating constructor and
+through schemas.trusted, and checks both give the same records.
+"""
+import argparse
+import json
+import random
+import time
+from typing import List
+
+import src.schemas as schemas
+from src.utils import normalize_name
+
+_SYSTEMS = ["MOTOR", "Motór", "sistema hidráulico", "Sistema Eléctrico", "Transmisión", "Frenos"]
+_COMPONENTS = ["Bomba hidráulica", "ALTERNADOR", "Filtro de aire", "Manguera", "Cable de batería", "Turbo"]
+_JOB_TYPES = ["Inspección", "reemplazo", "Reparación", "Relleno", "Logística"]
+_DETENTIONS = ["Falla funcional", "falla grave", "Programado", "Mantención simple", "Operacional"]
+_CRITICITIES = ["Alta", "media", "BAJA"]
+
+
+def synthetic_records(n: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        jobs = [
+            {
+                "system": rng.choice(_SYSTEMS),
+                "subsystem": rng.choice(_SYSTEMS),
+                "component": rng.choice(_COMPONENTS),
+                "detail": rng.choice([None, "Fuga leve", "Desgaste"]),
+                "job_type": rng.choice(_JOB_TYPES),
+                "job_comment": f"Comentario {i % 50}",
+                "criticity": rng.choice(_CRITICITIES),
+                "critical_change": rng.random() < 0.1,
+                "ot_number": None,
+                "liters": None,
+            }
+            for _ in range(rng.randint(1, 4))
+        ]
+        records.append({
+            "unit_id": f"T_{rng.randint(1, 30):02d}",
+            "start_time": "2025-02-03 08:00:00",
+            "end_time": "2025-02-03 12:00:00",
+            "detention_type": rng.choice(_DETENTIONS),
+            "is_scheduled": rng.random() < 0.5,
+            "scheduled_type": rng.choice([None, "Pm 500 horas", "Preventivo"]),
+            "has_inspection": True,
+            "has_refill": False,
+            "has_repair": False,
+            "has_replacement": True,
+            "has_other": False,
+            "has_critical_change": any(j["critical_change"] for j in jobs),
+            "summary": f"Resumen {i % 200}",
+            "jobs": jobs,
+        })
+    return records
+
+
+def construct_all(payloads: List[dict], repeat: int) -> float:
+    """Seconds to validate every payload `repeat` times."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            schemas.FinalMaintenanceRecord(**payload)
+    return time.perf_counter() - start
+
+
+def run(payloads: List[dict], repeat: int) -> dict:
+    n = len(payloads) * repeat
+    results = {}
+
+    schemas.normalize_name = normalize_name.__wrapped__
+    try:
+        results["uncached"] = construct_all(payloads, repeat)
+    finally:
+        schemas.normalize_name = normalize_name
+
+    normalize_name.cache_clear()
+    results["memoized"] = construct_all(payloads, repeat)
+
+    summary = {
+        name: {"seconds": round(seconds, 3), "records_per_s": round(n / seconds, 1)}
+        for name, seconds in results.items()
+    }
+    summary["speedup"] = round(results["uncached"] / results["memoized"], 2)
+    summary["cache"] = normalize_name.cache_info()._asdict()
+    return summary
+
+
+def _fields(record) -> tuple:
+    """(record fields without jobs, [job fields]) of a validated record."""
+    fields = {name: getattr(record, name) for name in schemas.FinalMaintenanceRecord.model_fields if name != "jobs"}
+    jobs = [{name: getattr(j, name) for name in schemas.Job.model_fields} for j in record.jobs]
+    return fields, jobs
+
+
+def _rebuild(fields: dict, jobs: List[dict], build):
+    return build(schemas.FinalMaintenanceRecord, jobs=[build(schemas.Job, **j) for j in jobs], **fields)
+
+
+def run_rebuild(payloads: List[dict], repeat: int) -> dict:
+    extracted = [_fields(schemas.FinalMaintenanceRecord(**payload)) for payload in payloads]
+    validated = lambda model, **values: model(**values)
+    n = len(extracted) * repeat
+    results = {}
+    for name, build in (("validated", validated), ("trusted", schemas.trusted)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for fields, jobs in extracted:
+                _rebuild(fields, jobs, build)
+        results[name] = time.perf_counter() - start
+
+    same = all(
+        _rebuild(f, j, validated).model_dump() == _rebuild(f, j, schemas.trusted).model_dump()
+        for f, j in extracted
+    )
+    summary = {
+        name: {"seconds": round(seconds, 3), "records_per_s": round(n / seconds, 1)}
+        for name, seconds in results.items()
+    }
+    summary["speedup"] = round(results["validated"] / results["trusted"], 2)
+    summary["identical"] = same
+    return summary
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Benchmark NormalizedModel construction")
+    p.add_argument("--records", type=int, default=5000, help="synthetic records (ignored with --from)")
+    p.add_argument("--from", dest="source", default=None, help="final records JSON file to rebuild")
+    p.add_argument("--repeat", type=int, default=3)
+    args = p.parse_args()
+
+    if args.source:
+        with open(args.source, "r", encoding="utf-8") as f:
+            payloads = json.load(f)
+    else:
+        payloads = synthetic_records(args.records)
+    print(json.dumps({
+        "construction": run(payloads, args.repeat),
+        "rebuild": run_rebuild(payloads, args.repeat),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    _cli()
@@ -1,8 +1,11 @@
 import pandas as pd
-from datetime import timedelta
+import numpy as np
+from datetime import timedelta, time as dt_time
 import os
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Iterator, Tuple
 import json
+import threading
 
 d_cols = {
     'Equipos': 'UnitId',
@@ -66,7 +69,113 @@ def read_data(file_path: str) -> pd.DataFrame:
     return df
 
 
-def process_data_structure(df: pd.DataFrame, column_name_dictionary: dict, years: str, week: str) -> pd.DataFrame:
+_NS_PER_DAY = 86_400 * 10**9
+_NAT = np.iinfo(np.int64).min
+
+
+def _hours_to_ns(col: pd.Series):
+    """
+    Time-of-day cells -> int64 nanoseconds, without going through strings.
+    Handles datetime.time cells, timedeltas and numeric Excel day fractions;
+    returns None for anything else (the caller falls back to parsing text).
+    """
+    if pd.api.types.is_timedelta64_dtype(col):
+        return col.to_numpy(dtype="timedelta64[ns]").view(np.int64)
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        values = col.to_numpy(dtype=float)
+        if np.isnan(values).any():
+            return None
+        return np.round(values * _NS_PER_DAY).astype(np.int64)
+    values = col.to_numpy(dtype=object)
+    if not all(type(v) is dt_time for v in values):
+        return None
+    seconds = np.fromiter((v.hour * 3600 + v.minute * 60 + v.second for v in values), dtype=np.int64, count=len(values))
+    micros = np.fromiter((v.microsecond for v in values), dtype=np.int64, count=len(values))
+    return seconds * 10**9 + micros * 1000
+
+
+def _year_and_week_u(ns: np.ndarray):
+    """
+    Calendar year and strftime('%U') week (weeks start on Sunday, days before
+    the first Sunday are week 00) of int64 epoch nanoseconds, arithmetically.
+    """
+    days = np.floor_divide(ns, _NS_PER_DAY)
+    # civil date from days since 1970-01-01 (proleptic Gregorian)
+    z = days + 719468
+    era = np.floor_divide(z, 146097)
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    year = yoe + era * 400 + (mp >= 10)
+    # days since epoch of January 1st of that year
+    y = year - 1
+    era = np.floor_divide(y, 400)
+    yoe = y - era * 400
+    jan1 = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + 306 - 719468
+    yday = days - jan1
+    wday = (days + 4) % 7  # 1970-01-01 was a Thursday; Sunday = 0
+    return year, (yday + 7 - wday) // 7
+
+
+def _assemble_times_fast(df: pd.DataFrame, years: str, week: str):
+    """
+    Steps 5-10 on int64 nanoseconds: start/end times and the year-week
+    filter in one pass. Returns None when the cells need the text parser.
+    """
+    if not pd.api.types.is_datetime64_dtype(df['Date']):
+        return None
+    hour_in = _hours_to_ns(df['hour_in'])
+    hour_out = _hours_to_ns(df['hour_out'])
+    if hour_in is None or hour_out is None:
+        return None
+
+    date = df['Date'].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    # NaT in any operand makes the sum NaT, as Date + timedelta does
+    start_nat = (date == _NAT) | (hour_in == _NAT)
+    end_nat = (date == _NAT) | (hour_out == _NAT)
+    hour_out = np.where(hour_out < hour_in, hour_out + _NS_PER_DAY, hour_out)
+    start = np.where(start_nat, _NAT, date + hour_in)
+    end = np.where(end_nat, _NAT, date + hour_out)
+
+    keep = np.ones(len(df), dtype=bool)
+    if years is not None and week is not None:
+        year_of, week_of = _year_and_week_u(start)
+        keep = ~start_nat & (year_of == int(years)) & (week_of == int(week))
+    df = df.loc[keep].copy()
+    # same resolution as the Date column, like the Date + timedelta sum
+    df['start_time'] = start[keep].view("datetime64[ns]").astype(df['Date'].dtype)
+    df['end_time'] = end[keep].view("datetime64[ns]").astype(df['Date'].dtype)
+    return df
+
+
+def _assemble_times_legacy(df: pd.DataFrame, years: str, week: str) -> pd.DataFrame:
+    """Steps 5-10 through text parsing (any cell format pandas can parse)."""
+    # proper datetime format
+    df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y') # Step 5: Convert 'Date' to datetime format
+    df['hour_in'] = pd.to_timedelta(df['hour_in'].astype(str)) # Step 6: Convert 'hour_in' to timedelta format
+    df['hour_out'] = pd.to_timedelta(df['hour_out'].astype(str)) # Step 6: Convert 'hour_out' to timedelta format
+
+    # add a day to hour_out if it is less than hour_in
+    df.loc[df['hour_out'] < df['hour_in'], 'hour_out'] += timedelta(days=1) # Step 7: Adjust 'hour_out' if it is less than 'hour_in'
+
+    # Step 8: Combine 'Date' with 'hour_in' and 'hour_out' to create 'start_time' and 'end_time'
+    df['start_time'] = df['Date'] + df['hour_in'] 
+    df['end_time'] = df['Date'] + df['hour_out']
+
+    # Step 9: Convert 'start_time' and 'end_time' to datetime format
+    df['start_time'] = pd.to_datetime(df['start_time'])
+    df['end_time'] = pd.to_datetime(df['end_time'])
+
+    # Step 10: Filter by year and week if provided
+    if years is not None and week is not None:
+        df.loc[:, 'WeekYear'] = df['start_time'].dt.strftime('%Y-%U')
+        df = df[df['WeekYear'] == f"{years}-{week}"]  # Filter by year and week
+        df.drop(columns=['WeekYear'], inplace=True)  # Remove the temporary 'WeekYear' column
+    return df
+
+
+def process_data_structure(df: pd.DataFrame, column_name_dictionary: dict, years: str, week: str, fast_dates: bool = True) -> pd.DataFrame:
     """
     Process the data structure of the DataFrame.
     In order to prepare the DataFrame for further analysis, this function performs the following steps:
@@ -89,6 +198,7 @@ def process_data_structure(df: pd.DataFrame, column_name_dictionary: dict, years
         column_name_dictionary (dict): A dictionary mapping old column names to new column names.
         years (str, optional): Year to filter by.
         week (str, optional): Week number to filter by.
+        fast_dates (bool): Try the vectorized path for steps 5-10 first.
         
     Returns:
         pd.DataFrame: The processed DataFrame with renamed columns.
@@ -99,27 +209,10 @@ def process_data_structure(df: pd.DataFrame, column_name_dictionary: dict, years
     df = df[df.System != 'T_Sin trabajos'] # Step 3: Filter rows by 'System'
     df.sort_values(by=['UnitId', 'Date'], inplace=True) # Step 4: Sort by 'UnitId' and 'Date'
 
-    # proper datetime format
-    df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y') # Step 5: Convert 'Date' to datetime format
-    df['hour_in'] = pd.to_timedelta(df['hour_in'].astype(str)) # Step 6: Convert 'hour_in' to timedelta format
-    df['hour_out'] = pd.to_timedelta(df['hour_out'].astype(str)) # Step 6: Convert 'hour_out' to timedelta format
-
-    # add a day to hour_out if it is less than hour_in
-    df.loc[df['hour_out'] < df['hour_in'], 'hour_out'] += timedelta(days=1) # Step 7: Adjust 'hour_out' if it is less than 'hour_in'
-
-    # Step 8: Combine 'Date' with 'hour_in' and 'hour_out' to create 'start_time' and 'end_time'
-    df['start_time'] = df['Date'] + df['hour_in'] 
-    df['end_time'] = df['Date'] + df['hour_out']
-
-    # Step 9: Convert 'start_time' and 'end_time' to datetime format
-    df['start_time'] = pd.to_datetime(df['start_time'])
-    df['end_time'] = pd.to_datetime(df['end_time'])
-
-    # Step 10: Filter by year and week if provided
-    if years is not None and week is not None:
-        df.loc[:, 'WeekYear'] = df['start_time'].dt.strftime('%Y-%U')
-        df = df[df['WeekYear'] == f"{years}-{week}"]  # Filter by year and week
-        df.drop(columns=['WeekYear'], inplace=True)  # Remove the temporary 'WeekYear' column
+    # Steps 5-10: datetime assembly and week filter, vectorized when the
+    # cells are already dates / times / numbers, else through text parsing
+    assembled = _assemble_times_fast(df, years, week) if fast_dates else None
+    df = assembled if assembled is not None else _assemble_times_legacy(df, years, week)
 
     # Step 11: Select specific columns to keep in the DataFrame
     df = df[['UnitId', 'Date', 'start_time', 'end_time', 'time_FS', 'System', 'Subsystem', 'type_detention', 'observation']]
@@ -1132,3 +1225,92 @@ def save_results(
         json.dump(payload, f, ensure_ascii=False, indent=2)
 
     return out_path
+
+
+_RESULTS_FILE = re.compile(r"^maintenance_records_(\d{4})_(\d{2})\.json$")
+
+
+def iter_results(out_dir: str = "results") -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (year, week, path) for every file written by save_results in
+    `out_dir`, in week order. Other files in the folder are ignored.
+    """
+    for fname in sorted(os.listdir(out_dir)):
+        match = _RESULTS_FILE.match(fname)
+        if match:
+            yield match.group(1), match.group(2), os.path.join(out_dir, fname)
+
+
+class JsonlResultsWriter:
+    """
+    Stream Pydantic records to <out_dir>/maintenance_records_<year>_<week>.jsonl
+    as they finish, one compact `model_dump_json()` line each.
+
+    Lines go to a `.tmp` file (readable while the week runs) that is renamed
+    over the final path on close; a sidecar `.idx.json` maps every row to the
+    [offset, length] of its line, since lines arrive in completion order.
+    Use as a context manager: on error the temp file is discarded.
+    """
+
+    def __init__(self, year: str, week: str, out_dir: str = "results"):
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, f"maintenance_records_{year}_{week}")
+        self.path = base + ".jsonl"
+        self.index_path = base + ".idx.json"
+        self._tmp_path = self.path + ".tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def write(self, row: int, record) -> None:
+        line = record.model_dump_json().encode("utf-8") + b"\n"
+        with self._lock:
+            self._index[int(row)] = [self._file.tell(), len(line)]
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> str:
+        """Publish the file and its row index atomically. Returns the JSONL path."""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._tmp_path, self.path)
+            tmp_index = self.index_path + ".tmp"
+            with open(tmp_index, "w", encoding="utf-8") as f:
+                json.dump({str(row): self._index[row] for row in sorted(self._index)}, f)
+            os.replace(tmp_index, self.index_path)
+        return self.path
+
+    def abort(self) -> None:
+        with self._lock:
+            self._file.close()
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def read_results_jsonl(path: str, rows: List[int] = None) -> List[Dict[str, Any]]:
+    """
+    Read a streamed results file back in row order, or only the given rows
+    (seeking through the `.idx.json` row index).
+    """
+    with open(path[:-len(".jsonl")] + ".idx.json", "r", encoding="utf-8") as f:
+        index = {int(row): span for row, span in json.load(f).items()}
+    wanted = sorted(index) if rows is None else rows
+    payload = []
+    with open(path, "rb") as f:
+        for row in wanted:
+            offset, length = index[row]
+            f.seek(offset)
+            payload.append(json.loads(f.read(length)))
+    return payload
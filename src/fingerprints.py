@@ -0,0 +1,219 @@
+"""
+Row fingerprints for incremental relabeling.
+
+Every processed row gets a fingerprint over the fields the LLM stages
+depend on (UnitId, start/end time, cleaned observation) plus the pipeline
+version and the hash of the global knowledge tables (field aliases, keyword
+rules). The fingerprints are persisted next to the week's final records
+(jsondata/fingerprints/maintenance_records_<year>_<week>.json, aligned by
+position); a rerun diffs them and only relabels new or changed rows.
+
+Each row also stores the hash of the know_pieces entries of its pieces,
+so editing one known piece only relabels the rows that mention it. The file
+also records the prompt stage versions (src.prompts.stage_versions) of the
+run: a prompt edit sends the rows through the persisted phases downstream of
+it again (the unchanged stages are answered by src.stage_cache).
+"""
+import os
+import json
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import src.knowledge as knowledge
+import src.prompts as P
+
+# Bump whenever prompts, schemas or post-processing change the labels
+PIPELINE_VERSION = "1"
+
+FINGERPRINTS_DIR = os.path.join("jsondata", "fingerprints")
+
+
+# --------------------------------------------------------------------- #
+# Fingerprints
+# --------------------------------------------------------------------- #
+def row_fingerprint(unit_id: str, start_time, end_time, observation: str, version: str = PIPELINE_VERSION) -> str:
+    """sha256 over the row fields that feed the LLM stages."""
+    key = "\x1f".join([str(unit_id), str(start_time), str(end_time), observation or "", version])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def record_id(unit_id: str, start_time, end_time) -> str:
+    """
+    Stable id of a detention (unit + interval), shared by every store and
+    export of final records. Unlike the fingerprint it survives relabeling.
+    """
+    key = "\x1f".join([str(unit_id), str(start_time), str(end_time)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def record_ids(records) -> List[str]:
+    """
+    record_id of every final record of a week (objects or dicts), in order.
+    Detentions repeated with the same unit and interval get a -<n> suffix
+    by order of appearance.
+    """
+    seen = defaultdict(int)
+    ids = []
+    for r in records:
+        fields = r if isinstance(r, dict) else r.model_dump(include={"unit_id", "start_time", "end_time"})
+        base = record_id(fields["unit_id"], fields["start_time"], fields["end_time"])
+        n = seen[base]
+        seen[base] += 1
+        ids.append(base if n == 0 else f"{base}-{n}")
+    return ids
+
+
+def fingerprint_version(kn: knowledge.Knowledge = None) -> str:
+    """PIPELINE_VERSION plus the hash of the tables that can change any row."""
+    return f"{PIPELINE_VERSION}:{(kn or knowledge.current()).global_hash}"
+
+
+def row_pieces(simple_record) -> List[str]:
+    """Pieces of a simple record (object or dict), the know_pieces keys it depends on."""
+    jobs = simple_record["jobs"] if isinstance(simple_record, dict) else simple_record.jobs
+    return [j["piece"] if isinstance(j, dict) else j.piece for j in jobs]
+
+
+def piece_hashes(simple_records, kn: knowledge.Knowledge = None) -> List[str]:
+    """know_pieces hash of every row's pieces, in row order."""
+    kn = kn or knowledge.current()
+    return [kn.piece_hash(row_pieces(r)) for r in simple_records]
+
+
+def week_fingerprints(df: pd.DataFrame, version: str = None) -> List[str]:
+    """Fingerprint of every row of a processed week, in row order."""
+    version = version or fingerprint_version()
+    return [
+        row_fingerprint(unit_id, start, end, observation, version)
+        for unit_id, start, end, observation in zip(df["UnitId"], df["start_time"], df["end_time"], df["observation"])
+    ]
+
+
+def _week_path(out_dir: str, year: str, week: str) -> str:
+    return os.path.join(out_dir, f"maintenance_records_{year}_{week}.json")
+
+
+def save_fingerprints(
+    fingerprints: List[str],
+    year: str,
+    week: str,
+    row_piece_hashes: List[str] = None,
+    stages: Dict[str, str] = None,
+    fast_mode: bool = False,
+    out_dir: str = FINGERPRINTS_DIR,
+) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = _week_path(out_dir, year, week)
+    payload = {
+        "pipeline_version": PIPELINE_VERSION,
+        "knowledge_hash": knowledge.current().hash,
+        "stage_versions": stages,
+        "fast_mode": fast_mode,
+        "fingerprints": fingerprints,
+        "piece_hashes": row_piece_hashes,
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return out_path
+
+
+def invalidate_fingerprints(year: str, week: str, out_dir: str = FINGERPRINTS_DIR) -> None:
+    """
+    Drop the week's fingerprints before its outputs are rewritten, so a run
+    that dies halfway is never diffed against half-updated outputs.
+    """
+    path = _week_path(out_dir, year, week)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# --------------------------------------------------------------------- #
+# Previous outputs
+# --------------------------------------------------------------------- #
+def load_previous_week(year: str, week: str, fingerprints_dir: str = FINGERPRINTS_DIR) -> Optional[dict]:
+    """
+    Fingerprints plus simple records and records of the previous run, or None
+    when any of them is missing or they are not aligned.
+    """
+    paths = {
+        "fingerprints": _week_path(fingerprints_dir, year, week),
+        "simple_records": _week_path("jsondata/simple_records", year, week),
+        "records": _week_path("jsondata/records", year, week),
+    }
+    if not all(os.path.exists(p) for p in paths.values()):
+        return None
+    loaded = {}
+    for key, path in paths.items():
+        with open(path, "r", encoding="utf-8") as f:
+            loaded[key] = json.load(f)
+    fingerprints = loaded["fingerprints"]["fingerprints"]
+    if not len(fingerprints) == len(loaded["simple_records"]) == len(loaded["records"]):
+        print(f"Previous outputs for {year}-{week} are not aligned, relabeling every row.")
+        return None
+    return {
+        "fingerprints": fingerprints,
+        "piece_hashes": loaded["fingerprints"].get("piece_hashes"),
+        "stage_versions": loaded["fingerprints"].get("stage_versions"),
+        "fast_mode": loaded["fingerprints"].get("fast_mode", False),
+        "simple_records": loaded["simple_records"],
+        "records": loaded["records"],
+    }
+
+
+def diff_fingerprints(fingerprints: List[str], previous: Optional[dict]) -> Tuple[Dict[int, int], List[int]]:
+    """
+    Match current rows against the previous run.
+    Returns ({current_row: previous_row} for unchanged rows, [rows to relabel]).
+    Previous rows whose pieces' know_pieces entries changed are not reused.
+    """
+    if previous is None:
+        return {}, list(range(len(fingerprints)))
+    stale = set()
+    if previous.get("piece_hashes"):
+        current_hashes = piece_hashes(previous["simple_records"])
+        stale = {i for i, (old, new) in enumerate(zip(previous["piece_hashes"], current_hashes)) if old != new}
+    available = defaultdict(list)
+    for old_idx, fp in enumerate(previous["fingerprints"]):
+        if old_idx not in stale:
+            available[fp].append(old_idx)
+
+    reused, pending = {}, []
+    for idx, fp in enumerate(fingerprints):
+        if available[fp]:
+            reused[idx] = available[fp].pop(0)
+        else:
+            pending.append(idx)
+    return reused, pending
+
+
+def stale_phases(previous: Optional[dict], stages: Dict[str, str], fast_mode: bool = False) -> List[str]:
+    """
+    Persisted phases ("simple_records", "records") whose prompt stages changed
+    since the previous run; switching fast mode on or off reruns simple records.
+    """
+    if previous is None:
+        return []
+    changed = P.stages_to_rerun(previous.get("stage_versions"), stages)
+    phases = P.phases_to_rerun(changed, fast_mode)
+    if previous.get("fast_mode", False) != fast_mode and "simple_records" not in phases:
+        phases.insert(0, "simple_records")
+    if "simple_records" in phases and "records" not in phases:
+        phases.append("records")
+    return phases
+
+
+def merge_rows(n_rows: int, pending: List[int], new_results: list, reused: Dict[int, int], previous_results: list, model) -> list:
+    """
+    Rebuild the full, row-ordered result list from the relabeled rows and the
+    previous run's results (raw dicts, validated into `model`).
+    """
+    merged = [None] * n_rows
+    for idx, result in zip(pending, new_results):
+        merged[idx] = result
+    for idx, old_idx in reused.items():
+        merged[idx] = model.model_validate(previous_results[old_idx])
+    return merged
+
@@ -0,0 +1,322 @@
+"""
+Per-unit interval index of detentions.
+
+Every labeled detention (unit, start_time, end_time, record_id) is kept in
+sorted numpy arrays per UnitId. Point-in-time and range lookups are binary
+searches; overlapping / adjacent detentions of a unit are merged with a
+vectorized cumulative max, and downtime over any window comes from prefix
+sums over the merged intervals.
+
+    index = IntervalIndex.load()
+    index.at("T_14", "2025-03-02 10:00")                 # detentions covering an instant
+    index.overlapping("T_14", "2025-03-01", "2025-04-01")
+    index.downtime_hours("T_14", "2025-01-01", "2025-04-01")
+
+The index is stored one file per week, data/interval_index/week_<YYYY>-<WW>.npz:
+the orchestrator writes only the week it just labeled (relabeling replaces
+that file), and load() concatenates the weeks.
+"""
+import os
+import re
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.data_handler import iter_results
+from src.fingerprints import record_ids
+
+INDEX_DIR = os.path.join("data", "interval_index")
+FINAL_RECORDS_DIR = os.path.join("jsondata", "final_records")
+
+
+def to_seconds(t) -> np.ndarray:
+    """Timestamps (str, datetime, pandas/numpy datetimes or arrays) -> int64 epoch seconds."""
+    return np.asarray(t, dtype="datetime64[s]").astype(np.int64)
+
+
+def _fmt(seconds) -> str:
+    """Epoch seconds -> 'YYYY-MM-DD HH:MM:SS', the format of the record files."""
+    return str(np.datetime64(int(seconds), "s")).replace("T", " ")
+
+
+_NAT = np.datetime64("NaT", "s").astype(np.int64)
+
+
+def week_columns(final_records: List) -> Dict[str, np.ndarray]:
+    """
+    unit / start / end / record_id columns of one week of final records
+    (objects or dicts). Detentions with a NaT start or end are left out.
+    """
+    payload = [r if isinstance(r, dict) else r.model_dump(include={"unit_id", "start_time", "end_time"})
+               for r in final_records]
+    columns = {
+        "unit": np.asarray([r["unit_id"] for r in payload], dtype=str),
+        "start": to_seconds([r["start_time"] for r in payload]).reshape(-1),
+        "end": to_seconds([r["end_time"] for r in payload]).reshape(-1),
+        "record_id": np.asarray(record_ids(payload), dtype=str),
+    }
+    dated = (columns["start"] != _NAT) & (columns["end"] != _NAT)
+    return columns if dated.all() else {name: values[dated] for name, values in columns.items()}
+
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray, gap: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge overlapping intervals (and ones separated by at most `gap`
+    seconds) without a Python loop. Returns sorted, disjoint (starts, ends).
+    """
+    if len(starts) == 0:
+        return starts.copy(), ends.copy()
+    order = np.argsort(starts, kind="stable")
+    s, e = starts[order], ends[order]
+    reach = np.maximum.accumulate(e)
+    new_group = np.empty(len(s), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = s[1:] > reach[:-1] + gap
+    group_starts = np.flatnonzero(new_group)
+    group_ends = np.append(group_starts[1:], len(s)) - 1
+    return s[group_starts], reach[group_ends]
+
+
+class UnitIntervals:
+    """Sorted detentions of one unit plus their merged, prefix-summed form."""
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, ids: np.ndarray):
+        order = np.argsort(starts, kind="stable")
+        self.starts, self.ends, self.ids = starts[order], ends[order], ids[order]
+        # running max of ends: every detention before position i ends by reach[i]
+        self.reach = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+        self.m_starts, self.m_ends = merge_intervals(self.starts, self.ends)
+        self.m_cum = np.concatenate([[0], np.cumsum(self.m_ends - self.m_starts)])
+
+    def overlapping(self, a: int, b: int) -> np.ndarray:
+        """Positions of detentions intersecting [a, b) (a point query when a == b)."""
+        hi = np.searchsorted(self.starts, b, side="right" if a == b else "left")
+        lo = np.searchsorted(self.reach, a, side="right")
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.arange(lo, hi)
+        return candidates[self.ends[lo:hi] > a]
+
+    def downtime_before(self, t) -> np.ndarray:
+        """Merged downtime (seconds) accumulated before each time in t."""
+        t = np.asarray(t, dtype=np.int64)
+        if len(self.m_starts) == 0:
+            return np.zeros(t.shape, dtype=np.int64)
+        k = np.searchsorted(self.m_starts, t, side="right") - 1
+        kk = np.maximum(k, 0)
+        inside = np.clip(t - self.m_starts[kk], 0, self.m_ends[kk] - self.m_starts[kk])
+        return np.where(k >= 0, self.m_cum[kk] + inside, 0)
+
+
+class IntervalIndex:
+    """Detention intervals of the whole fleet, grouped by unit, built week by week."""
+
+    def __init__(self):
+        # raw columns, one entry per detention
+        self._unit: List[str] = []
+        self._start: List[int] = []
+        self._end: List[int] = []
+        self._id: List[str] = []
+        self._week: List[str] = []
+        self._week_keys = set()   # weeks indexed so far (self._week holds one key per detention)
+        self._units: Dict[str, UnitIntervals] = {}
+        self._dirty = True
+
+    # ---- building --------------------------------------------------- #
+    def add_week(self, year: str, week: str, final_records: List) -> int:
+        """
+        Add (or replace) one week of final records (objects or dicts).
+        Returns the number of intervals added.
+        """
+        return self._add_columns(f"{year}-{week}", week_columns(final_records))
+
+    def _add_columns(self, key: str, columns: Dict[str, np.ndarray]) -> int:
+        if key in self._week_keys:
+            keep = [i for i, w in enumerate(self._week) if w != key]
+            for column in ("_unit", "_start", "_end", "_id", "_week"):
+                values = getattr(self, column)
+                setattr(self, column, [values[i] for i in keep])
+        n = len(columns["unit"])
+        self._unit.extend(columns["unit"].tolist())
+        self._start.extend(columns["start"].tolist())
+        self._end.extend(columns["end"].tolist())
+        self._id.extend(columns["record_id"].tolist())
+        self._week.extend([key] * n)
+        self._week_keys.add(key)
+        self._dirty = True
+        return n
+
+    def weeks(self) -> List[str]:
+        return sorted(self._week_keys)
+
+    def _build(self) -> None:
+        if not self._dirty:
+            return
+        units = np.asarray(self._unit, dtype=object)
+        starts = np.asarray(self._start, dtype=np.int64)
+        ends = np.asarray(self._end, dtype=np.int64)
+        ids = np.asarray(self._id, dtype=object)
+        self._units = {}
+        for unit in sorted(set(self._unit)):
+            mask = units == unit
+            self._units[unit] = UnitIntervals(starts[mask], ends[mask], ids[mask])
+        self._dirty = False
+
+    def unit(self, unit_id: str) -> Optional[UnitIntervals]:
+        self._build()
+        return self._units.get(unit_id)
+
+    # ---- queries ---------------------------------------------------- #
+    def _rows(self, u: UnitIntervals, positions: np.ndarray) -> List[dict]:
+        return [
+            {
+                "record_id": u.ids[i],
+                "start_time": _fmt(u.starts[i]),
+                "end_time": _fmt(u.ends[i]),
+            }
+            for i in positions
+        ]
+
+    def at(self, unit_id: str, t) -> List[dict]:
+        """Detentions of the unit in progress at instant t."""
+        u = self.unit(unit_id)
+        if u is None:
+            return []
+        ts = int(to_seconds(t))
+        return self._rows(u, u.overlapping(ts, ts))
+
+    def overlapping(self, unit_id: str, start, end) -> List[dict]:
+        """Detentions of the unit intersecting [start, end)."""
+        u = self.unit(unit_id)
+        if u is None:
+            return []
+        return self._rows(u, u.overlapping(int(to_seconds(start)), int(to_seconds(end))))
+
+    def merged(self, unit_id: str) -> List[Tuple[str, str]]:
+        """The unit's detentions with overlapping / adjacent ones merged."""
+        u = self.unit(unit_id)
+        if u is None:
+            return []
+        return [(_fmt(s), _fmt(e)) for s, e in zip(u.m_starts, u.m_ends)]
+
+    def downtime_hours(self, unit_id: str, start, end) -> float:
+        """Merged downtime of the unit inside [start, end), in hours."""
+        u = self.unit(unit_id)
+        if u is None:
+            return 0.0
+        a, b = to_seconds([start, end])
+        before = u.downtime_before([a, b])
+        return float(before[1] - before[0]) / 3600
+
+    def downtime_by_window(self, unit_id: str, edges) -> np.ndarray:
+        """Hours of downtime in each window [edges[i], edges[i+1]) (vectorized)."""
+        u = self.unit(unit_id)
+        edges = to_seconds(edges)
+        if u is None:
+            return np.zeros(max(len(edges) - 1, 0))
+        return np.diff(u.downtime_before(edges)) / 3600
+
+    # ---- persistence ------------------------------------------------ #
+    def save(self, index_dir: str = INDEX_DIR) -> str:
+        """Write every week of the index to its own file; drops files of weeks no longer indexed."""
+        week = np.asarray(self._week, dtype=str)
+        columns = {
+            "unit": np.asarray(self._unit, dtype=str),
+            "start": np.asarray(self._start, dtype=np.int64),
+            "end": np.asarray(self._end, dtype=np.int64),
+            "record_id": np.asarray(self._id, dtype=str),
+        }
+        keys = self.weeks()
+        for key in keys:
+            mask = week == key
+            _write_week(index_dir, key, {name: values[mask] for name, values in columns.items()})
+        for key in set(_stored_weeks(index_dir)) - set(keys):
+            os.remove(_week_path(index_dir, key))
+        return index_dir
+
+    @classmethod
+    def load(cls, index_dir: str = INDEX_DIR) -> "IntervalIndex":
+        """The persisted index (every stored week), or an empty one when none exists yet."""
+        index = cls()
+        for key in _stored_weeks(index_dir):
+            with np.load(_week_path(index_dir, key)) as data:
+                index._add_columns(key, {name: data[name] for name in ("unit", "start", "end", "record_id")})
+        return index
+
+
+# --------------------------------------------------------------------- #
+# Per-week files
+# --------------------------------------------------------------------- #
+_WEEK_FILE = re.compile(r"^week_(\d{4}-\d{2})\.npz$")
+
+
+def _week_path(index_dir: str, key: str) -> str:
+    return os.path.join(index_dir, f"week_{key}.npz")
+
+
+def _stored_weeks(index_dir: str) -> List[str]:
+    if not os.path.isdir(index_dir):
+        return []
+    return sorted(m.group(1) for m in map(_WEEK_FILE.match, os.listdir(index_dir)) if m)
+
+
+def _write_week(index_dir: str, key: str, columns: Dict[str, np.ndarray]) -> str:
+    """
+    Atomic replace of one week's file. Each week is written by the run that
+    labels it, so concurrent weeks never touch the same file and need no lock.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    path = _week_path(index_dir, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, **columns)
+    os.replace(tmp_path, path)
+    return path
+
+
+def update_week(year: str, week: str, final_records: List, index_dir: str = INDEX_DIR) -> str:
+    """Store (or replace) one labeled week; other weeks are not read. Returns the week's file."""
+    return _write_week(index_dir, f"{year}-{week}", week_columns(final_records))
+
+
+def backfill(final_dir: str = FINAL_RECORDS_DIR, index_dir: str = INDEX_DIR) -> int:
+    """Rebuild the index from every week in jsondata/final_records. Returns the number of weeks."""
+    index, weeks = IntervalIndex(), 0
+    for year, week, path in iter_results(final_dir):
+        with open(path, "r", encoding="utf-8") as f:
+            index.add_week(year, week, json.load(f))
+        weeks += 1
+    index.save(index_dir)
+    return weeks
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Per-unit interval index of detentions")
+    p.add_argument("--index", default=INDEX_DIR, help="folder of per-week index files")
+    p.add_argument("--backfill", action="store_true", help="rebuild from every week in jsondata/final_records")
+    p.add_argument("--unit", default=None)
+    p.add_argument("--at", default=None, help="detentions in progress at this instant")
+    p.add_argument("--start", default=None, help="YYYY-MM-DD")
+    p.add_argument("--end", default=None, help="YYYY-MM-DD (exclusive)")
+    args = p.parse_args()
+
+    if args.backfill:
+        print(f"Indexed {backfill(index_dir=args.index)} weeks into {args.index} ✅")
+        return
+    if args.unit is None:
+        p.error("--unit or --backfill is required")
+    index = IntervalIndex.load(args.index)
+    if args.at is not None:
+        result = index.at(args.unit, args.at)
+    else:
+        start, end = args.start or "1970-01-01", args.end or "2100-01-01"
+        result = {
+            "downtime_hours": round(index.downtime_hours(args.unit, start, end), 2),
+            "detentions": index.overlapping(args.unit, start, end),
+        }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    _cli()
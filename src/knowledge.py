@@ -0,0 +1,130 @@
+"""
+Knowledge tables: known piece hierarchies, field alias maps and keyword rules.
+
+The tables live in src/tables/*.json (override the folder with KNOWLEDGE_DIR)
+and load into one immutable-by-convention Knowledge snapshot with compiled
+rules and content hashes:
+
+    know_pieces.json      piece -> {system, subsystem, component, is_critical, detail}
+    field_aliases.json    field -> {raw value -> canonical value}
+    keyword_rules.json    forbidden_piece / non_critical_component / cable_piece keywords
+
+current() returns the active snapshot. refresh() re-reads the files when
+their mtime changed (checked at most every RELOAD_CHECK_S seconds) and
+swaps the snapshot in a single assignment; the orchestrator calls it before
+every week, so a running worker picks up edited tables without a restart
+and each week runs against one version.
+
+Field aliases and keyword rules can change any row (their hash is part of
+the row fingerprints); a know_pieces edit only affects rows whose pieces'
+entries changed (see piece_hash and src.fingerprints).
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from src.rules import KeywordRule
+
+TABLES_DIR = os.environ.get("KNOWLEDGE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables")
+TABLE_FILES = {
+    "know_pieces": "know_pieces.json",
+    "field_aliases": "field_aliases.json",
+    "keyword_rules": "keyword_rules.json",
+}
+# tables whose changes may affect any row
+GLOBAL_TABLES = ("field_aliases", "keyword_rules")
+RELOAD_CHECK_S = 5.0
+
+
+def _digest(obj: Any) -> str:
+    canonical = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class Knowledge:
+    """One loaded version of every table. Treat the dicts as read-only."""
+
+    def __init__(self, tables: Dict[str, Any], mtimes: Dict[str, float]):
+        self.know_pieces: Dict[str, dict] = tables["know_pieces"]
+        self.field_aliases: Dict[str, Dict[str, str]] = tables["field_aliases"]
+        rules = tables["keyword_rules"]
+        self.forbidden_piece = KeywordRule("forbidden_piece", rules["forbidden_piece"])
+        self.non_critical_component = KeywordRule("non_critical_component", rules["non_critical_component"])
+        self.cable_piece = KeywordRule("cable_piece", rules["cable_piece"], lowercase=False)
+
+        self.table_hashes = {name: _digest(table) for name, table in tables.items()}
+        self.hash = _digest(self.table_hashes)
+        self.global_hash = _digest({name: self.table_hashes[name] for name in GLOBAL_TABLES})
+        self.mtimes = mtimes
+
+    def piece_hash(self, pieces: Iterable[str]) -> str:
+        """Hash of the know_pieces entries of `pieces` (pieces without an entry included)."""
+        return _digest({piece: self.know_pieces.get(piece) for piece in sorted(set(pieces))})
+
+    def __repr__(self) -> str:
+        return f"Knowledge({self.hash}, {len(self.know_pieces)} pieces)"
+
+
+def _mtimes(tables_dir: str) -> Dict[str, float]:
+    return {name: os.stat(os.path.join(tables_dir, fname)).st_mtime for name, fname in TABLE_FILES.items()}
+
+
+def load(tables_dir: str = TABLES_DIR) -> Knowledge:
+    """Read and compile every table of `tables_dir`."""
+    mtimes = _mtimes(tables_dir)
+    tables = {}
+    for name, fname in TABLE_FILES.items():
+        with open(os.path.join(tables_dir, fname), "r", encoding="utf-8") as f:
+            tables[name] = json.load(f)
+    return Knowledge(tables, mtimes)
+
+
+_active: Optional[Knowledge] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def current() -> Knowledge:
+    """The active snapshot (loaded on first use)."""
+    global _active, _last_check
+    if _active is None:
+        with _lock:
+            if _active is None:
+                _active = load()
+                _last_check = time.monotonic()
+    return _active
+
+
+def refresh(force: bool = False) -> bool:
+    """
+    Reload the tables if their files changed. Throttled to one check every
+    RELOAD_CHECK_S seconds unless `force`. A table that fails to parse keeps
+    the previous snapshot active. Returns whether the content changed.
+    """
+    global _active, _last_check
+    active = current()
+    now = time.monotonic()
+    if not force and now - _last_check < RELOAD_CHECK_S:
+        return False
+    with _lock:
+        _last_check = now
+        try:
+            if _mtimes(TABLES_DIR) == active.mtimes:
+                return False
+            snapshot = load()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Knowledge tables not reloaded ({e}), keeping {active.hash} ❌")
+            return False
+        _active = snapshot
+    if snapshot.hash == active.hash:
+        return False
+    print(f"Knowledge tables reloaded: {active.hash} -> {snapshot.hash} ✅")
+    return True
+
+
+if __name__ == "__main__":
+    kn = current()
+    print(json.dumps({"hash": kn.hash, "global_hash": kn.global_hash, "tables": kn.table_hashes}, indent=2))
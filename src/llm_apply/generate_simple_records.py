@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import pandas as pd
 
 from src.schemas import (
@@ -9,30 +9,22 @@ from src.schemas import (
     SimpleSummary,
     ListSimpleJob,
     ListPieceComponentMapping,
-    hasRelevantActivities, SimpleJob
+    FastMaintenanceRecord,
+    hasRelevantActivities, SimpleJob, trusted
     )
 
 from src.utils import (
-    call_llm, 
-    call_llm_structured, 
     map_parallel, 
-    store_in_txt,
+    log_trace,
     timeit,
     MAX_WORKERS,
-    CLIENT,
-    MODEL,
-    know_pieces
     )
+from src.llm_router import routed_llm, routed_llm_structured, STRUCTURED_ERRORS
 import src.prompts as P
+import src.preclassifier as preclassifier
+import src.knowledge as knowledge
 import os
 
-forbiden_pieces = ["perno", "golilla", "calugas", "goma", "tuerca", "cojin", "camas", "valvulas", "funda",
-                   "flexibles", 'mantenimiento', 'ecm', 'pieza', 'flexible', 'area', 'codo', 'caneria', 'cano',
-                   '--', 'zona', 'abrazadera', 'almohadilla', 'testeo', 'regleta', 'camion', 'accesorio',
-                   'unidad', 'dispositivo', 'equipo', 'estacion', 'huerta', 'logistica', 'maquina', 'no ',
-                   'platina', 'implementos', 'inspeccion'
-                   ]
-
 
 def check_forbiden_pieces(piece: str) -> bool:
     """
@@ -41,10 +33,7 @@ def check_forbiden_pieces(piece: str) -> bool:
     """
     if piece is None:
         return False
-    for word in forbiden_pieces:
-        if word in piece.lower():
-            return False
-    return True
+    return knowledge.current().forbidden_piece.match(piece) is None
 
 
 def review_joblist(joblist: ListSimpleJob) -> ListSimpleJob:
@@ -54,16 +43,19 @@ def review_joblist(joblist: ListSimpleJob) -> ListSimpleJob:
     """
     if not joblist.jobs:
         print("No jobs found in the job list. Returning empty job list.")
-        return ListSimpleJob(jobs=[])
+        return trusted(ListSimpleJob, jobs=[])
 
     final_jobs = []
     for job in joblist.jobs:
         piece = job.piece.strip() if job.piece else None
         
         if check_forbiden_pieces(piece) == False:
-            print(f"Forbidden piece found: {piece}. Skipping job.")
+            rule = knowledge.current().forbidden_piece
+            print(f"Forbidden piece found: {piece} (rule {rule.name}: {rule.match(piece)!r}). Skipping job.")
             continue
         else:
+            # validated: these values come straight from the LLM, and a job
+            # without job_type / comment must raise here (retry / escalation)
             newJob = SimpleJob(
                 piece=piece,
                 job_type=job.job_type.strip() if job.job_type else None,
@@ -74,19 +66,20 @@ def review_joblist(joblist: ListSimpleJob) -> ListSimpleJob:
             final_jobs.append(newJob)
             
 
-    finalJobsList = ListSimpleJob(jobs=final_jobs)
+    finalJobsList = trusted(ListSimpleJob, jobs=final_jobs)
     return finalJobsList
 
 def ensure_piece_mappings(parsed: SimpleMaintenanceRecord, component_summary: str) -> SimpleMaintenanceRecord:
+    kn = knowledge.current()
     pieces_in_jobs = {job.piece for job in parsed.jobs}
     pieces_in_mapping = {mapping.piece for mapping in parsed.component_mapping}
     missing_pieces = pieces_in_jobs - pieces_in_mapping
 
     # Add missing mappings
     for piece in missing_pieces:
-        if piece in know_pieces:
+        if piece in kn.know_pieces:
             print(f"Using known mapping for piece: {piece}")
-            hierarchy = ComponentHierarchy(**know_pieces[piece])
+            hierarchy = ComponentHierarchy(**kn.know_pieces[piece])
         else:
             print(f"Piece without mapping found: {piece}")
             obs = (
@@ -94,10 +87,9 @@ def ensure_piece_mappings(parsed: SimpleMaintenanceRecord, component_summary: st
                 f'El resumen del trabajo es: "{component_summary}". '
                 "Por favor, proporciona la jerarquía de componentes para esta pieza."
             )
-            hierarchy = call_llm_structured(
-                client=CLIENT,
-                model=MODEL,
+            hierarchy = routed_llm_structured(
                 system_prompt=P.simple_prompts["SystemComponentMapping"],
+                stage="SystemComponentMappingEx",
                 user_prompts=[P.simple_prompts["UserComponentMappingEx"], obs],
                 response_format=ComponentHierarchy
             )
@@ -105,10 +97,8 @@ def ensure_piece_mappings(parsed: SimpleMaintenanceRecord, component_summary: st
 
 
     # Set is_critical to False for certain components
-    keywords = ("filtro", "culata", "acumulador", "cilindro", "manguera", "rotocamara", 'perno', 'tornillo', 'tuerca', 'codo', 'cabezal', 'aceite', 'caneria', 'tanque')
     for mapping in parsed.component_mapping:
-        comp_lower = mapping.hierarchy.component.lower()
-        if any(word in comp_lower for word in keywords):
+        if kn.non_critical_component.match(mapping.hierarchy.component):
             mapping.hierarchy.is_critical = False
 
     return parsed
@@ -117,42 +107,42 @@ def ensure_piece_mappings(parsed: SimpleMaintenanceRecord, component_summary: st
 def insert_newlines(text, every=170):
     return '\n'.join([text[i:i+every] for i in range(0, len(text), every)])
 
+def _skipped_record(row_idx: int, observation: str) -> SimpleMaintenanceRecord:
+    print(f"Pre-classifier: observation {row_idx} is irrelevant. Returning empty record.")
+    log_trace(row_idx, observation=observation, outcome="skipped by pre-classifier")
+    return SimpleMaintenanceRecord(
+        is_scheduled=False, scheduled_type=None, summary="", jobs=[], component_mapping=[]
+    )
+
 @timeit("generate_times.json")
 def _generate_maintenance_record_single(pair: Tuple[int, str]) -> SimpleMaintenanceRecord:
     row_idx, observation = pair
-    fname_txt = f"observation_{row_idx}.txt"
-    content = ''
+    trace = {"observation": observation}
     if len(observation) < 40:
-        content += f"\nObservation: {observation}\n"
-        store_in_txt(fname_txt, content)
+        log_trace(row_idx, **trace, outcome="short observation")
         
         return SimpleMaintenanceRecord(
             is_scheduled=False, scheduled_type=None, summary="", jobs=[], component_mapping=[]
         )
 
+    if preclassifier.should_skip(observation):
+        return _skipped_record(row_idx, observation)
+
     # free‐text → summary
-    text_summary = call_llm(
-        client=CLIENT,
-        model=MODEL,
+    text_summary = routed_llm(
         system_prompt=P.simple_prompts["SystemFreeToSummary"],
-        user_prompts=[P.simple_prompts["UserFreeToSummary"], 
-                      P.simple_prompts["UserExampleFreeToSummary"],
-                      P.simple_prompts["AssistantExampleFreeToSummary"],
-                      P.simple_prompts["UserExample2FreeToSummary"],
-                      P.simple_prompts["AssistantExample2FreeToSummary"],
-                      observation],
+        stage="SystemFreeToSummary",
+        user_prompts=[P.simple_prompts["UserFreeToSummary"], observation],
+        examples=P.simple_examples["FreeToSummary"],
     )
 
 
-    formatted_observation = insert_newlines(observation, every=150)
-    content += f"\n\nObservation: {formatted_observation}\n"
-    content += f"\n\nText Summary: {text_summary}\n"
+    trace["text_summary"] = text_summary
     
     # summary -> hasRelevantActivities
-    flagActivities = call_llm_structured(
-        client=CLIENT,
-        model=MODEL,
+    flagActivities = routed_llm_structured(
         system_prompt=P.simple_prompts["SystemRelevantActivities"],
+        stage="SystemRelevantActivities",
         user_prompts=[P.simple_prompts["UserRelevantActivities"], text_summary],
         response_format=hasRelevantActivities
     )
@@ -160,47 +150,40 @@ def _generate_maintenance_record_single(pair: Tuple[int, str]) -> SimpleMaintena
     if flagActivities.flag == False:
         # If no relevant activities, return empty record
         print(f"No relevant activities found in observation {row_idx}. Returning empty record.")
-        content += "\n\nNo relevant activities found.\n"
-        store_in_txt(fname_txt, content)
+        log_trace(row_idx, **trace, outcome="no relevant activities")
         return SimpleMaintenanceRecord(
             is_scheduled=False, scheduled_type=None, summary="", jobs=[], component_mapping=[]
         )
     
     # observation -> MaintenanceType
-    mant_type: MaintenanceType = call_llm_structured(
-        client=CLIENT,
-        model=MODEL,
+    mant_type: MaintenanceType = routed_llm_structured(
         system_prompt=P.simple_prompts["SystemMaintenanceType"],
+        stage="SystemMaintenanceType",
         user_prompts=[P.simple_prompts["UserMaintenanceType"], observation],
         response_format=MaintenanceType
     )
     
     # summary -> text_summary_cleaned
-    text_summary = call_llm(
-        client=CLIENT,
-        model=MODEL,
+    text_summary = routed_llm(
         system_prompt=P.simple_prompts["SystemCleanSummary"],
-        user_prompts=[P.simple_prompts["UserCleanSummary"],
-                      P.simple_prompts["UserExampleCleanSummary"],  
-                      P.simple_prompts["AssistantExampleCleanSummary"],  
-                      text_summary],
+        stage="SystemCleanSummary",
+        user_prompts=[P.simple_prompts["UserCleanSummary"], text_summary],
+        examples=P.simple_examples["CleanSummary"],
     )
-    content += f"\n\nText Summary Cleaned: {text_summary}\n"
+    trace["text_summary_cleaned"] = text_summary
     
     # summary → shortened summary
-    shortened_summary = call_llm_structured(
-        client=CLIENT,
-        model=MODEL,
+    shortened_summary = routed_llm_structured(
         system_prompt=P.simple_prompts["SystemShortened"],
+        stage="SystemShortened",
         user_prompts=[P.simple_prompts["UserShortened"], text_summary],
         response_format=SimpleSummary
     )
     
     # summary -> JobList
-    joblist = call_llm_structured(
-        client=CLIENT,
-        model=MODEL,
+    joblist = routed_llm_structured(
         system_prompt=P.simple_prompts["SystemJobs"],
+        stage="SystemJobs",
         user_prompts=[P.simple_prompts["UserJobs"], text_summary],
         response_format=ListSimpleJob
     )
@@ -210,28 +193,25 @@ def _generate_maintenance_record_single(pair: Tuple[int, str]) -> SimpleMaintena
     
     if len(joblist.jobs) == 0:
         print(f"No valid jobs found in observation {row_idx}. Returning empty record.")
-        content += "\n\nNo valid jobs found.\n"
-        store_in_txt(fname_txt, content)
+        log_trace(row_idx, **trace, outcome="no valid jobs")
         return SimpleMaintenanceRecord(
             is_scheduled=False, scheduled_type=None, summary="", jobs=[], component_mapping=[]
         )
     
     # summary -> component_summary
-    component_summary = call_llm(
-        client=CLIENT,
-        model=MODEL,
+    component_summary = routed_llm(
         system_prompt=P.simple_prompts["SystemComponentSummary"],
+        stage="SystemComponentSummary",
         user_prompts=[P.simple_prompts["UserComponentSummary"], text_summary],
     )
-    content += f"\n\nComponent Summary: {component_summary}\n"
-    store_in_txt(fname_txt, content)
+    trace["component_summary"] = component_summary
+    log_trace(row_idx, **trace, outcome="jobs found")
     
     extra_text = f'Centrate principalmente en las siguientes piezas: {", ".join(pieces_in_jobs)}.\n'
     # component_summary -> PieceComponentMapping
-    component_mapping = call_llm_structured(
-        client=CLIENT,
-        model=MODEL,
+    component_mapping = routed_llm_structured(
         system_prompt=P.simple_prompts["SystemComponentMapping"],
+        stage="SystemComponentMapping",
         user_prompts=[P.simple_prompts["UserComponentMapping"], component_summary, extra_text],
         response_format=ListPieceComponentMapping
     )
@@ -249,10 +229,108 @@ def _generate_maintenance_record_single(pair: Tuple[int, str]) -> SimpleMaintena
 
     return parsed
 
+def _fast_record(row_idx: int, observation: str) -> Optional[SimpleMaintenanceRecord]:
+    """
+    Fused single-call version of the chain.
+    Returns None whenever the result cannot be trusted and the row must go
+    through the full chain: structured validation fails, review_joblist drops
+    jobs, the schedule fields contradict each other, or a job piece has no
+    mapping that ensure_piece_mappings could resolve without another call.
+    """
+    trace = {"observation": observation, "mode": "fast"}
+    try:
+        fast = routed_llm_structured(
+            system_prompt=P.simple_prompts["SystemFastRecord"],
+            stage="SystemFastRecord",
+            user_prompts=[P.simple_prompts["UserFastRecord"], observation],
+            response_format=FastMaintenanceRecord
+        )
+    except STRUCTURED_ERRORS + (ValueError,) as e:
+        print(f"Fast mode: invalid structured output for observation {row_idx} ({e}). Falling back to full chain.")
+        return None
+    if fast is None:
+        return None
+
+    if fast.has_relevant_activities == False:
+        print(f"No relevant activities found in observation {row_idx}. Returning empty record.")
+        log_trace(row_idx, **trace, outcome="no relevant activities")
+        return SimpleMaintenanceRecord(
+            is_scheduled=False, scheduled_type=None, summary="", jobs=[], component_mapping=[]
+        )
+
+    joblist = review_joblist(ListSimpleJob(jobs=fast.jobs))
+    if len(joblist.jobs) == 0 or len(joblist.jobs) != len(fast.jobs):
+        print(f"Fast mode: job review failed for observation {row_idx}. Falling back to full chain.")
+        return None
+    if fast.is_scheduled and not fast.scheduled_type:
+        print(f"Fast mode: scheduled record without scheduled_type in observation {row_idx}. Falling back to full chain.")
+        return None
+
+    pieces_in_mapping = {mapping.piece for mapping in fast.component_mapping}
+    unresolved = [job.piece for job in joblist.jobs if job.piece not in pieces_in_mapping and job.piece not in knowledge.current().know_pieces]
+    if unresolved:
+        print(f"Fast mode: unmapped pieces {unresolved} in observation {row_idx}. Falling back to full chain.")
+        return None
+
+    parsed = SimpleMaintenanceRecord(
+        is_scheduled=fast.is_scheduled,
+        scheduled_type=fast.scheduled_type,
+        summary=fast.summary,
+        jobs=joblist.jobs,
+        component_mapping=fast.component_mapping
+    )
+    parsed = ensure_piece_mappings(parsed, fast.summary)
+
+    log_trace(row_idx, **trace, summary=fast.summary, outcome="jobs found")
+    return parsed
+
+@timeit("generate_times.json")
+def _generate_maintenance_record_fast(pair: Tuple[int, str]) -> SimpleMaintenanceRecord:
+    row_idx, observation = pair
+    if len(observation) >= 40:
+        # classified (and counted) once here, never again in the fallback
+        if preclassifier.should_skip(observation, calls_saved=1):
+            return _skipped_record(row_idx, observation)
+        parsed = _fast_record(row_idx, observation)
+        if parsed is not None:
+            return parsed
+    # short observations and fast-mode failures take the full chain (untimed inner call)
+    return _generate_maintenance_record_single.__wrapped__(pair)
+
+SCHEDULING_POLICIES = ("index", "length", "relevance")
+
+def estimate_row_cost(observation: str, policy: str = "length") -> float:
+    """
+    Relative cost of a row, used to dispatch the most expensive rows first.
+    - index: no estimate (original order)
+    - length: observation length; short rows never reach the LLM
+    - relevance: length weighted by the pre-classifier's P(relevant), when loaded
+    """
+    if policy == "index" or len(observation) < 40:
+        return 0.0
+    if policy == "relevance":
+        p_irrelevant = preclassifier.prob_irrelevant(observation)
+        if p_irrelevant is not None:
+            return len(observation) * (1.0 - p_irrelevant)
+    return float(len(observation))
+
 def generate_maintenance_records(
     observations: pd.Series, 
-    max_workers: int = MAX_WORKERS
+    max_workers: int = MAX_WORKERS,
+    fast_mode: bool = False,
+    scheduling: str = "index",
 ) -> List[SimpleMaintenanceRecord]:
+    """
+    Run the simple-record stage over every observation.
+    With fast_mode=True each row first tries a single fused structured call
+    and only falls back to the full chain when its checks fail.
+    `scheduling` (see SCHEDULING_POLICIES) decides the dispatch order;
+    results are always returned in the original row order.
+    """
+    if scheduling not in SCHEDULING_POLICIES:
+        raise ValueError(f"Unknown scheduling policy: {scheduling!r}")
     inputs = list(observations.items())  # [(index, observation), ...]
-    return map_parallel(_generate_maintenance_record_single, inputs, max_workers)
-    
\ No newline at end of file
+    preclassifier.prime(list(observations))
+    fn = _generate_maintenance_record_fast if fast_mode else _generate_maintenance_record_single
+    cost = None if scheduling == "index" else (lambda pair: estimate_row_cost(pair[1], scheduling))
+    return map_parallel(fn, inputs, max_workers, cost=cost)
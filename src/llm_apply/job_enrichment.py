@@ -7,19 +7,14 @@ from src.schemas import (
     ComponentHierarchy, 
     CriticityEvaluation, 
     PieceComponentMapping,
-    EvaluationCriticity
+    EvaluationCriticity,
+    trusted,
     )
 
-from src.utils import (
-    call_llm, 
-    call_llm_structured,
-    CLIENT,
-    MODEL,
-    )
+from src.llm_router import routed_llm, routed_llm_structured
+from src.utils import map_parallel
 import src.prompts as P
 
-from concurrent.futures import ThreadPoolExecutor
-
 def _evaluate_criticity(job_type:str, critical_component:bool, summary:str) -> CriticityEvaluation:
     """
     - Si el trabajo es de inspeccion, se debe considerar como de criticidad baja.
@@ -43,17 +38,15 @@ def _evaluate_criticity(job_type:str, critical_component:bool, summary:str) -> C
             else:
                 obs = f'El trabajo es de tipo {job_type}.\nEl trabajo realizado es: {summary}'
                 # summary -> critical_summary
-                critical_summary = call_llm(
-                    client=CLIENT,
-                    model=MODEL,
+                critical_summary = routed_llm(
                     system_prompt=P.job_cleaning_prompts["EvalSystem"],
+                    stage="EvalSystem",
                     user_prompts=[P.job_cleaning_prompts["EvalUser"], obs]
                 )
                 # critical_summary -> EvaluationCriticity
-                evaluation = call_llm_structured(
-                    client=CLIENT,
-                    model=MODEL,
+                evaluation = routed_llm_structured(
                     system_prompt=P.job_cleaning_prompts["EvalSystemStructured"],
+                    stage="EvalSystemStructured",
                     user_prompts=[P.job_cleaning_prompts["EvalUserStructured"], critical_summary],
                     response_format=EvaluationCriticity
                 )
@@ -85,7 +78,8 @@ def _review_job(job: SimpleJob, component_mapping: dict) -> Job:
     
     critical_change = (crit.criticity == 'Alta')
     
-    return Job(
+    return trusted(
+        Job,
         system=system,
         subsystem=subsystem,
         component=component,
@@ -102,6 +96,5 @@ def review_jobs(
     simple_jobs: List[SimpleJob],
     component_mapping: dict,
 ) -> List[Job]:
-    with ThreadPoolExecutor() as executor:
-        results = list(executor.map(lambda job: _review_job(job, component_mapping), simple_jobs))
-    return results
+    # nested on the same bounded scheduler as the rows (see utils.WorkScheduler)
+    return map_parallel(lambda job: _review_job(job, component_mapping), simple_jobs)
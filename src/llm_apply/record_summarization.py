@@ -1,8 +1,8 @@
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 import pandas as pd
 
 
-from src.schemas import SimpleMaintenanceRecord, MaintenanceRecord, MaintenanceRecordSupervised
+from src.schemas import SimpleMaintenanceRecord, MaintenanceRecord, MaintenanceRecordSupervised, trusted
 from src.llm_apply.job_enrichment import review_jobs
 from src.utils import (
     map_parallel, 
@@ -65,7 +65,8 @@ def _review_maintenance_record(pair : Tuple[int, SimpleMaintenanceRecord]) -> Tu
     }
     
     if len(record.jobs) == 0:
-        return MaintenanceRecord(
+        return trusted(
+            MaintenanceRecord,
             detention_type="",
             is_scheduled=record.is_scheduled,
             scheduled_type=record.scheduled_type,
@@ -89,7 +90,8 @@ def _review_maintenance_record(pair : Tuple[int, SimpleMaintenanceRecord]) -> Tu
 
     det_type = _evaluate_detention_type(activities_flags, scheduled_info)
 
-    return MaintenanceRecord(
+    return trusted(
+        MaintenanceRecord,
         detention_type=det_type,
         is_scheduled=record.is_scheduled,
         scheduled_type=record.scheduled_type,
@@ -104,8 +106,25 @@ def _review_maintenance_record(pair : Tuple[int, SimpleMaintenanceRecord]) -> Tu
     )
 
 def generate_records(
-    records: List[SimpleMaintenanceRecord], max_workers: int = MAX_WORKERS
+    records: List[SimpleMaintenanceRecord], 
+    max_workers: int = MAX_WORKERS,
+    row_ids: List[int] = None,
+    on_result: Callable[[int, MaintenanceRecord], None] = None,
+    scheduling: str = "index",
 ) -> List[MaintenanceRecord]:
-    indexed_records = list(enumerate(records))  # [(row_number, record)]
-        
-    return map_parallel(_review_maintenance_record, indexed_records, max_workers)
+    """
+    Review every simple record. `row_ids` are the week rows the records belong
+    to (defaults to their position), used to tag logs and metrics.
+    `on_result(row_id, record)` is called as soon as each record is ready.
+    With any `scheduling` policy other than "index" (original order), the
+    records with the most jobs (the most criticity evaluations) start first.
+    """
+    if row_ids is None:
+        row_ids = range(len(records))
+    indexed_records = list(zip(row_ids, records))  # [(row_number, record)]
+
+    stream = None
+    if on_result is not None:
+        stream = lambda i, record: on_result(indexed_records[i][0], record)
+    cost = None if scheduling == "index" else (lambda pair: len(pair[1].jobs))
+    return map_parallel(_review_maintenance_record, indexed_records, max_workers, cost=cost, on_result=stream)
@@ -0,0 +1,195 @@
+import threading
+import json
+import os
+import math
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# --------------------------------------------------------------------- #
+# Pricing (USD per 1M tokens)
+# --------------------------------------------------------------------- #
+PRICING_PER_1M = {
+    "gpt-4o-mini": {"input": 0.15, "cached": 0.075, "output": 0.60},
+    "o4-mini": {"input": 1.10, "cached": 0.275, "output": 4.40},
+}
+
+_metrics_lock = threading.Lock()
+
+# Sliding window of recent successful latencies per (stage, model) (drives request hedging)
+LATENCY_WINDOW = 256
+_recent_latencies: Dict[tuple, deque] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+# Row currently being processed by this thread/task (set by utils.timeit)
+current_row: ContextVar = ContextVar("current_row", default=None)
+
+
+# --------------------------------------------------------------------- #
+# Collection
+# --------------------------------------------------------------------- #
+class CallLog:
+    """
+    The LLM calls of one run. Each run keeps its own on its RunContext
+    (see src.utils.llm_calls), so weeks running side by side never mix.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: List[Dict[str, Any]] = []
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._calls.append(entry)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._calls)
+
+
+def _usage_tokens(usage) -> Dict[str, int]:
+    """
+    Extract prompt / completion / cached token counts from a completion `usage` block.
+    """
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": cached or 0,
+    }
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """
+    Cost in USD of one call. Unknown models are priced at 0.
+    """
+    price = PRICING_PER_1M.get(model)
+    if price is None:
+        return 0.0
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (
+        uncached * price["input"]
+        + cached_tokens * price["cached"]
+        + completion_tokens * price["output"]
+    ) / 1_000_000
+
+
+def record_call(
+    calls: CallLog,
+    stage: Optional[str],
+    model: str,
+    usage,
+    latency_s: float,
+    error: Optional[str] = None,
+    hedged: bool = False,
+    hedge_loser: bool = False,
+) -> Dict[str, Any]:
+    """
+    Store one LLM call in `calls`, tagged with its stage, row, model, tokens and latency.
+    `hedge_loser` marks the abandoned request of a hedged pair: its answer is
+    discarded but its tokens are billed. It stays out of the latency window.
+    """
+    tokens = _usage_tokens(usage)
+    entry = {
+        "stage": stage or "unknown",
+        "row": current_row.get(),
+        "model": model,
+        **tokens,
+        "latency_s": round(latency_s, 4),
+        "cost_usd": call_cost(model, **tokens),
+    }
+    if error is not None:
+        entry["error"] = error
+    if hedged:
+        entry["hedged"] = True
+    if hedge_loser:
+        entry["hedge_loser"] = True
+    calls.append(entry)
+    if error is None and not hedge_loser:
+        with _metrics_lock:
+            _recent_latencies[(entry["stage"], model)].append(latency_s)
+    return entry
+
+
+def recent_latency_percentile(stage: str, model: str, q: float, min_samples: int = 20) -> Optional[float]:
+    """
+    q-th percentile of the recent latencies of `model` on `stage`, or None with too few samples.
+    """
+    with _metrics_lock:
+        window = list(_recent_latencies.get((stage, model), ()))
+    if len(window) < min_samples:
+        return None
+    return percentile(window, q)
+
+
+# --------------------------------------------------------------------- #
+# Rollup
+# --------------------------------------------------------------------- #
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Linear-interpolated percentile (q in [0, 100]) of a list of numbers.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def _round(value: Optional[float], ndigits: int = 4) -> Optional[float]:
+    return None if value is None else round(value, ndigits)
+
+
+def summarize(calls: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-stage rollup: call/row counts, tokens, prompt-cache hit rate
+    (cached / prompt tokens), p50/p95/p99 latency and cost.
+    A "__total__" entry aggregates every stage.
+    """
+    groups = defaultdict(list)
+    for c in calls:
+        groups[c["stage"]].append(c)
+        groups["__total__"].append(c)
+
+    rollup = {}
+    for stage, items in sorted(groups.items()):
+        latencies = [c["latency_s"] for c in items]
+        prompt = sum(c["prompt_tokens"] for c in items)
+        cached = sum(c["cached_tokens"] for c in items)
+        rollup[stage] = {
+            "calls": len(items),
+            "errors": sum(1 for c in items if "error" in c),
+            "hedged": sum(1 for c in items if c.get("hedged")),
+            "hedge_losers": sum(1 for c in items if c.get("hedge_loser")),
+            "rows": len({c["row"] for c in items if c["row"] is not None}),
+            "prompt_tokens": prompt,
+            "completion_tokens": sum(c["completion_tokens"] for c in items),
+            "cached_tokens": cached,
+            "cache_hit_rate": round(cached / prompt, 4) if prompt else 0.0,
+            "latency_p50_s": _round(percentile(latencies, 50)),
+            "latency_p95_s": _round(percentile(latencies, 95)),
+            "latency_p99_s": _round(percentile(latencies, 99)),
+            "cost_usd": round(sum(c["cost_usd"] for c in items), 6),
+        }
+    return rollup
+
+
+def save_metrics(
+    out_dir: str,
+    calls: List[Dict[str, Any]],
+    calls_fname: str = "llm_calls.json",
+    rollup_fname: str = "llm_rollup.json",
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Write the raw call log and the per-stage rollup to out_dir.
+    Returns the rollup.
+    """
+    rollup = summarize(calls)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, calls_fname), "w", encoding="utf-8") as f:
+        json.dump(calls, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(out_dir, rollup_fname), "w", encoding="utf-8") as f:
+        json.dump(rollup, f, indent=2, ensure_ascii=False)
+    return rollup
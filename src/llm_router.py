@@ -0,0 +1,191 @@
+"""
+Model cascade routing.
+
+Every stage has a tier list, cheapest / fastest model first. A call starts
+on the first tier and escalates to the next one only when the structured
+output fails validation, or comes back empty or contradictory. Escalations
+are counted per stage on the current run (src.utils.run_context) and
+written to the week's log dir.
+
+Accepted answers go to the week's stage cache (src.stage_cache); a call
+already answered under the same stage version is served from it.
+"""
+import os
+import json
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+from openai import LengthFinishReasonError, ContentFilterFinishReasonError
+
+from src.utils import call_llm, call_llm_structured, current_run, CLIENT, MODEL, MODEL_REASON
+import src.stage_cache as stage_cache
+
+DEFAULT_TIERS: List[str] = [MODEL, MODEL_REASON]
+
+# Per-stage overrides (stage name -> ordered tier list)
+STAGE_TIERS: Dict[str, List[str]] = {
+    "SystemFreeToSummary": [MODEL, MODEL_REASON],
+    "SystemRelevantActivities": [MODEL, MODEL_REASON],
+    "SystemMaintenanceType": [MODEL, MODEL_REASON],
+    "SystemCleanSummary": [MODEL, MODEL_REASON],
+    "SystemShortened": [MODEL],
+    "SystemJobs": [MODEL, MODEL_REASON],
+    "SystemComponentSummary": [MODEL, MODEL_REASON],
+    "SystemComponentMapping": [MODEL, MODEL_REASON],
+    "SystemComponentMappingEx": [MODEL, MODEL_REASON],
+    "SystemFastRecord": [MODEL, MODEL_REASON],
+    "EvalSystem": [MODEL, MODEL_REASON],
+    "EvalSystemStructured": [MODEL, MODEL_REASON],
+}
+
+# Errors that mean "this tier could not produce a valid structured answer"
+STRUCTURED_ERRORS = (ValidationError, LengthFinishReasonError, ContentFilterFinishReasonError)
+
+_router_lock = threading.Lock()
+
+
+def _new_stage_stats():
+    return defaultdict(lambda: {"calls": 0, "escalated": 0, "exhausted": 0, "reasons": Counter()})
+
+
+def _stage_stats():
+    """Escalation counters of the current run, per stage."""
+    return current_run().state("llm_escalations", _new_stage_stats)
+
+
+def tiers_for(stage: str) -> List[str]:
+    return STAGE_TIERS.get(stage, DEFAULT_TIERS)
+
+
+# --------------------------------------------------------------------- #
+# Output checks
+# --------------------------------------------------------------------- #
+def default_check(parsed: Optional[BaseModel]) -> Optional[str]:
+    """
+    Return the reason to escalate, or None if the structured output is usable:
+    - no parsed object (refusal)
+    - a required top-level string field left empty
+    - is_scheduled=True without a scheduled_type
+    """
+    if parsed is None:
+        return "refusal"
+    for name, field in type(parsed).model_fields.items():
+        value = getattr(parsed, name)
+        if field.is_required() and isinstance(value, str) and not value.strip():
+            return f"empty {name}"
+    if getattr(parsed, "is_scheduled", False) and not getattr(parsed, "scheduled_type", None):
+        return "is_scheduled without scheduled_type"
+    return None
+
+
+def _record(stage: str, escalations: int, exhausted: bool, reasons: List[str]) -> None:
+    stage_stats = _stage_stats()
+    with _router_lock:
+        stats = stage_stats[stage]
+        stats["calls"] += 1
+        stats["escalated"] += int(escalations > 0)
+        stats["exhausted"] += int(exhausted)
+        stats["reasons"].update(reasons)
+
+
+# --------------------------------------------------------------------- #
+# Routed calls
+# --------------------------------------------------------------------- #
+def routed_llm_structured(
+    system_prompt: str,
+    user_prompts: List[str],
+    response_format,
+    stage: str,
+    examples=(),
+    check: Callable[[Optional[BaseModel]], Optional[str]] = default_check,
+    client=CLIENT,
+):
+    """
+    Structured call that walks the stage's tier list until `check` passes.
+    If every tier fails the check, the last tier's answer is returned; if the
+    last tier raised a validation error, that error is re-raised.
+    """
+    kind = response_format.__name__
+    cached = stage_cache.lookup(stage, kind, user_prompts)
+    if cached is not None:
+        return response_format.model_validate(cached)
+    tiers = tiers_for(stage)
+    reasons = []
+    for i, model in enumerate(tiers):
+        try:
+            parsed = call_llm_structured(
+                client, model, system_prompt, user_prompts, response_format,
+                examples=examples, stage=stage,
+            )
+            reason = check(parsed)
+        except STRUCTURED_ERRORS as e:
+            if i + 1 == len(tiers):
+                _record(stage, i, True, reasons + [type(e).__name__])
+                raise
+            reason = type(e).__name__
+        if reason is None:
+            _record(stage, i, False, reasons)
+            stage_cache.store(stage, kind, user_prompts, parsed.model_dump(mode="json"))
+            return parsed
+        reasons.append(reason)
+        if i + 1 < len(tiers):
+            print(f"Escalating {stage} from {model} to {tiers[i + 1]}: {reason}")
+    _record(stage, len(tiers) - 1, True, reasons)
+    return parsed
+
+
+def routed_llm(
+    system_prompt: str,
+    user_prompts: List[str],
+    stage: str,
+    examples=(),
+    client=CLIENT,
+) -> str:
+    """
+    Free-text call that escalates to the next tier when the answer is empty.
+    """
+    cached = stage_cache.lookup(stage, "text", user_prompts)
+    if cached is not None:
+        return cached
+    tiers = tiers_for(stage)
+    reasons = []
+    for i, model in enumerate(tiers):
+        text = call_llm(client, model, system_prompt, user_prompts, examples=examples, stage=stage)
+        if text:
+            _record(stage, i, False, reasons)
+            stage_cache.store(stage, "text", user_prompts, text)
+            return text
+        reasons.append("empty response")
+        if i + 1 < len(tiers):
+            print(f"Escalating {stage} from {model} to {tiers[i + 1]}: empty response")
+    _record(stage, len(tiers) - 1, True, reasons)
+    return text
+
+
+# --------------------------------------------------------------------- #
+# Escalation stats
+# --------------------------------------------------------------------- #
+def escalation_summary() -> Dict[str, dict]:
+    """Per-stage calls, escalation rate and reasons of the current run."""
+    stage_stats = _stage_stats()
+    with _router_lock:
+        return {
+            stage: {
+                "calls": s["calls"],
+                "escalated": s["escalated"],
+                "escalation_rate": round(s["escalated"] / s["calls"], 4) if s["calls"] else 0.0,
+                "exhausted": s["exhausted"],
+                "reasons": dict(s["reasons"]),
+            }
+            for stage, s in sorted(stage_stats.items())
+        }
+
+
+def save_escalations(out_dir: str, fname: str = "llm_escalations.json") -> Dict[str, dict]:
+    summary = escalation_summary()
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, fname), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return summary
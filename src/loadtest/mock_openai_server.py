@@ -0,0 +1,357 @@
+"""
+Local OpenAI-compatible stand-in server for load and concurrency testing.
+
+Implements the two endpoints used by `src.utils`:
+- chat.completions.create           -> POST /v1/chat/completions (free text)
+- beta.chat.completions.parse       -> POST /v1/chat/completions with a
+                                       `json_schema` response_format
+
+Point the pipeline at it with:
+    LLM_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock python -m src.orchestrator ...
+
+Run standalone:
+    python -m src.loadtest.mock_openai_server --port 8089 --p50 0.8 --p95 3 --p99 8 --error-rate 0.01 --rate-limit-rate 0.02
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# --------------------------------------------------------------------- #
+# Canned content
+# --------------------------------------------------------------------- #
+FREE_TEXT_RESPONSE = """
+Resumen de actividades realizadas
+* Inspeccion - Revision de neumatico posicion 1, se encuentra en buen estado.
+* Relleno - Relleno de aceite hidraulico (20 litros).
+
+Resumen final de actividades por pieza
+| Pieza | TipoActividad | DescripcionActividad |
+| Neumatico posicion 1 | Inspeccion | Revision de neumatico posicion 1 |
+| Aceite hidraulico | Relleno | Relleno de aceite hidraulico (20 litros) |
+"""
+
+# Plausible values per field name, so parsed objects survive the pipeline
+# checks (forbidden pieces, known piece mappings, criticity rules).
+FIELD_VALUES: Dict[str, List[Any]] = {
+    "piece": ["Neumatico posicion 1", "Aceite hidraulico", "Motor", "Frenos", "Alternador"],
+    "job_type": ["Inspeccion", "Relleno", "Reparacion", "Reemplazo"],
+    "comment": ["Revision general del componente"],
+    "summary": ["Inspeccion de neumatico y relleno de aceite hidraulico"],
+    "system": ["Equipo", "Hidraulico", "Motor"],
+    "subsystem": ["Neumaticos", "Fluido", "Motor"],
+    "component": ["Neumatico", "Aceite", "Motor"],
+    "scheduled_type": ["Programado", "Preventivo"],
+    "detail": [None],
+    "ot_number": [None, "520219"],
+}
+
+CACHE_MIN_TOKENS = 1024   # same thresholds as the provider-side prompt cache
+CACHE_BLOCK_TOKENS = 128
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return max(1, len(text or "") // 4)
+
+
+# --------------------------------------------------------------------- #
+# Configuration and accounting
+# --------------------------------------------------------------------- #
+@dataclass
+class MockConfig:
+    p50: float = 0.8
+    p95: float = 3.0
+    p99: float = 8.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    relevant_rate: float = 0.8
+    latency_per_1k_tokens: float = 0.0   # extra latency per 1k tokens of the last message
+    seed: Optional[int] = None
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """
+        Piecewise-linear inverse CDF through the configured percentiles.
+        """
+        knots = [(0.0, self.p50 * 0.3), (0.5, self.p50), (0.95, self.p95),
+                 (0.99, self.p99), (1.0, self.p99 * 1.5)]
+        u = rng.random()
+        for (q0, v0), (q1, v1) in zip(knots, knots[1:]):
+            if u <= q1:
+                return v0 + (v1 - v0) * (u - q0) / (q1 - q0)
+        return knots[-1][1]
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    structured_requests: int = 0
+    errors_injected: int = 0
+    rate_limited: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    by_model: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class MockState:
+    """
+    Shared server state: config, counters and the simulated prefix cache.
+    """
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.stats = MockStats()
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self._seen_prefixes = set()
+
+    def cached_tokens_for(self, messages: List[dict]) -> int:
+        """
+        Tokens served from the simulated prefix cache: the longest
+        message-aligned prefix seen before, rounded down to cache blocks.
+        """
+        digest = hashlib.sha256()
+        running, cached = 0, 0
+        prefixes = []
+        for msg in messages:
+            content = msg.get("content") or ""
+            digest.update(f'{msg.get("role")}\x00{content}\x01'.encode("utf-8"))
+            running += count_tokens(content)
+            prefixes.append((digest.copy().hexdigest(), running))
+        with self.lock:
+            for key, tokens in prefixes:
+                if key in self._seen_prefixes:
+                    cached = tokens
+                else:
+                    self._seen_prefixes.add(key)
+            if len(self._seen_prefixes) > 200_000:
+                self._seen_prefixes.clear()
+        if cached < CACHE_MIN_TOKENS:
+            return 0
+        return cached - cached % CACHE_BLOCK_TOKENS
+
+
+# --------------------------------------------------------------------- #
+# JSON-schema instance generation
+# --------------------------------------------------------------------- #
+def _resolve(schema: dict, root: dict) -> dict:
+    ref = schema.get("$ref")
+    if ref:
+        node = root
+        for part in ref.lstrip("#/").split("/"):
+            node = node[part]
+        return node
+    return schema
+
+
+def build_instance(schema: dict, root: dict, rng: random.Random, cfg: MockConfig, name: str = "") -> Any:
+    """
+    Build a value that satisfies a strict OpenAI json_schema.
+    """
+    schema = _resolve(schema, root)
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if _resolve(s, root).get("type") != "null"]
+        if name in FIELD_VALUES:
+            value = rng.choice(FIELD_VALUES[name])
+            if value is None or not options:
+                return None
+        return build_instance(options[0], root, rng, cfg, name) if options else None
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            key: build_instance(sub, root, rng, cfg, key)
+            for key, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        n = rng.randint(1, 3)
+        return [build_instance(schema.get("items", {}), root, rng, cfg, name) for _ in range(n)]
+    if kind == "boolean":
+        if name in ("flag", "has_relevant_activities"):
+            return rng.random() < cfg.relevant_rate
+        return rng.random() < 0.3
+    if kind == "integer":
+        return rng.choice([0, 20, 44]) if name == "liters" else 0
+    if kind == "number":
+        return 0.0
+    if kind == "string":
+        value = rng.choice(FIELD_VALUES.get(name, ["Sin especificar"]))
+        return value if value is not None else "Sin especificar"
+    return None
+
+
+# --------------------------------------------------------------------- #
+# HTTP layer
+# --------------------------------------------------------------------- #
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockOpenAI/1.0"
+    state: MockState = None  # set by make_server
+
+    def log_message(self, format, *args):  # silence per-request stderr logs
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.state.lock:
+                self._send_json(200, self.state.stats.as_dict())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        state, cfg = self.state, self.state.config
+        messages = request.get("messages") or [{}]
+        size_latency = cfg.latency_per_1k_tokens * count_tokens(messages[-1].get("content")) / 1000
+        with state.lock:
+            state.stats.requests += 1
+            state.stats.in_flight += 1
+            state.stats.peak_in_flight = max(state.stats.peak_in_flight, state.stats.in_flight)
+            roll = state.rng.random()
+            latency = cfg.sample_latency(state.rng) + size_latency
+            seed = state.rng.random()
+        try:
+            if roll < cfg.rate_limit_rate:
+                with state.lock:
+                    state.stats.rate_limited += 1
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+                    headers={"retry-after-ms": "200"},
+                )
+                return
+            time.sleep(latency)
+            if roll < cfg.rate_limit_rate + cfg.error_rate:
+                with state.lock:
+                    state.stats.errors_injected += 1
+                self._send_json(500, {"error": {"message": "Injected server error (mock)", "type": "server_error"}})
+                return
+            self._send_json(200, self._completion(request, random.Random(seed)))
+        finally:
+            with state.lock:
+                state.stats.in_flight -= 1
+
+    def _completion(self, request: dict, rng: random.Random) -> dict:
+        state = self.state
+        messages = request.get("messages", [])
+        model = request.get("model", "mock")
+        response_format = request.get("response_format") or {}
+
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            content = json.dumps(build_instance(schema, schema, rng, state.config), ensure_ascii=False)
+            structured = True
+        else:
+            content = FREE_TEXT_RESPONSE
+            structured = False
+
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = count_tokens(content)
+        cached = state.cached_tokens_for(messages)
+        with state.lock:
+            stats = state.stats
+            stats.structured_requests += int(structured)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cached_tokens += cached
+            stats.by_model[model] = stats.by_model.get(model, 0) + 1
+
+        return {
+            "id": f"chatcmpl-mock-{rng.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "logprobs": None,
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            },
+        }
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8089, config: Optional[MockConfig] = None) -> ThreadingHTTPServer:
+    """
+    Build (but do not start) a threaded mock server bound to host:port.
+    """
+    state = MockState(config or MockConfig())
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 8089, config: Optional[MockConfig] = None) -> ThreadingHTTPServer:
+    """
+    Start the mock server on a daemon thread and return it.
+    Stop it with `server.shutdown()`.
+    """
+    server = make_server(host, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="OpenAI-compatible mock server for load testing")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--p50", type=float, default=0.8, help="median latency (s)")
+    p.add_argument("--p95", type=float, default=3.0, help="p95 latency (s)")
+    p.add_argument("--p99", type=float, default=8.0, help="p99 latency (s)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    p.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of 429 responses")
+    p.add_argument("--relevant-rate", type=float, default=0.8, help="fraction of hasRelevantActivities=True")
+    p.add_argument("--latency-per-1k-tokens", type=float, default=0.0,
+                   help="extra latency (s) per 1k tokens of the last message, so long rows are slower")
+    p.add_argument("--seed", type=int, default=None)
+    args = p.parse_args()
+
+    config = MockConfig(
+        p50=args.p50, p95=args.p95, p99=args.p99,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        relevant_rate=args.relevant_rate, latency_per_1k_tokens=args.latency_per_1k_tokens,
+        seed=args.seed,
+    )
+    server = make_server(args.host, args.port, config)
+    print(f"Mock OpenAI server on http://{args.host}:{args.port}/v1 ✅")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.state.stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,95 @@
+"""
+Drive `excecute_labeler` against the local mock server at N x a recorded week's volume.
+
+Example:
+    python -m src.loadtest.run_load_test --year 2025 --week 05 --scale 10 --p50 0.5 --p95 2 --p99 6
+
+The recorded week is read from data/to_process, every row is replicated
+`scale` times (with a suffix so the copies survive de-duplication) and the
+pipeline runs inside a scratch working directory, so logs and outputs never
+touch the real data/ and jsondata/ folders.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def build_scaled_week(src_path: str, dst_path: str, scale: int) -> int:
+    """
+    Write a copy of the weekly workbook with every row replicated `scale` times.
+    Returns the number of rows written.
+    """
+    import pandas as pd
+    from src.data_handler import read_data
+
+    df = read_data(src_path)
+    copies = []
+    for k in range(scale):
+        part = df.copy()
+        if k:
+            part["Trabajo_Ejecutado"] = part["Trabajo_Ejecutado"].astype(str) + f" (copia {k})"
+        copies.append(part)
+    scaled = pd.concat(copies, ignore_index=True)
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    scaled.to_excel(dst_path, index=False)
+    return len(scaled)
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Load test the labeler against the mock OpenAI server")
+    p.add_argument("--year", required=True)
+    p.add_argument("--week", required=True)
+    p.add_argument("--scale", type=int, default=10, help="row multiplier (10-100x)")
+    p.add_argument("--base-url", default=None, help="use an already running server instead of starting one")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--p50", type=float, default=0.8)
+    p.add_argument("--p95", type=float, default=3.0)
+    p.add_argument("--p99", type=float, default=8.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0)
+    p.add_argument("--workdir", default=None, help="scratch dir (default: a new temp dir)")
+    args = p.parse_args()
+
+    src_path = os.path.abspath(os.path.join("data", "to_process", f"maintenance_data_{args.year}-{args.week}.xlsx"))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="labeler_load_"))
+
+    server = None
+    if args.base_url is None:
+        from src.loadtest.mock_openai_server import MockConfig, start_in_thread
+        config = MockConfig(
+            p50=args.p50, p95=args.p95, p99=args.p99,
+            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        )
+        server = start_in_thread(port=args.port, config=config)
+        base_url = f"http://127.0.0.1:{args.port}/v1"
+    else:
+        base_url = args.base_url
+
+    # CLIENT is created when src.utils is imported, so configure it first
+    os.environ["LLM_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    dst_path = os.path.join(workdir, "data", "to_process", f"maintenance_data_{args.year}-{args.week}.xlsx")
+    n_rows = build_scaled_week(src_path, dst_path, args.scale)
+    print(f"Scaled week written: {n_rows} raw rows (x{args.scale}) -> {dst_path}")
+
+    from src.orchestrator import excecute_labeler
+
+    os.chdir(workdir)
+    start = time.perf_counter()
+    excecute_labeler(args.year, args.week)
+    elapsed = time.perf_counter() - start
+
+    report = {"year": args.year, "week": args.week, "scale": args.scale,
+              "raw_rows": n_rows, "elapsed_s": round(elapsed, 2), "workdir": workdir}
+    if server is not None:
+        report["server"] = server.state.stats.as_dict()
+        report["requests_per_s"] = round(report["server"]["requests"] / elapsed, 2)
+        server.shutdown()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,432 @@
+"""
+Week manifest: which weeks still need labeling, and why.
+
+A small SQLite table (data/manifest.sqlite) with one row per input week:
+input hash, pipeline and prompt version, overall status, per-stage status
+and timings, and output paths. A week is pending when it was never labeled,
+when its source file changed, when the pipeline/prompt version moved, or
+when its last run failed.
+
+    python -m src.manifest --sync            # register / refresh input weeks
+    python -m src.manifest --pending         # list what is left
+    python -m src.manifest --run             # claim and label weeks until none is left
+
+`claim` is atomic (BEGIN IMMEDIATE), so several workers can share the backlog.
+Every claim carries a lease (DEFAULT_LEASE_S unless given): a week whose
+worker died goes back to the backlog once its lease expires, or to 'failed'
+when it has no attempts left.
+"""
+import os
+import json
+import time
+import socket
+import hashlib
+import sqlite3
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from src.fingerprints import PIPELINE_VERSION
+import src.sqlite_db as sqlite_db
+
+MANIFEST_PATH = os.path.join("data", "manifest.sqlite")
+TO_PROCESS_DIR = os.path.join("data", "to_process")
+PROCESSED_DIR = os.path.join("data", "processed")
+MAX_ATTEMPTS = 3
+# lease of claims made without a heartbeat loop (notebook, run_pending);
+# run_claimed renews it after every stage
+DEFAULT_LEASE_S = 2 * 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS weeks (
+    year             TEXT NOT NULL,
+    week             TEXT NOT NULL,
+    input_path       TEXT NOT NULL,
+    input_size       INTEGER,
+    input_mtime      REAL,
+    input_hash       TEXT,
+    pipeline_version TEXT,
+    prompt_version   TEXT,
+    status           TEXT NOT NULL DEFAULT 'pending',   -- pending | running | done | failed
+    stage_status     TEXT NOT NULL DEFAULT '{}',        -- {stage: "done"}
+    timings          TEXT NOT NULL DEFAULT '{}',        -- {stage: seconds}
+    outputs          TEXT NOT NULL DEFAULT '{}',        -- {output: path}
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    claimed_by       TEXT,
+    claimed_at       REAL,
+    lease_until      REAL,                              -- NULL: claimed before leases (claimed_at + DEFAULT_LEASE_S)
+    heartbeat_at     REAL,
+    updated_at       REAL,
+    error            TEXT,
+    PRIMARY KEY (year, week)
+);
+CREATE INDEX IF NOT EXISTS idx_weeks_status ON weeks (status, year, week);
+"""
+
+# Columns added after the first release of the table: name -> type
+_MIGRATIONS = {"lease_until": "REAL", "heartbeat_at": "REAL"}
+
+# Running weeks whose lease was not renewed in time (their worker died)
+_EXPIRED = "(status = 'running' AND COALESCE(lease_until, claimed_at + :default_lease, 0) < :now)"
+
+# Weeks a worker may pick up: pending, failed with attempts left, or expired
+# with attempts left
+_CLAIMABLE = (
+    "(status = 'pending' OR (status = 'failed' AND attempts < :max_attempts) "
+    f"OR ({_EXPIRED} AND attempts < :max_attempts))"
+)
+
+
+def _params(**extra) -> dict:
+    return {"max_attempts": MAX_ATTEMPTS, "default_lease": DEFAULT_LEASE_S, "now": time.time(), **extra}
+
+
+# --------------------------------------------------------------------- #
+# Versions and hashes
+# --------------------------------------------------------------------- #
+def prompt_version() -> str:
+    """
+    Short hash over the versions of every prompt stage (the prompts and
+    few-shot examples a stage actually sends, see src.prompts.STAGE_DEPENDENCIES)
+    and the knowledge tables (src/tables) the post-processing uses.
+    """
+    import src.prompts as P
+    import src.knowledge as knowledge
+
+    payload = json.dumps(
+        [P.stage_versions(), knowledge.current().hash],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _week_of(fname: str) -> Optional[Tuple[str, str]]:
+    """maintenance_data_<YYYY>-<WW>.xlsx -> (YYYY, WW)"""
+    if not (fname.startswith("maintenance_data_") and fname.endswith(".xlsx")):
+        return None
+    year, _, week = fname[len("maintenance_data_"):-len(".xlsx")].partition("-")
+    return (year, week) if year and week else None
+
+
+# --------------------------------------------------------------------- #
+# Connection
+# --------------------------------------------------------------------- #
+def connect(path: str = MANIFEST_PATH, shared: bool = None) -> sqlite3.Connection:
+    """
+    Open (and create) the manifest. Autocommit mode: writes that must be
+    atomic open their own BEGIN IMMEDIATE transaction.
+    A manifest on a network filesystem needs `shared` (see src.sqlite_db).
+    """
+    conn = sqlite_db.connect(path, shared, isolation_level=None)
+    conn.executescript(_SCHEMA)
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(weeks)")}
+    for column, kind in _MIGRATIONS.items():
+        if column not in columns:
+            conn.execute(f"ALTER TABLE weeks ADD COLUMN {column} {kind}")
+    return conn
+
+
+class _immediate:
+    """BEGIN IMMEDIATE ... COMMIT / ROLLBACK: takes the write lock up front."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+# --------------------------------------------------------------------- #
+# Discovery
+# --------------------------------------------------------------------- #
+def sync_inputs(conn: sqlite3.Connection, to_process_dir: str = TO_PROCESS_DIR) -> Dict[str, int]:
+    """
+    Register every input week and send back to 'pending' the ones whose
+    source file, pipeline version or prompt version changed. Files are only
+    re-hashed when their size or mtime moved.
+    """
+    versions = (PIPELINE_VERSION, prompt_version())
+    # deferred: changed while running; picked up again by a later sync
+    counts = {"new": 0, "changed": 0, "deferred": 0, "unchanged": 0, "expired": expire_leases(conn)}
+    known = {(r["year"], r["week"]): r for r in conn.execute("SELECT * FROM weeks")}
+
+    for fname in sorted(os.listdir(to_process_dir)):
+        key = _week_of(fname)
+        if key is None:
+            continue
+        path = os.path.join(to_process_dir, fname)
+        stat = os.stat(path)
+        row = known.get(key)
+        same_file = row is not None and (row["input_size"], row["input_mtime"]) == (stat.st_size, stat.st_mtime)
+        if same_file and (row["pipeline_version"], row["prompt_version"]) == versions:
+            counts["unchanged"] += 1
+            continue
+        input_hash = row["input_hash"] if same_file else file_hash(path)
+
+        now = time.time()
+        with _immediate(conn):
+            if row is None:
+                # weeks labeled before the manifest existed count as done
+                processed = os.path.join(PROCESSED_DIR, f"maintenance_records_{key[0]}-{key[1]}.xlsx")
+                conn.execute(
+                    "INSERT INTO weeks (year, week, input_path, input_size, input_mtime, input_hash, "
+                    "pipeline_version, prompt_version, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key, path, stat.st_size, stat.st_mtime, input_hash, *versions,
+                     "done" if os.path.exists(processed) else "pending", now),
+                )
+                counts["new"] += 1
+            elif (input_hash, row["pipeline_version"], row["prompt_version"]) != (row["input_hash"], *versions):
+                # never reset a week a worker is currently running
+                cur = conn.execute(
+                    "UPDATE weeks SET input_path = ?, input_size = ?, input_mtime = ?, input_hash = ?, "
+                    "pipeline_version = ?, prompt_version = ?, status = 'pending', stage_status = '{}', "
+                    "attempts = 0, error = NULL, updated_at = ? WHERE year = ? AND week = ? AND status != 'running'",
+                    (path, stat.st_size, stat.st_mtime, input_hash, *versions, now, *key),
+                )
+                counts["changed" if cur.rowcount == 1 else "deferred"] += 1
+            else:
+                # touched but identical content
+                conn.execute(
+                    "UPDATE weeks SET input_size = ?, input_mtime = ? WHERE year = ? AND week = ?",
+                    (stat.st_size, stat.st_mtime, *key),
+                )
+                counts["unchanged"] += 1
+    return counts
+
+
+def pending(conn: sqlite3.Connection, limit: int = None) -> List[Tuple[str, str]]:
+    """Weeks left to label, most recent first."""
+    sql = f"SELECT year, week FROM weeks WHERE {_CLAIMABLE} ORDER BY year DESC, week DESC"
+    params = _params()
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return [(r["year"], r["week"]) for r in conn.execute(sql, params)]
+
+
+# --------------------------------------------------------------------- #
+# Claim / progress
+# --------------------------------------------------------------------- #
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _expire(conn: sqlite3.Connection, params: dict) -> int:
+    cur = conn.execute(
+        f"UPDATE weeks SET status = 'failed', error = 'lease expired after ' || attempts || ' attempts', "
+        f"updated_at = :now WHERE {_EXPIRED} AND attempts >= :max_attempts",
+        params,
+    )
+    return cur.rowcount
+
+
+def expire_leases(conn: sqlite3.Connection) -> int:
+    """Mark as failed the expired weeks with no attempts left. Returns how many."""
+    with _immediate(conn):
+        return _expire(conn, _params())
+
+
+def claim(
+    conn: sqlite3.Connection,
+    worker: str = None,
+    year: str = None,
+    week: str = None,
+    lease_s: float = DEFAULT_LEASE_S,
+) -> Optional[Tuple[str, str]]:
+    """
+    Atomically move one claimable week (the given one, or the most recent)
+    to 'running'. Returns (year, week), or None when nothing is left.
+    The claim expires after `lease_s` unless renewed with `heartbeat`.
+    """
+    worker = worker or worker_name()
+    params = _params(year=year, week=week)
+    now = params["now"]
+    with _immediate(conn):
+        _expire(conn, params)
+        if year is not None and week is not None:
+            row = conn.execute(
+                f"SELECT year, week FROM weeks WHERE year = :year AND week = :week AND {_CLAIMABLE}", params
+            ).fetchone()
+        else:
+            row = conn.execute(
+                f"SELECT year, week FROM weeks WHERE {_CLAIMABLE} ORDER BY year DESC, week DESC LIMIT 1", params
+            ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE weeks SET status = 'running', claimed_by = ?, claimed_at = ?, updated_at = ?, "
+            "lease_until = ?, heartbeat_at = ?, attempts = attempts + 1, error = NULL "
+            "WHERE year = ? AND week = ?",
+            (worker, now, now, now + lease_s, now, row["year"], row["week"]),
+        )
+    return row["year"], row["week"]
+
+
+def heartbeat(conn: sqlite3.Connection, year: str, week: str, worker: str, lease_s: float) -> bool:
+    """
+    Renew the lease of a week this worker is running.
+    Returns False when the lease was lost (expired and claimed by someone else).
+    """
+    now = time.time()
+    cur = conn.execute(
+        "UPDATE weeks SET lease_until = ?, heartbeat_at = ? "
+        "WHERE year = ? AND week = ? AND claimed_by = ? AND status = 'running'",
+        (now + lease_s, now, year, week, worker),
+    )
+    return cur.rowcount == 1
+
+
+def _update_json(conn: sqlite3.Connection, year: str, week: str, worker: str, **updates) -> bool:
+    """
+    Merge dicts into the JSON columns of one week, atomically, while `worker`
+    holds its claim. Returns False (and changes nothing) otherwise.
+    """
+    with _immediate(conn):
+        row = conn.execute(
+            f"SELECT {', '.join(updates)} FROM weeks WHERE year = ? AND week = ? AND claimed_by = ?",
+            (year, week, worker),
+        ).fetchone()
+        if row is None:
+            return False
+        values = []
+        for column, patch in updates.items():
+            merged = json.loads(row[column] or "{}")
+            merged.update(patch)
+            values.append(json.dumps(merged, ensure_ascii=False))
+        assignments = ", ".join(f"{column} = ?" for column in updates)
+        conn.execute(
+            f"UPDATE weeks SET {assignments}, updated_at = ? WHERE year = ? AND week = ? AND claimed_by = ?",
+            (*values, time.time(), year, week, worker),
+        )
+    return True
+
+
+def mark_stage(
+    conn: sqlite3.Connection, year: str, week: str, stage: str, seconds: float = None, worker: str = None
+) -> bool:
+    """Record a finished stage. Returns False when `worker` no longer holds the claim."""
+    updates = {"stage_status": {stage: "done"}}
+    if seconds is not None:
+        updates["timings"] = {stage: round(seconds, 2)}
+    return _update_json(conn, year, week, worker or worker_name(), **updates)
+
+
+def mark_done(conn: sqlite3.Connection, year: str, week: str, outputs: Dict[str, str] = None, worker: str = None) -> bool:
+    """
+    Record a finished week. Returns False (and changes nothing) when `worker`
+    no longer holds the claim: its lease expired and another worker took it.
+    """
+    worker = worker or worker_name()
+    with _immediate(conn):
+        row = conn.execute(
+            "SELECT outputs FROM weeks WHERE year = ? AND week = ? AND claimed_by = ?", (year, week, worker)
+        ).fetchone()
+        if row is None:
+            return False
+        merged = json.loads(row["outputs"] or "{}")
+        merged.update(outputs or {})
+        conn.execute(
+            "UPDATE weeks SET status = 'done', outputs = ?, error = NULL, updated_at = ? "
+            "WHERE year = ? AND week = ? AND claimed_by = ?",
+            (json.dumps(merged, ensure_ascii=False), time.time(), year, week, worker),
+        )
+    return True
+
+
+def mark_failed(conn: sqlite3.Connection, year: str, week: str, error: str, worker: str = None) -> bool:
+    """Record a failed attempt. Returns False when `worker` no longer holds the claim."""
+    cur = conn.execute(
+        "UPDATE weeks SET status = 'failed', error = ?, updated_at = ? WHERE year = ? AND week = ? AND claimed_by = ?",
+        (error[:2000], time.time(), year, week, worker or worker_name()),
+    )
+    return cur.rowcount == 1
+
+
+def week_status(conn: sqlite3.Connection, year: str, week: str) -> Optional[dict]:
+    row = conn.execute("SELECT * FROM weeks WHERE year = ? AND week = ?", (year, week)).fetchone()
+    if row is None:
+        return None
+    entry = dict(row)
+    for column in ("stage_status", "timings", "outputs"):
+        entry[column] = json.loads(entry[column] or "{}")
+    return entry
+
+
+# --------------------------------------------------------------------- #
+# Running
+# --------------------------------------------------------------------- #
+def run_claimed(
+    conn: sqlite3.Connection,
+    year: str,
+    week: str,
+    worker: str = None,
+    lease_s: float = DEFAULT_LEASE_S,
+    **labeler_kwargs,
+) -> bool:
+    """
+    Label one week claimed by `worker`, recording stage progress in the
+    manifest and renewing the lease after every stage.
+    Returns True on success; failures are stored and not re-raised.
+    """
+    from src.orchestrator import excecute_labeler
+
+    worker = worker or worker_name()
+
+    def on_stage(stage: str, seconds: float) -> None:
+        mark_stage(conn, year, week, stage, seconds, worker)
+        heartbeat(conn, year, week, worker, lease_s)
+
+    try:
+        outputs = excecute_labeler(year, week, on_stage=on_stage, **labeler_kwargs)
+    except Exception as e:
+        mark_failed(conn, year, week, f"{type(e).__name__}: {e}", worker)
+        print(f"Week {year}-{week} failed: {e} ❌")
+        return False
+    if not mark_done(conn, year, week, outputs, worker):
+        print(f"Week {year}-{week} finished after its claim was taken over, result not recorded ❌")
+        return False
+    return True
+
+
+def run_pending(conn: sqlite3.Connection, worker: str = None, **labeler_kwargs) -> int:
+    """Claim and label weeks until none is left. Returns the number of weeks done."""
+    done = 0
+    while True:
+        claimed = claim(conn, worker)
+        if claimed is None:
+            return done
+        done += run_claimed(conn, *claimed, worker=worker, **labeler_kwargs)
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Week manifest for the maintenance_labeler backlog")
+    p.add_argument("--db", default=MANIFEST_PATH)
+    p.add_argument("--sync", action="store_true", help="register / refresh input weeks")
+    p.add_argument("--pending", action="store_true", help="list weeks left to label")
+    p.add_argument("--run", action="store_true", help="claim and label pending weeks")
+    args = p.parse_args()
+
+    conn = connect(args.db)
+    if args.sync or args.run:
+        print(f"Manifest synced: {sync_inputs(conn)}")
+    if args.pending:
+        for year, week in pending(conn):
+            print(f"{year}-{week}")
+    if args.run:
+        print(f"Weeks labeled: {run_pending(conn)} ✅")
+
+
+if __name__ == "__main__":
+    _cli()
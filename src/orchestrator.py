@@ -1,60 +1,173 @@
 import os
+import time
 import argparse
-from src.utils import timeit
-from src.schemas import FinalMaintenanceRecord
+from typing import Callable, Dict
+from src.utils import timeit, get_log_dir, concurrency_stats, run_context, llm_calls
+from src.llm_metrics import save_metrics
+import src.preclassifier as preclassifier
+import src.record_store as record_store
+import src.parquet_export as parquet_export
+import src.interval_index as interval_index
+import src.reliability as reliability
+import src.knowledge as knowledge
+import src.prompts as P
+import src.stage_cache as stage_cache
+from src.llm_router import save_escalations
+from src.schemas import FinalMaintenanceRecord, SimpleMaintenanceRecord, MaintenanceRecord, trusted
+from src.fingerprints import (
+    week_fingerprints,
+    load_previous_week,
+    diff_fingerprints,
+    merge_rows,
+    save_fingerprints,
+    invalidate_fingerprints,
+    piece_hashes,
+    stale_phases,
+)
 
-def setup_log_dir(year: str, week: str):
+def setup_log_dir(year: str, week: str) -> str:
     """
-    Create logs/<year>/week_<week> and expose it via LOG_DIR.
+    Log folder of a week: logs/<year>/week_<week>.
     """
-    log_dir = os.path.join("logs", year, f"week_{week}")
-    os.makedirs(log_dir, exist_ok=True)
-    os.environ["LOG_DIR"] = log_dir
+    return os.path.join("logs", year, f"week_{week}")
     
+def _final_record(record, row) -> FinalMaintenanceRecord:
+    """
+    Final record of one processed row (`row` is the DataFrame row).
+    """
+    return trusted(
+        FinalMaintenanceRecord,
+        unit_id=row["UnitId"],
+        start_time=str(row["start_time"]),
+        end_time=str(row["end_time"]),
+        
+        detention_type=record.detention_type,
+        is_scheduled=record.is_scheduled,
+        scheduled_type=record.scheduled_type,
+        
+        has_inspection=record.has_inspection,
+        has_refill=record.has_refill,
+        has_repair=record.has_repair,
+        has_replacement=record.has_replacement,
+        has_other=record.has_other,
+        has_critical_change=record.has_critical_change,
+        
+        summary=record.summary,
+        jobs=record.jobs
+    )
+
 def _assign_final_records(records, df):
     """
     Assigns final records to the DataFrame based on the row index.
     """
-    final_records = []
-    for idx, record in enumerate(records):
-        row = df.iloc[idx]
-        
-        final_record = FinalMaintenanceRecord(
-            unit_id=row["UnitId"],
-            start_time=str(row["start_time"]),
-            end_time=str(row["end_time"]),
-            
-            detention_type=record.detention_type,
-            is_scheduled=record.is_scheduled,
-            scheduled_type=record.scheduled_type,
-            
-            has_inspection=record.has_inspection,
-            has_refill=record.has_refill,
-            has_repair=record.has_repair,
-            has_replacement=record.has_replacement,
-            has_other=record.has_other,
-            has_critical_change=record.has_critical_change,
-            
-            summary=record.summary,
-            jobs=record.jobs
-        )
-        final_records.append(final_record)
-    
-    return final_records    
+    return [_final_record(record, df.iloc[idx]) for idx, record in enumerate(records)]
+
+
+def _upsert_record_store(year: str, week: str, final_records) -> Dict[str, str]:
+    conn = record_store.connect()
+    try:
+        record_store.upsert_week(conn, year, week, final_records)
+    finally:
+        conn.close()
+    return {"record_store": record_store.STORE_PATH}
+
+
+def _update_interval_index(year: str, week: str, final_records) -> Dict[str, str]:
+    return {"interval_index": interval_index.update_week(year, week, final_records)}
+
+
+def _update_reliability(year: str, week: str, final_records) -> Dict[str, str]:
+    conn = reliability.connect()
+    try:
+        reliability.update_week(conn, year, week, final_records)
+    finally:
+        conn.close()
+    return {"reliability": reliability.STORE_PATH}
+
+
+def _export_parquet(year: str, week: str, final_records) -> Dict[str, str]:
+    if not parquet_export.available():
+        print('pyarrow not installed, Parquet export skipped.')
+        return {}
+    return {f"parquet_{name}": path for name, path in parquet_export.export_week(year, week, final_records).items()}
+
+
+# Stores derived from jsondata/final_records: (name, writer, command that rebuilds it)
+DERIVED_STORES = [
+    ("record_store", _upsert_record_store, "python -m src.record_store --backfill"),
+    ("interval_index", _update_interval_index, "python -m src.interval_index --backfill"),
+    ("reliability", _update_reliability, "python -m src.reliability --rebuild"),
+    ("parquet", _export_parquet, "python -m src.parquet_export --backfill"),
+]
+
+
+def _update_stores(year: str, week: str, final_records):
+    """
+    Write the week's final records to every derived store. Each store is
+    written on its own: a failure is reported and the other stores are still
+    written. Returns (outputs, {store: error} of the failed ones).
+    """
+    outputs, failed = {}, {}
+    for name, write, rebuild in DERIVED_STORES:
+        try:
+            outputs.update(write(year, week, final_records))
+        except Exception as e:
+            failed[name] = f"{type(e).__name__}: {e}"
+            print(f"Updating {name} failed: {failed[name]} (rebuild it with `{rebuild}`)")
+    return outputs, failed
     
 
 
-@timeit("full_cycle.json")
-def excecute_labeler(year: str, week: str):
+def excecute_labeler(
+    year: str, 
+    week: str, 
+    fast_mode: bool = False, 
+    scheduling: str = "index",
+    incremental: bool = True,
+    on_stage: Callable[[str, float], None] = None,
+) -> Dict[str, str]:
     """
     Run the weekly maintenance_labeler pipeline for the given year and ISO-week.
+    fast_mode=True generates simple records with one fused call per row,
+    falling back to the full chain when its checks fail.
+    scheduling sets the row dispatch order: "index" (original order, default),
+    "length" or "relevance" (most expensive rows first, shorter makespan).
+    incremental=True only relabels rows whose fingerprint changed since the
+    previous run of the week and reuses the rest of its outputs; after a
+    prompt edit the rows go through the phases downstream of it again, but
+    only the edited stage and its dependents (see src.prompts.STAGE_DEPENDENCIES)
+    call the LLM, the other stages are answered by src.stage_cache.
+    on_stage(stage, seconds) is called as each stage completes (see src.manifest).
+    Returns the paths of the week's outputs.
     """
-    # 1) Setup logging/timing folder
-    setup_log_dir(year, week)
+    # 1) Setup logging/timing folder: every log helper called inside the
+    # run (row tasks included) writes to this week's folder
+    with run_context(setup_log_dir(year, week)):
+        return _run_week(year, week, fast_mode, scheduling, incremental, on_stage)
+
+
+# timed inside the week's run_context, under the entry point's name
+@timeit("full_cycle.json", label="excecute_labeler")
+def _run_week(
+    year: str,
+    week: str,
+    fast_mode: bool,
+    scheduling: str,
+    incremental: bool,
+    on_stage: Callable[[str, float], None],
+) -> Dict[str, str]:
     print(f'Year: {year}, Week: {week}')
+    outputs = {}
+    stage_start = [time.perf_counter()]
 
-    # 2) Import downstream modules only after LOG_DIR is set
-    from src.data_handler import read_and_process_data, save_results, save_data
+    def stage_done(stage: str) -> None:
+        now = time.perf_counter()
+        if on_stage is not None:
+            on_stage(stage, now - stage_start[0])
+        stage_start[0] = now
+
+    # 2) Import downstream modules
+    from src.data_handler import read_and_process_data, save_results, save_data, JsonlResultsWriter
     from src.llm_apply.generate_simple_records import generate_maintenance_records
     from src.llm_apply.record_summarization import generate_records
 
@@ -66,24 +179,62 @@ def excecute_labeler(year: str, week: str):
         f"maintenance_data_{year}-{week}.xlsx"
     )
     df = read_and_process_data(excel_path_in, year, week)
+    if preclassifier.load_classifier():
+        print('Relevance pre-classifier loaded ✅')
+    stage_done("ingest")
+
+    # Pick up edited knowledge tables; the whole week runs against this version
+    knowledge.refresh(force=True)
+    print(f'Knowledge tables: {knowledge.current().hash}')
+
+    # Only new or changed rows go through the LLM stages
+    fingerprints = week_fingerprints(df)
+    stages = P.stage_versions()
+    previous = load_previous_week(year, week) if incremental else None
+    reused, pending = diff_fingerprints(fingerprints, previous)
+    # ... and a prompt edit reruns the persisted phases downstream of it
+    rerun = stale_phases(previous, stages, fast_mode)
+    cached_calls = stage_cache.begin_week(year, week, stages, reuse=incremental)
+    if "simple_records" in rerun:
+        reused, pending = {}, list(range(len(df)))
+    record_reused, record_pending = ({}, list(range(len(df)))) if "records" in rerun else (reused, pending)
+    if previous is not None:
+        if rerun:
+            print(f'Prompt stages changed: {P.stages_to_rerun(previous["stage_versions"], stages)} -> rerunning {rerun} '
+                  f'({cached_calls} stored stage outputs still valid)')
+        print(f'Reusing {len(reused)} unchanged rows, relabeling {len(pending)} ⏳')
+    invalidate_fingerprints(year, week)
 
     # 4) Run your LLM-based transformations and save the results
     max_retries = 3
     for attempt in range(1, max_retries + 1):
         try:
             print('Generating simple records... ⏳')
-            simple_records = generate_maintenance_records(df["observation"])
-            save_results(simple_records, year, week, "jsondata/simple_records")
+            new_simple = generate_maintenance_records(df["observation"].iloc[pending], fast_mode=fast_mode, scheduling=scheduling)
+            simple_records = merge_rows(len(df), pending, new_simple, reused, previous and previous["simple_records"], SimpleMaintenanceRecord)
+            outputs["simple_records"] = save_results(simple_records, year, week, "jsondata/simple_records")
             print('Simple records generated! ✅')
+            stage_done("simple_records")
 
             # 5) Persist the outputs however you like
             print('Generating final records... ⏳')
-            records = generate_records(simple_records)
-            save_results(records, year, week, "jsondata/records")
-            
+            # final records stream to JSONL as each row finishes (own folder: consumers
+            # of jsondata/final_records expect only the per-week JSON files there)
+            with JsonlResultsWriter(year, week, "jsondata/final_records_stream") as stream:
+                write_final = lambda row, record: stream.write(row, _final_record(record, df.iloc[row]))
+                new_records = generate_records(
+                    [simple_records[i] for i in record_pending], row_ids=record_pending,
+                    on_result=write_final, scheduling=scheduling,
+                )
+                records = merge_rows(len(df), record_pending, new_records, record_reused, previous and previous["records"], MaintenanceRecord)
+                for row in record_reused:
+                    write_final(row, records[row])
+            outputs["final_records_jsonl"] = stream.path
+            outputs["records"] = save_results(records, year, week, "jsondata/records")
+            stage_done("records")
             
             final_records = _assign_final_records(records, df)
-            save_results(final_records, year, week, "jsondata/final_records")
+            outputs["final_records"] = save_results(final_records, year, week, "jsondata/final_records")
             print('Final records generated! ✅')
             break
         except Exception as e:
@@ -93,6 +244,13 @@ def excecute_labeler(year: str, week: str):
                 raise
             else:
                 print("Retrying...")
+
+    # Derived stores, outside the retry loop: a store failure never reruns the LLM stages
+    stored, failed_stores = _update_stores(year, week, final_records)
+    outputs.update(stored)
+    outputs["stage_outputs"] = stage_cache.save_week(year, week)
+    outputs["fingerprints"] = save_fingerprints(fingerprints, year, week, piece_hashes(simple_records), stages, fast_mode)
+    stage_done("final_records")
          
     # 5) Save the processed DataFrame to an Excel file       
     excel_path_out = os.path.join(
@@ -101,7 +259,33 @@ def excecute_labeler(year: str, week: str):
         f"maintenance_records_{year}-{week}.xlsx"
     )
     save_data(file_path=excel_path_out, df=df)
+    outputs["processed_data"] = excel_path_out
     print(f'Data processed loaded! ( {df.shape[0]}  rows )✅')
+    stage_done("processed_data")
+
+    # 6) Token / cost / latency rollup per stage
+    rollup = save_metrics(get_log_dir(), llm_calls().snapshot())
+    total = rollup.get("__total__")
+    if total:
+        print(f'LLM calls: {total["calls"]} | tokens in/out: {total["prompt_tokens"]}/{total["completion_tokens"]} '
+              f'| cached: {total["cache_hit_rate"]:.1%} | cost: ${total["cost_usd"]:.4f} | p95: {total["latency_p95_s"]:.2f}s')
+    conc = concurrency_stats()
+    print(f'Peak concurrency: {conc["peak_active_tasks"]} tasks on {conc["workers"]} workers (+ caller), '
+          f'{conc["peak_inflight_llm"]}/{conc["max_inflight_llm"]} LLM requests in flight')
+    escalations = save_escalations(get_log_dir())
+    escalated = {stage: s["escalation_rate"] for stage, s in escalations.items() if s["escalated"]}
+    if escalated:
+        print(f'Escalation rates per stage: {escalated}')
+    if stage_cache.calls_reused():
+        print(f'Stage outputs reused: {stage_cache.calls_reused()} LLM calls answered from the stage cache')
+    skipped = preclassifier.get_stats()
+    if skipped["skipped_rows"]:
+        print(f'Pre-classifier skipped {skipped["skipped_rows"]} rows (~{skipped["calls_saved"]} LLM calls saved)')
+    outputs["log_dir"] = get_log_dir()
+    if failed_stores:
+        # the week's results and fingerprints are saved: a rerun reuses every row
+        raise RuntimeError(f"Week {year}-{week} labeled, but these stores were not updated: {failed_stores}")
+    return outputs
     
     
     
@@ -111,8 +295,12 @@ def _cli():
     )
     p.add_argument("--year",  required=True, help="YYYY (e.g. 2025)")
     p.add_argument("--week",  required=True, help="ISO week number 01–53")
+    p.add_argument("--fast", action="store_true", help="single-call simple records with full-chain fallback")
+    p.add_argument("--scheduling", default="index", choices=["index", "length", "relevance"],
+                   help="row dispatch order (results keep the original order)")
+    p.add_argument("--full", action="store_true", help="relabel every row, ignoring previous outputs")
     args = p.parse_args()
-    excecute_labeler(args.year, args.week)
+    excecute_labeler(args.year, args.week, fast_mode=args.fast, scheduling=args.scheduling, incremental=not args.full)
 
 if __name__ == "__main__":
     _cli()
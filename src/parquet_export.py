@@ -0,0 +1,140 @@
+"""
+Parquet export of final records.
+
+Two hive-partitioned datasets under data/parquet, linked by record_id:
+    records/year=<YYYY>/week=<WW>/part-0.parquet   one row per FinalMaintenanceRecord
+    jobs/year=<YYYY>/week=<WW>/part-0.parquet      one row per job (flattened)
+
+Categorical columns (unit, detention and scheduled type, system, subsystem,
+component, job_type, criticity) are dictionary-encoded; files are
+zstd-compressed. Read with predicate pushdown, e.g.:
+    read_dataset("jobs", filters=[("criticity", "=", "Alta"), ("year", "=", 2025)])
+
+pyarrow is optional: without it the export is skipped.
+    python -m src.parquet_export --backfill
+"""
+import os
+import json
+import argparse
+from typing import Dict, List
+
+from src.data_handler import iter_results
+from src.fingerprints import record_ids
+
+EXPORT_DIR = os.path.join("data", "parquet")
+FINAL_RECORDS_DIR = os.path.join("jsondata", "final_records")
+
+RECORD_CATEGORICALS = ["unit_id", "detention_type", "scheduled_type"]
+JOB_CATEGORICALS = ["unit_id", "system", "subsystem", "component", "job_type", "criticity"]
+_FLAGS = ["has_inspection", "has_refill", "has_repair", "has_replacement", "has_other", "has_critical_change"]
+
+
+def available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _tables(records: List[dict]):
+    """(records table, jobs table) for one week of final records given as dicts."""
+    import pyarrow as pa
+
+    ids = record_ids(records)
+    starts = pa.array([r["start_time"] for r in records], pa.string()).cast(pa.timestamp("s"))
+    ends = pa.array([r["end_time"] for r in records], pa.string()).cast(pa.timestamp("s"))
+    columns = {
+        "record_id": pa.array(ids, pa.string()),
+        "unit_id": pa.array([r["unit_id"] for r in records], pa.string()),
+        "start_time": starts,
+        "end_time": ends,
+        "detention_type": pa.array([r["detention_type"] for r in records], pa.string()),
+        "is_scheduled": pa.array([r["is_scheduled"] for r in records], pa.bool_()),
+        "scheduled_type": pa.array([r.get("scheduled_type") for r in records], pa.string()),
+        **{flag: pa.array([r[flag] for r in records], pa.bool_()) for flag in _FLAGS},
+        "summary": pa.array([r["summary"] for r in records], pa.string()),
+        "n_jobs": pa.array([len(r["jobs"]) for r in records], pa.int16()),
+    }
+    for name in RECORD_CATEGORICALS:
+        columns[name] = columns[name].dictionary_encode()
+    records_table = pa.table(columns)
+
+    job_rows = [
+        (rid, i, r, j)
+        for rid, r in zip(ids, records)
+        for i, j in enumerate(r["jobs"])
+    ]
+    job_columns = {
+        "record_id": pa.array([rid for rid, _, _, _ in job_rows], pa.string()),
+        "job_idx": pa.array([i for _, i, _, _ in job_rows], pa.int16()),
+        "unit_id": pa.array([r["unit_id"] for _, _, r, _ in job_rows], pa.string()),
+        "start_time": pa.array([r["start_time"] for _, _, r, _ in job_rows], pa.string()).cast(pa.timestamp("s")),
+        **{
+            field: pa.array([j.get(field) for _, _, _, j in job_rows], pa.string())
+            for field in ("system", "subsystem", "component", "detail", "job_type", "job_comment", "criticity", "ot_number")
+        },
+        "critical_change": pa.array([j["critical_change"] for _, _, _, j in job_rows], pa.bool_()),
+        "liters": pa.array([j.get("liters") for _, _, _, j in job_rows], pa.int32()),
+    }
+    for name in JOB_CATEGORICALS:
+        job_columns[name] = job_columns[name].dictionary_encode()
+    return records_table, pa.table(job_columns)
+
+
+def _write(table, path: str) -> None:
+    """Write atomically (temp file + rename), so readers never see half a partition."""
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def export_week(year: str, week: str, final_records: List, out_dir: str = EXPORT_DIR) -> Dict[str, str]:
+    """
+    Write (or overwrite) the week's partition of both datasets.
+    Returns {"records": path, "jobs": path}.
+    """
+    payload = [r if isinstance(r, dict) else r.model_dump() for r in final_records]
+    records_table, jobs_table = _tables(payload)
+    paths = {}
+    for name, table in (("records", records_table), ("jobs", jobs_table)):
+        paths[name] = os.path.join(out_dir, name, f"year={year}", f"week={week}", "part-0.parquet")
+        _write(table, paths[name])
+    return paths
+
+
+def read_dataset(name: str, filters=None, columns: List[str] = None, out_dir: str = EXPORT_DIR):
+    """
+    Read "records" or "jobs" as a pyarrow Table; `filters` (DNF tuples, also on
+    the year/week partition keys) are pushed down to partitions and row groups.
+    """
+    import pyarrow.parquet as pq
+
+    return pq.read_table(os.path.join(out_dir, name), filters=filters, columns=columns, partitioning="hive")
+
+
+def backfill(final_dir: str = FINAL_RECORDS_DIR, out_dir: str = EXPORT_DIR) -> int:
+    """Export every week in jsondata/final_records. Returns the number of weeks."""
+    weeks = 0
+    for year, week, path in iter_results(final_dir):
+        with open(path, "r", encoding="utf-8") as f:
+            export_week(year, week, json.load(f), out_dir)
+        weeks += 1
+    return weeks
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Parquet export of final records")
+    p.add_argument("--backfill", action="store_true", required=True, help="export every labeled week")
+    p.add_argument("--out", default=EXPORT_DIR)
+    args = p.parse_args()
+    if not available():
+        raise SystemExit("pyarrow is required for the Parquet export (pip install pyarrow).")
+    print(f"Exported {backfill(out_dir=args.out)} weeks to {args.out} ✅")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,209 @@
+"""
+Local relevance pre-classifier.
+
+A TF-IDF + calibrated logistic-regression model trained on historical
+pipeline outputs (a row is relevant when its simple record kept at least
+one job). When it is very confident that an observation is irrelevant, the
+row skips the LLM chain entirely.
+
+Train / refresh the model:
+    python -m src.preclassifier --train
+
+scikit-learn is only needed to train or load the model; without it (or
+without a trained model on disk) the pipeline runs exactly as before.
+"""
+import os
+import json
+import argparse
+import threading
+from typing import List, Optional, Tuple
+
+MODEL_PATH = os.path.join("models", "relevance_classifier.joblib")
+IRRELEVANT_THRESHOLD = 0.97   # P(irrelevant) needed to skip a row
+MIN_OBSERVATION_LENGTH = 40   # shorter rows never reach the LLM anyway
+
+_classifier = None
+_scores = {}   # observation -> P(irrelevant), filled in one vectorized pass by prime()
+_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------- #
+# Training
+# --------------------------------------------------------------------- #
+def load_training_data(
+    processed_dir: str = os.path.join("data", "processed"),
+    simple_dir: str = os.path.join("jsondata", "simple_records"),
+) -> Tuple[List[str], List[int]]:
+    """
+    Pair every processed week (data/processed/maintenance_records_<Y>-<W>.xlsx)
+    with its simple records (jsondata/simple_records/maintenance_records_<Y>_<W>.json).
+    Label 1 = relevant (the record has jobs), 0 = irrelevant.
+    """
+    import pandas as pd
+
+    texts, labels = [], []
+    for fname in sorted(os.listdir(processed_dir)):
+        if not fname.endswith(".xlsx"):
+            continue
+        year_week = fname.rsplit("_", 1)[-1].replace(".xlsx", "")
+        year, week = year_week.split("-")
+        simple_path = os.path.join(simple_dir, f"maintenance_records_{year}_{week}.json")
+        if not os.path.exists(simple_path):
+            continue
+        df = pd.read_excel(os.path.join(processed_dir, fname))
+        with open(simple_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if len(records) != len(df):
+            print(f"Skipping {year}-{week}: {len(df)} rows vs {len(records)} records")
+            continue
+        for observation, record in zip(df["observation"].fillna(""), records):
+            if len(observation) < MIN_OBSERVATION_LENGTH:
+                continue
+            texts.append(observation)
+            labels.append(int(len(record.get("jobs", [])) > 0))
+    return texts, labels
+
+
+def build_model():
+    """TF-IDF (char n-grams, robust to typos) + sigmoid-calibrated logistic regression."""
+    from sklearn.pipeline import make_pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.calibration import CalibratedClassifierCV
+
+    return make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), min_df=2, sublinear_tf=True),
+        CalibratedClassifierCV(
+            LogisticRegression(max_iter=1000, class_weight="balanced"),
+            method="sigmoid",
+            cv=5,
+            ensemble=False,  # one calibrated model at inference time, not five
+        ),
+    )
+
+
+def train(texts: List[str], labels: List[int], path: str = MODEL_PATH, threshold: float = IRRELEVANT_THRESHOLD) -> dict:
+    """
+    Evaluate on a stratified 20% hold-out, then refit on everything and persist.
+    Returns the hold-out report.
+    """
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    x_train, x_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=0.2, stratify=labels, random_state=0
+    )
+    model = build_model().fit(x_train, y_train)
+    p_irrelevant = model.predict_proba(x_test)[:, list(model.classes_).index(0)]
+    skipped = [y for y, p in zip(y_test, p_irrelevant) if p >= threshold]
+    report = {
+        "rows": len(texts),
+        "relevant_share": round(sum(labels) / len(labels), 4),
+        "holdout_accuracy": round(model.score(x_test, y_test), 4),
+        "threshold": threshold,
+        "holdout_skip_rate": round(len(skipped) / len(y_test), 4),
+        "holdout_skipped_relevant": int(sum(skipped)),
+    }
+
+    model = build_model().fit(texts, labels)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump(model, path)
+    return report
+
+
+# --------------------------------------------------------------------- #
+# Inference
+# --------------------------------------------------------------------- #
+def load_classifier(path: str = MODEL_PATH) -> bool:
+    """
+    Load the persisted model if present. Returns True when the classifier is active.
+    """
+    global _classifier
+    if not os.path.exists(path):
+        return False
+    try:
+        import joblib
+    except ImportError:
+        print("scikit-learn not installed, pre-classifier disabled.")
+        return False
+    with _lock:
+        _classifier = joblib.load(path)
+        _scores.clear()
+    return True
+
+
+def prime(observations: List[str]) -> None:
+    """
+    Score a whole week in one vectorized predict_proba call, so the per-row
+    check is a dict lookup instead of a full sklearn round-trip.
+    """
+    model = _classifier
+    if model is None:
+        return
+    texts = [o for o in dict.fromkeys(observations) if len(o) >= MIN_OBSERVATION_LENGTH]
+    if not texts:
+        return
+    probs = model.predict_proba(texts)[:, list(model.classes_).index(0)]
+    with _lock:
+        _scores.update(zip(texts, map(float, probs)))
+
+
+def prob_irrelevant(observation: str) -> Optional[float]:
+    """Calibrated P(irrelevant), or None when no classifier is loaded."""
+    model = _classifier
+    if model is None:
+        return None
+    cached = _scores.get(observation)
+    if cached is not None:
+        return cached
+    return float(model.predict_proba([observation])[0, list(model.classes_).index(0)])
+
+
+def should_skip(observation: str, calls_saved: int = 2, threshold: float = IRRELEVANT_THRESHOLD) -> bool:
+    """
+    True when the classifier is confident the row is irrelevant.
+    `calls_saved` is the number of LLM calls the caller avoids by skipping
+    (free-text summary + relevance flag for the full chain).
+    """
+    p = prob_irrelevant(observation)
+    if p is None or p < threshold:
+        return False
+    stats = _run_stats()
+    with _lock:
+        stats["skipped_rows"] += 1
+        stats["calls_saved"] += calls_saved
+    return True
+
+
+def _run_stats() -> dict:
+    """Skip counters of the current run (src.utils, imported here: training needs no LLM client)."""
+    from src.utils import current_run
+    return current_run().state("preclassifier_stats", lambda: {"skipped_rows": 0, "calls_saved": 0})
+
+
+def get_stats() -> dict:
+    """Rows skipped and LLM calls saved in the current run."""
+    stats = _run_stats()
+    with _lock:
+        return dict(stats)
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Train the local relevance pre-classifier")
+    p.add_argument("--train", action="store_true", required=True)
+    p.add_argument("--processed-dir", default=os.path.join("data", "processed"))
+    p.add_argument("--simple-dir", default=os.path.join("jsondata", "simple_records"))
+    p.add_argument("--out", default=MODEL_PATH)
+    p.add_argument("--threshold", type=float, default=IRRELEVANT_THRESHOLD)
+    args = p.parse_args()
+
+    texts, labels = load_training_data(args.processed_dir, args.simple_dir)
+    if len(set(labels)) < 2:
+        raise ValueError("Training data needs both relevant and irrelevant rows.")
+    report = train(texts, labels, args.out, args.threshold)
+    print(json.dumps(report, indent=2))
+    print(f"Model saved to {args.out} ✅")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -1,5 +1,8 @@
 import pandas as pd
 import os
+import json
+import hashlib
+from typing import Dict, Iterable, List
 
 
 # ─────────── PROMPTS FOR SIMPLE LABELER ─────────── #
@@ -630,6 +633,47 @@ Ejemplos:
 
 
 
+# Prompt for the fused single-call ("fast mode") record
+system_prompt_fast_record = f"""
+Eres un ingeniero de mantenimiento validando registros.
+Debes evaluar un registro de detención y entregarlo completamente estructurado en una sola respuesta.
+
+Conceptos utiles:
+- Una pieza es un elemento físico único. Una pieza no puede ser "Sistema de", "Area de Huerta", "Inspeccion", "Chequeo Final" o "Mantencion Programada".
+- Los neumaticos se pueden identificar de manera general, o detallando su posicion (Ej: "Neumatico posicion 1" o "Neumatico").
+- Una OT (Orden de Trabajo) es un número que identifica el trabajo realizado. Una OT no es una pieza.
+- Las tareas logisticas (Orden, Aseo, Limpieza, Lavado, Movimiento, Traslado, Muestras) no se registran como trabajos.
+- Componentes que NUNCA serán criticos (en ningun contexto): Mangueras, Ductos, Sensores, Termostatos, Cables, Pernos, Filtros, Cañerias, Líneas, Abrazaderas, Interruptores, Conectores, u otros componentes de menor tamaño o relevancia.
+
+Output format:
+FastMaintenanceRecord
+- has_relevant_activities: [True/False]
+    - False si el registro contiene solo una actividad de tipo Logistica o Inspeccion, o solo piezas menores ("Perno", "Golilla", "Calugas", "Goma", "Tuerca", "Cojin", "Camas", "Valvulas", "Flexibles").
+- is_scheduled: [True/False]
+- scheduled_type: [si es programado: PM-2000, PM-500, etc. o "Preventivo" / "Programado"; si no es programado: "No Programado"]
+- summary: [sintesis breve de las actividades, ordenadas por criticidad: Reemplazo > Reparacion > Relleno > Inspeccion]
+- jobs: lista de SimpleJob
+    - piece: [nombre de la pieza, con tanto detalle como sea posible]
+    - job_type: [uno de los siguientes: Inspeccion, Relleno, Reparacion, Reemplazo, Logistica]
+    - comment: [extracto en el que se menciona la actividad]
+    - ot_number: [OT number if present]
+    - liters: [litros de relleno, si está presente]
+- component_mapping: una entrada por cada pieza de jobs
+    - piece: [mismo nombre de pieza usado en jobs]
+    - hierarchy: ComponentHierarchy
+        - system: [nombre del sistema al que pertenece la pieza]
+        - subsystem: [nombre del subsistema al que pertenece la pieza]
+        - component: [nombre del componente al que pertenece la pieza]
+        - is_critical: [True/False]
+        - detail : [opcional, si se requiere un detalle adicional sobre la pieza]
+"""
+
+user_prompt_fast_record = """
+Evalua el siguiente registro de detención y genera el FastMaintenanceRecord correspondiente.
+Identifica cada tarea realizada, la pieza sobre la que se realizó y su ubicación en el esquema Sistema-Subsistema-Componente.
+"""
+
+
 simple_prompts = {
     'SystemFreeToSummary' : system_prompt_free_to_summary,
     'UserFreeToSummary' : user_prompt_free_to_summary,
@@ -664,6 +708,20 @@ simple_prompts = {
     
     'SystemComponentMappingEx' : system_component_mapping_ex,
     'UserComponentMappingEx' : user_component_mapping_ex,
+    
+    'SystemFastRecord' : system_prompt_fast_record,
+    'UserFastRecord' : user_prompt_fast_record,
+}
+
+# Few-shot examples, sent as real user / assistant turns right after the task instruction
+simple_examples = {
+    'FreeToSummary' : [
+        (user_example_free_to_summary, assistant_example_free_to_summary),
+        (user_example2_free_to_summary, assistant_example2_free_to_summary),
+    ],
+    'CleanSummary' : [
+        (user_example_clean_summary, assistant_example_clean_summary),
+    ],
 }
 
 # ─────────── PROMPTS FOR JOB CLEANING ─────────── #
@@ -766,3 +824,144 @@ record_prompts = {
 }
 
 
+# ─────────── PROMPT VERSIONS ─────────── #
+# Every prompt (and few-shot example set) carries a content hash. Every stage
+# declares the prompts it sends and the upstream stages whose output it
+# reads; its version hashes both (Merkle style), so a prompt edit only
+# changes the versions of the stages downstream of it.
+
+def _content_hash(value) -> str:
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+PROMPT_HASHES = {
+    f"{group}.{key}": _content_hash(value)
+    for group, prompts in (
+        ("simple_prompts", simple_prompts),
+        ("simple_examples", simple_examples),
+        ("job_cleaning_prompts", job_cleaning_prompts),
+        ("record_prompts", record_prompts),
+    )
+    for key, value in prompts.items()
+}
+
+# Stage names match the `stage` label of the LLM calls
+STAGE_DEPENDENCIES = {
+    'SystemFreeToSummary' : {
+        'prompts': ['simple_prompts.SystemFreeToSummary', 'simple_prompts.UserFreeToSummary', 'simple_examples.FreeToSummary'],
+        'upstream': [],
+    },
+    'SystemRelevantActivities' : {
+        'prompts': ['simple_prompts.SystemRelevantActivities', 'simple_prompts.UserRelevantActivities'],
+        'upstream': ['SystemFreeToSummary'],
+    },
+    # only runs for relevant rows
+    'SystemMaintenanceType' : {
+        'prompts': ['simple_prompts.SystemMaintenanceType', 'simple_prompts.UserMaintenanceType'],
+        'upstream': ['SystemRelevantActivities'],
+    },
+    'SystemCleanSummary' : {
+        'prompts': ['simple_prompts.SystemCleanSummary', 'simple_prompts.UserCleanSummary', 'simple_examples.CleanSummary'],
+        'upstream': ['SystemFreeToSummary', 'SystemRelevantActivities'],
+    },
+    'SystemShortened' : {
+        'prompts': ['simple_prompts.SystemShortened', 'simple_prompts.UserShortened'],
+        'upstream': ['SystemCleanSummary'],
+    },
+    'SystemJobs' : {
+        'prompts': ['simple_prompts.SystemJobs', 'simple_prompts.UserJobs'],
+        'upstream': ['SystemCleanSummary'],
+    },
+    'SystemComponentSummary' : {
+        'prompts': ['simple_prompts.SystemComponentSummary', 'simple_prompts.UserComponentSummary'],
+        'upstream': ['SystemCleanSummary', 'SystemJobs'],
+    },
+    'SystemComponentMapping' : {
+        'prompts': ['simple_prompts.SystemComponentMapping', 'simple_prompts.UserComponentMapping'],
+        'upstream': ['SystemComponentSummary', 'SystemJobs'],
+    },
+    # pieces left unmapped by SystemComponentMapping
+    'SystemComponentMappingEx' : {
+        'prompts': ['simple_prompts.SystemComponentMapping', 'simple_prompts.UserComponentMappingEx'],
+        'upstream': ['SystemComponentSummary', 'SystemComponentMapping'],
+    },
+    'SystemFastRecord' : {
+        'prompts': ['simple_prompts.SystemFastRecord', 'simple_prompts.UserFastRecord'],
+        'upstream': [],
+    },
+    'EvalSystem' : {
+        'prompts': ['job_cleaning_prompts.EvalSystem', 'job_cleaning_prompts.EvalUser'],
+        'upstream': ['SystemJobs', 'SystemComponentMapping', 'SystemComponentMappingEx'],
+    },
+    'EvalSystemStructured' : {
+        'prompts': ['job_cleaning_prompts.EvalSystemStructured', 'job_cleaning_prompts.EvalUserStructured'],
+        'upstream': ['EvalSystem'],
+    },
+    # rule-based record review (no prompt): detention type, flags, summary
+    'RecordReview' : {
+        'prompts': [],
+        'upstream': ['SystemMaintenanceType', 'SystemShortened', 'EvalSystemStructured'],
+    },
+}
+
+# Stages whose outputs are persisted together: a changed stage sends every
+# row through its phase again, where the stages that did not change are
+# answered from the per-stage outputs of src.stage_cache. Fast mode adds
+# SystemFastRecord in front of the full chain, which stays as its fallback.
+PHASES = {
+    'simple_records': [
+        'SystemFreeToSummary', 'SystemRelevantActivities', 'SystemMaintenanceType', 'SystemCleanSummary',
+        'SystemShortened', 'SystemJobs', 'SystemComponentSummary', 'SystemComponentMapping', 'SystemComponentMappingEx',
+    ],
+    'records': ['EvalSystem', 'EvalSystemStructured', 'RecordReview'],
+}
+FAST_STAGES = ['SystemFastRecord']
+
+
+def stage_versions(dependencies: Dict[str, dict] = None, prompt_hashes: Dict[str, str] = None) -> Dict[str, str]:
+    """Version of every stage: hash of its prompts' hashes and its upstream stages' versions."""
+    dependencies = dependencies or STAGE_DEPENDENCIES
+    prompt_hashes = prompt_hashes or PROMPT_HASHES
+    versions: Dict[str, str] = {}
+
+    def visit(stage: str, path: tuple) -> str:
+        if stage in versions:
+            return versions[stage]
+        if stage in path:
+            raise ValueError(f"Stage dependency cycle: {' -> '.join(path + (stage,))}")
+        if stage not in dependencies:
+            raise ValueError(f"Unknown stage {stage!r} in STAGE_DEPENDENCIES")
+        spec = dependencies[stage]
+        unknown = [p for p in spec['prompts'] if p not in prompt_hashes]
+        if unknown:
+            raise ValueError(f"Stage {stage!r} depends on unknown prompts {unknown}")
+        versions[stage] = _content_hash({
+            'prompts': {p: prompt_hashes[p] for p in spec['prompts']},
+            'upstream': {u: visit(u, path + (stage,)) for u in spec['upstream']},
+        })
+        return versions[stage]
+
+    for stage in dependencies:
+        visit(stage, ())
+    return versions
+
+
+def stages_to_rerun(old_versions: Dict[str, str], new_versions: Dict[str, str] = None) -> List[str]:
+    """Stages whose version changed (or is unknown) between two stage_versions() results."""
+    new_versions = new_versions or stage_versions()
+    old_versions = old_versions or {}
+    return [stage for stage, version in new_versions.items() if old_versions.get(stage) != version]
+
+
+def phase_stages(fast_mode: bool = False) -> Dict[str, List[str]]:
+    return {
+        phase: (FAST_STAGES + stages if fast_mode and phase == 'simple_records' else stages)
+        for phase, stages in PHASES.items()
+    }
+
+
+def phases_to_rerun(changed_stages: Iterable[str], fast_mode: bool = False) -> List[str]:
+    """Persisted phases that contain a changed stage."""
+    changed = set(changed_stages)
+    return [phase for phase, stages in phase_stages(fast_mode).items() if changed & set(stages)]
@@ -0,0 +1,277 @@
+"""
+Indexed store of labeled maintenance records.
+
+One embedded SQLite database (data/records.sqlite) with a `records` table
+(one row per FinalMaintenanceRecord) and a flattened `jobs` child table,
+indexed for fleet-wide history queries:
+
+    from src.record_store import connect, query_records
+    conn = connect()
+    query_records(conn, unit_id="T_14", start="2025-04-01", end="2025-07-01", critical_change=True)
+
+Weeks are upserted by the orchestrator as they are labeled. Backfill the
+weeks labeled before the store existed with:
+    python -m src.record_store --backfill
+"""
+import os
+import json
+import sqlite3
+import argparse
+from typing import Any, Dict, Iterable, List
+
+from src.data_handler import iter_results
+from src.fingerprints import record_ids
+import src.sqlite_db as sqlite_db
+
+STORE_PATH = os.path.join("data", "records.sqlite")
+FINAL_RECORDS_DIR = os.path.join("jsondata", "final_records")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    record_id           TEXT PRIMARY KEY,
+    year                TEXT NOT NULL,
+    week                TEXT NOT NULL,
+    unit_id             TEXT NOT NULL,
+    start_time          TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS', sorts chronologically
+    end_time            TEXT NOT NULL,
+    detention_type      TEXT,
+    is_scheduled        INTEGER,
+    scheduled_type      TEXT,
+    has_inspection      INTEGER,
+    has_refill          INTEGER,
+    has_repair          INTEGER,
+    has_replacement     INTEGER,
+    has_other           INTEGER,
+    has_critical_change INTEGER,
+    summary             TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    record_id       TEXT NOT NULL REFERENCES records (record_id) ON DELETE CASCADE,
+    job_idx         INTEGER NOT NULL,
+    system          TEXT,
+    subsystem       TEXT,
+    component       TEXT,
+    detail          TEXT,
+    job_type        TEXT,
+    job_comment     TEXT,
+    criticity       TEXT,
+    critical_change INTEGER,
+    ot_number       TEXT,
+    liters          INTEGER,
+    PRIMARY KEY (record_id, job_idx)
+);
+CREATE INDEX IF NOT EXISTS idx_records_unit_start ON records (unit_id, start_time);
+CREATE INDEX IF NOT EXISTS idx_records_start ON records (start_time);
+CREATE INDEX IF NOT EXISTS idx_records_detention ON records (detention_type, start_time);
+CREATE INDEX IF NOT EXISTS idx_records_week ON records (year, week);
+CREATE INDEX IF NOT EXISTS idx_jobs_system_component ON jobs (system, component);
+CREATE INDEX IF NOT EXISTS idx_jobs_criticity ON jobs (criticity);
+"""
+
+_RECORD_COLUMNS = [
+    "record_id", "year", "week", "unit_id", "start_time", "end_time",
+    "detention_type", "is_scheduled", "scheduled_type",
+    "has_inspection", "has_refill", "has_repair", "has_replacement", "has_other", "has_critical_change",
+    "summary",
+]
+_JOB_COLUMNS = [
+    "record_id", "job_idx", "system", "subsystem", "component", "detail",
+    "job_type", "job_comment", "criticity", "critical_change", "ot_number", "liters",
+]
+
+
+def connect(path: str = STORE_PATH, shared: bool = None) -> sqlite3.Connection:
+    """Open (and create) the store; a data dir on a network filesystem needs `shared` (see src.sqlite_db)."""
+    conn = sqlite_db.connect(path, shared)
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# --------------------------------------------------------------------- #
+# Writes
+# --------------------------------------------------------------------- #
+def _record_rows(year: str, week: str, records: Iterable[Dict[str, Any]]):
+    """(record row, job rows) for every final record given as a dict."""
+    for rid, r in zip(record_ids(records), records):
+        record_row = (
+            rid, year, week, r["unit_id"], r["start_time"], r["end_time"],
+            r["detention_type"], int(r["is_scheduled"]), r.get("scheduled_type"),
+            int(r["has_inspection"]), int(r["has_refill"]), int(r["has_repair"]),
+            int(r["has_replacement"]), int(r["has_other"]), int(r["has_critical_change"]),
+            r["summary"],
+        )
+        job_rows = [
+            (
+                rid, i, j["system"], j["subsystem"], j["component"], j.get("detail"),
+                j["job_type"], j["job_comment"], j["criticity"], int(j["critical_change"]),
+                j.get("ot_number"), j.get("liters"),
+            )
+            for i, j in enumerate(r.get("jobs", []))
+        ]
+        yield record_row, job_rows
+
+
+def upsert_week(conn: sqlite3.Connection, year: str, week: str, records: List) -> int:
+    """
+    Replace the stored records of one week with `records`
+    (FinalMaintenanceRecord objects or their dicts), in one transaction.
+    Returns the number of records stored.
+    """
+    payload = [r if isinstance(r, dict) else r.model_dump() for r in records]
+    record_rows, job_rows = [], []
+    for record_row, jobs in _record_rows(year, week, payload):
+        record_rows.append(record_row)
+        job_rows.extend(jobs)
+
+    with conn:
+        # corrected source rows may change a record's interval, hence its id:
+        # drop the whole week instead of leaving stale ids behind
+        conn.execute("DELETE FROM records WHERE year = ? AND week = ?", (year, week))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO records ({', '.join(_RECORD_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(_RECORD_COLUMNS))})",
+            record_rows,
+        )
+        conn.executemany("DELETE FROM jobs WHERE record_id = ?", [(row[0],) for row in record_rows])
+        conn.executemany(
+            f"INSERT INTO jobs ({', '.join(_JOB_COLUMNS)}) VALUES ({', '.join('?' * len(_JOB_COLUMNS))})",
+            job_rows,
+        )
+    return len(record_rows)
+
+
+# --------------------------------------------------------------------- #
+# Queries
+# --------------------------------------------------------------------- #
+def query_records(
+    conn: sqlite3.Connection,
+    unit_id: str = None,
+    start: str = None,
+    end: str = None,
+    detention_type: str = None,
+    critical_change: bool = None,
+    system: str = None,
+    component: str = None,
+    criticity: str = None,
+    with_jobs: bool = True,
+    limit: int = None,
+) -> List[Dict[str, Any]]:
+    """
+    Records matching every given filter, oldest first.
+    `start` / `end` bound start_time (start inclusive, end exclusive).
+    Job filters (system, component, criticity) keep records with at least one
+    matching job; `critical_change` filters on the record flag. Text values
+    are stored normalized like the schemas do (e.g. "Alta", "Falla funcional").
+    """
+    where, params = [], []
+    if unit_id is not None:
+        where.append("r.unit_id = ?")
+        params.append(unit_id)
+    if start is not None:
+        where.append("r.start_time >= ?")
+        params.append(str(start))
+    if end is not None:
+        where.append("r.start_time < ?")
+        params.append(str(end))
+    if detention_type is not None:
+        where.append("r.detention_type = ?")
+        params.append(detention_type)
+    if critical_change is not None:
+        where.append("r.has_critical_change = ?")
+        params.append(int(critical_change))
+
+    job_where, job_params = [], []
+    for column, value in (("system", system), ("component", component), ("criticity", criticity)):
+        if value is not None:
+            job_where.append(f"j.{column} = ?")
+            job_params.append(value)
+    if job_where:
+        where.append(
+            f"EXISTS (SELECT 1 FROM jobs j WHERE j.record_id = r.record_id AND {' AND '.join(job_where)})"
+        )
+        params.extend(job_params)
+
+    sql = "SELECT r.* FROM records r"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY r.start_time"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    records = [dict(row) for row in conn.execute(sql, params)]
+    if with_jobs and records:
+        jobs = jobs_for(conn, [r["record_id"] for r in records])
+        for r in records:
+            r["jobs"] = jobs.get(r["record_id"], [])
+    return records
+
+
+def jobs_for(conn: sqlite3.Connection, record_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Jobs of the given records, grouped by record_id, in job order."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    chunk = 500  # stay under SQLite's bound-parameter limit
+    for i in range(0, len(record_ids), chunk):
+        ids = record_ids[i:i + chunk]
+        rows = conn.execute(
+            f"SELECT * FROM jobs WHERE record_id IN ({', '.join('?' * len(ids))}) ORDER BY record_id, job_idx",
+            ids,
+        )
+        for row in rows:
+            grouped.setdefault(row["record_id"], []).append(dict(row))
+    return grouped
+
+
+def downtime_by_unit(conn: sqlite3.Connection, start: str = None, end: str = None) -> Dict[str, float]:
+    """Hours of detention per unit for records starting in [start, end)."""
+    sql = (
+        "SELECT unit_id, SUM((julianday(end_time) - julianday(start_time)) * 24) AS hours "
+        "FROM records WHERE start_time >= ? AND start_time < ? GROUP BY unit_id ORDER BY unit_id"
+    )
+    rows = conn.execute(sql, (str(start or ""), str(end or "9999")))
+    return {row["unit_id"]: round(row["hours"] or 0.0, 2) for row in rows}
+
+
+# --------------------------------------------------------------------- #
+# Backfill
+# --------------------------------------------------------------------- #
+def backfill(conn: sqlite3.Connection, final_dir: str = FINAL_RECORDS_DIR) -> Dict[str, int]:
+    """Load every jsondata/final_records/maintenance_records_<Y>_<W>.json into the store."""
+    stored = {}
+    for year, week, path in iter_results(final_dir):
+        with open(path, "r", encoding="utf-8") as f:
+            stored[f"{year}-{week}"] = upsert_week(conn, year, week, json.load(f))
+    return stored
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Indexed store of labeled maintenance records")
+    p.add_argument("--db", default=STORE_PATH)
+    p.add_argument("--backfill", action="store_true", help="load every week in jsondata/final_records")
+    p.add_argument("--unit", default=None)
+    p.add_argument("--start", default=None, help="YYYY-MM-DD")
+    p.add_argument("--end", default=None, help="YYYY-MM-DD (exclusive)")
+    p.add_argument("--detention-type", default=None)
+    p.add_argument("--critical", action="store_true", help="only records with a critical change")
+    p.add_argument("--system", default=None)
+    p.add_argument("--component", default=None)
+    p.add_argument("--criticity", default=None)
+    p.add_argument("--limit", type=int, default=50)
+    args = p.parse_args()
+
+    conn = connect(args.db)
+    if args.backfill:
+        stored = backfill(conn)
+        print(f"Backfilled {sum(stored.values())} records from {len(stored)} weeks ✅")
+        return
+    records = query_records(
+        conn, unit_id=args.unit, start=args.start, end=args.end,
+        detention_type=args.detention_type, critical_change=True if args.critical else None,
+        system=args.system, component=args.component, criticity=args.criticity, limit=args.limit,
+    )
+    print(json.dumps(records, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    _cli()
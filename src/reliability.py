@@ -0,0 +1,275 @@
+"""
+Incremental reliability metrics (MTBF / MTTR) per unit, system and component.
+
+Each labeled week is folded into per-week buckets stored as keyed rows in an
+embedded SQLite database (data/reliability.sqlite): one `buckets` row per
+(level, key, week) with detentions, downtime, failures, failure downtime,
+critical changes and the week's first / last failure, plus its detention
+type counts in `bucket_types`. Keys are unit, unit|system and
+unit|system|component.
+
+Appending a week only writes that week's rows (relabeling replaces them in
+one transaction), so an update costs O(new records) whatever the history.
+Totals and rolling windows are aggregated when reading:
+
+    MTBF = (last_failure - first_failure) / (failures - 1)   # mean gap between failures
+    MTTR = failure_downtime / failures
+
+A detention is a failure when its detention_type is in FAILURE_TYPES; systems
+and components are charged with every detention whose jobs touch them.
+Detentions without a start or end time (NaT hours, see
+data_handler.process_data_structure) have no downtime to charge and are left
+out. Weeks may arrive in any order.
+
+    python -m src.reliability --rebuild                       # from jsondata/final_records
+    python -m src.reliability --level components --unit T_14 --last-weeks 12
+"""
+import os
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.data_handler import iter_results
+import src.sqlite_db as sqlite_db
+
+STORE_PATH = os.path.join("data", "reliability.sqlite")
+FINAL_RECORDS_DIR = os.path.join("jsondata", "final_records")
+
+FAILURE_TYPES = ("Falla funcional",)
+LEVELS = ("units", "systems", "components")
+_COUNTERS = ("detentions", "downtime_h", "failures", "failure_downtime_h", "critical_changes")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    level              TEXT NOT NULL,      -- units | systems | components
+    key                TEXT NOT NULL,      -- unit[|system[|component]]
+    unit_id            TEXT NOT NULL,
+    year_week          TEXT NOT NULL,      -- 'YYYY-WW', sorts chronologically
+    detentions         INTEGER NOT NULL,
+    downtime_h         REAL NOT NULL,
+    failures           INTEGER NOT NULL,
+    failure_downtime_h REAL NOT NULL,
+    critical_changes   INTEGER NOT NULL,
+    first_failure      TEXT,
+    last_failure       TEXT,
+    PRIMARY KEY (level, key, year_week)
+);
+CREATE TABLE IF NOT EXISTS bucket_types (
+    level          TEXT NOT NULL,
+    key            TEXT NOT NULL,
+    unit_id        TEXT NOT NULL,
+    year_week      TEXT NOT NULL,
+    detention_type TEXT NOT NULL,
+    n              INTEGER NOT NULL,
+    PRIMARY KEY (level, key, year_week, detention_type)
+);
+CREATE INDEX IF NOT EXISTS idx_buckets_week ON buckets (year_week);
+CREATE INDEX IF NOT EXISTS idx_buckets_unit ON buckets (level, unit_id, year_week);
+CREATE INDEX IF NOT EXISTS idx_bucket_types_week ON bucket_types (year_week);
+CREATE INDEX IF NOT EXISTS idx_bucket_types_unit ON bucket_types (level, unit_id, year_week);
+"""
+
+
+def _hours(start: str, end: str) -> float:
+    return (datetime.fromisoformat(str(end)) - datetime.fromisoformat(str(start))).total_seconds() / 3600
+
+
+def _missing_time(value) -> bool:
+    """True for a timestamp the source left empty (serialized as 'NaT')."""
+    return value is None or str(value) in ("", "NaT", "nan", "None")
+
+
+def _empty() -> dict:
+    return {**{k: 0 for k in _COUNTERS}, "first_failure": None, "last_failure": None, "by_type": {}}
+
+
+def connect(path: str = STORE_PATH, shared: bool = None) -> sqlite3.Connection:
+    """Open (and create) the store; a data dir on a network filesystem needs `shared` (see src.sqlite_db)."""
+    conn = sqlite_db.connect(path, shared)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# --------------------------------------------------------------------- #
+# Week contributions
+# --------------------------------------------------------------------- #
+def week_contributions(final_records: List) -> Dict[str, Dict[str, dict]]:
+    """{level: {key: bucket}} for one week of final records (objects or dicts)."""
+    contributions: Dict[str, Dict[str, dict]] = {level: {} for level in LEVELS}
+    for r in final_records:
+        r = r if isinstance(r, dict) else r.model_dump()
+        if _missing_time(r["start_time"]) or _missing_time(r["end_time"]):
+            continue
+        hours = _hours(r["start_time"], r["end_time"])
+        failure = r["detention_type"] in FAILURE_TYPES
+        jobs = r.get("jobs", [])
+
+        keys = {"units": {r["unit_id"]: 0}, "systems": {}, "components": {}}
+        for j in jobs:
+            system_key = f"{r['unit_id']}|{j['system']}"
+            component_key = f"{system_key}|{j['component']}"
+            for level, key in (("systems", system_key), ("components", component_key)):
+                keys[level][key] = keys[level].get(key, 0) + int(j["critical_change"])
+        keys["units"][r["unit_id"]] = sum(int(j["critical_change"]) for j in jobs)
+
+        for level, touched in keys.items():
+            for key, critical_changes in touched.items():
+                bucket = contributions[level].setdefault(key, _empty())
+                bucket["detentions"] += 1
+                bucket["downtime_h"] += hours
+                bucket["critical_changes"] += critical_changes
+                bucket["by_type"][r["detention_type"]] = bucket["by_type"].get(r["detention_type"], 0) + 1
+                if failure:
+                    bucket["failures"] += 1
+                    bucket["failure_downtime_h"] += hours
+                    start = str(r["start_time"])
+                    if bucket["first_failure"] is None or start < bucket["first_failure"]:
+                        bucket["first_failure"] = start
+                    if bucket["last_failure"] is None or start > bucket["last_failure"]:
+                        bucket["last_failure"] = start
+    return contributions
+
+
+# --------------------------------------------------------------------- #
+# Writes
+# --------------------------------------------------------------------- #
+def _delete_week(conn: sqlite3.Connection, week_key: str) -> None:
+    conn.execute("DELETE FROM buckets WHERE year_week = ?", (week_key,))
+    conn.execute("DELETE FROM bucket_types WHERE year_week = ?", (week_key,))
+
+
+def remove_week(conn: sqlite3.Connection, year: str, week: str) -> None:
+    with conn:
+        _delete_week(conn, f"{year}-{week}")
+
+
+def update_week(conn: sqlite3.Connection, year: str, week: str, final_records: List) -> int:
+    """
+    Replace the buckets of one week with those of `final_records`, in one
+    transaction. Only this week's rows are touched. Returns the buckets written.
+    """
+    week_key = f"{year}-{week}"
+    bucket_rows, type_rows = [], []
+    for level, buckets in week_contributions(final_records).items():
+        for key, b in buckets.items():
+            bucket_rows.append((
+                level, key, key.split("|")[0], week_key,
+                b["detentions"], round(b["downtime_h"], 4), b["failures"], round(b["failure_downtime_h"], 4),
+                b["critical_changes"], b["first_failure"], b["last_failure"],
+            ))
+            type_rows.extend((level, key, key.split("|")[0], week_key, t, n) for t, n in b["by_type"].items())
+
+    with conn:
+        _delete_week(conn, week_key)
+        conn.executemany(f"INSERT INTO buckets VALUES ({', '.join('?' * 11)})", bucket_rows)
+        conn.executemany("INSERT INTO bucket_types VALUES (?, ?, ?, ?, ?, ?)", type_rows)
+    return len(bucket_rows)
+
+
+def rebuild(conn: sqlite3.Connection, final_dir: str = FINAL_RECORDS_DIR) -> int:
+    """Recompute every bucket from the weeks in jsondata/final_records. Returns the number of weeks."""
+    with conn:
+        conn.execute("DELETE FROM buckets")
+        conn.execute("DELETE FROM bucket_types")
+    weeks = 0
+    for year, week, path in iter_results(final_dir):
+        with open(path, "r", encoding="utf-8") as f:
+            update_week(conn, year, week, json.load(f))
+        weeks += 1
+    return weeks
+
+
+# --------------------------------------------------------------------- #
+# Reads
+# --------------------------------------------------------------------- #
+def labeled_weeks(conn: sqlite3.Connection) -> List[str]:
+    return [row[0] for row in conn.execute("SELECT DISTINCT year_week FROM buckets ORDER BY year_week")]
+
+
+def totals(conn: sqlite3.Connection, level: str = "units", unit: Optional[str] = None, since: str = None) -> Dict[str, dict]:
+    """{key: aggregate} of `level` (optionally one unit's keys) over the weeks >= `since`."""
+    where, params = ["level = ?"], [level]
+    if unit is not None:
+        where.append("unit_id = ?")
+        params.append(unit)
+    if since is not None:
+        where.append("year_week >= ?")
+        params.append(since)
+    sql_where = " AND ".join(where)
+
+    result = {}
+    rows = conn.execute(
+        "SELECT key, SUM(detentions) AS detentions, SUM(downtime_h) AS downtime_h, SUM(failures) AS failures, "
+        "SUM(failure_downtime_h) AS failure_downtime_h, SUM(critical_changes) AS critical_changes, "
+        f"MIN(first_failure) AS first_failure, MAX(last_failure) AS last_failure FROM buckets WHERE {sql_where} GROUP BY key",
+        params,
+    )
+    for row in rows:
+        total = dict(row)
+        key = total.pop("key")
+        total["downtime_h"] = round(total["downtime_h"], 4)
+        total["failure_downtime_h"] = round(total["failure_downtime_h"], 4)
+        total["by_type"] = {}
+        result[key] = total
+
+    rows = conn.execute(
+        f"SELECT key, detention_type, SUM(n) AS n FROM bucket_types WHERE {sql_where} GROUP BY key, detention_type",
+        params,
+    )
+    for row in rows:
+        if row["key"] in result:
+            result[row["key"]]["by_type"][row["detention_type"]] = row["n"]
+    return result
+
+
+def metrics(total: dict) -> dict:
+    """MTBF / MTTR (hours) of one aggregate."""
+    failures = total["failures"]
+    mtbf = None
+    if failures > 1:
+        mtbf = round(_hours(total["first_failure"], total["last_failure"]) / (failures - 1), 2)
+    mttr = round(total["failure_downtime_h"] / failures, 2) if failures else None
+    return {"mtbf_h": mtbf, "mttr_h": mttr}
+
+
+def report(conn: sqlite3.Connection, level: str = "units", unit: Optional[str] = None, last_weeks: int = None) -> List[dict]:
+    """
+    One row per key of `level` (optionally one unit's keys), over the whole
+    history or the last `last_weeks` labeled weeks, most failures first.
+    """
+    since = None
+    if last_weeks:
+        weeks = labeled_weeks(conn)[-last_weeks:]
+        since = weeks[0] if weeks else None
+    rows = []
+    for key, total in totals(conn, level, unit, since).items():
+        if not total["detentions"]:
+            continue
+        rows.append({"key": key, **{k: total[k] for k in _COUNTERS}, **metrics(total),
+                     "first_failure": total["first_failure"], "last_failure": total["last_failure"]})
+    rows.sort(key=lambda r: (-r["failures"], -r["downtime_h"]))
+    return rows
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="MTBF / MTTR per unit, system and component")
+    p.add_argument("--db", default=STORE_PATH)
+    p.add_argument("--rebuild", action="store_true", help="recompute from every week in jsondata/final_records")
+    p.add_argument("--level", choices=LEVELS, default="units")
+    p.add_argument("--unit", default=None)
+    p.add_argument("--last-weeks", type=int, default=None, help="rolling window over the latest N labeled weeks")
+    p.add_argument("--top", type=int, default=20)
+    args = p.parse_args()
+
+    conn = connect(args.db)
+    if args.rebuild:
+        print(f"Reliability buckets rebuilt from {rebuild(conn)} weeks ✅")
+        return
+    rows = report(conn, args.level, args.unit, args.last_weeks)
+    print(json.dumps(rows[:args.top], indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,39 @@
+"""
+Keyword rules applied to pieces and components, compiled once.
+
+Each rule set is one regex alternation, so a string is scanned once
+instead of once per keyword. `match` returns the keyword that fired (for
+the audit messages) or None:
+
+    rule = KeywordRule("forbidden_piece", ["perno", "tuerca"])
+    rule.match("Perno de rueda")      # 'perno'
+    rule.match("Turbo")               # None
+
+The keyword lists are knowledge tables (src/tables/keyword_rules.json),
+compiled by src.knowledge.
+"""
+import re
+from typing import Iterable, Optional
+
+
+class KeywordRule:
+    """Substring rule: fires when any keyword occurs in the (optionally lowercased) text."""
+
+    def __init__(self, name: str, keywords: Iterable[str], lowercase: bool = True):
+        self.name = name
+        self.keywords = list(keywords)
+        self.lowercase = lowercase
+        # longest first, so overlapping keywords report the most specific one
+        alternation = "|".join(re.escape(k) for k in sorted(set(self.keywords), key=len, reverse=True))
+        self._pattern = re.compile(alternation) if self.keywords else None
+
+    def match(self, text: Optional[str]) -> Optional[str]:
+        """The keyword found in `text` (first occurrence), or None."""
+        if not text or self._pattern is None:
+            return None
+        found = self._pattern.search(text.lower() if self.lowercase else text)
+        return found.group(0) if found else None
+
+    def __repr__(self) -> str:
+        return f"KeywordRule({self.name!r}, {len(self.keywords)} keywords)"
+
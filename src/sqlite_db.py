@@ -0,0 +1,34 @@
+"""
+Connections to the SQLite files of the shared data dir: the manifest
+(src.manifest), the record store (src.record_store) and the reliability
+buckets (src.reliability), all written by every worker.
+
+WAL needs shared memory between the processes, so it only works when every
+process runs on the machine that holds the file. A data dir on a network
+filesystem (`shared`, default: MANIFEST_SHARED=1 in the environment, set by
+`python -m src.worker --shared`) uses the rollback journal, whose locking
+relies on the filesystem's POSIX locks instead. Every process must use the
+same mode.
+"""
+import os
+import sqlite3
+
+SHARED_ENV = "MANIFEST_SHARED"
+
+
+def is_shared() -> bool:
+    return os.environ.get(SHARED_ENV) == "1"
+
+
+def connect(path: str, shared: bool = None, **kwargs) -> sqlite3.Connection:
+    """
+    Open (and create) a database file with Row results and the journal mode
+    of the deployment. `kwargs` go to sqlite3.connect.
+    """
+    if shared is None:
+        shared = is_shared()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA journal_mode={'DELETE' if shared else 'WAL'}")
+    return conn
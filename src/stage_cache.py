@@ -0,0 +1,124 @@
+"""
+Per-week cache of LLM stage outputs, so a prompt edit only reruns the
+edited stage and the stages downstream of it.
+
+Every routed call (src.llm_router) is keyed by its stage, the stage's
+version (src.prompts.stage_versions: its prompts plus every upstream stage)
+and the exact user prompts it sends. A rerun of the week loads the previous
+run's outputs, so the stages of the chain whose version did not change
+(summaries, relevance flag, maintenance type, job list, component summary,
+piece mappings, criticity evaluations) are answered from the cache, and
+only the changed stages and the ones that depend on them call the LLM.
+
+Stored per week in jsondata/stage_outputs/maintenance_records_<year>_<week>.json
+together with the run's stage versions. Entries of stale versions are
+dropped on save. Only accepted answers (the routed check passed) are stored,
+and only the previous run's answers are served: identical calls within one
+run still go to the LLM, as before.
+The cache lives on the current RunContext (src.utils.run_context), so weeks
+running in the same process each use their own.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+from src.utils import current_run
+
+STAGE_OUTPUTS_DIR = os.path.join("jsondata", "stage_outputs")
+
+
+class _WeekCache:
+    """Stage outputs of the run's week."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions: Dict[str, str] = {}
+        self.previous: Dict[str, dict] = {}   # key -> {"stage", "version", "output"} of the previous run
+        self.entries: Dict[str, dict] = {}    # what save_week writes: still valid previous entries + this run's
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def _cache() -> _WeekCache:
+    return current_run().state("stage_cache", _WeekCache)
+
+
+def _week_path(out_dir: str, year: str, week: str) -> str:
+    return os.path.join(out_dir, f"maintenance_records_{year}_{week}.json")
+
+
+def _key(stage: str, version: str, kind: str, user_prompts: List[str]) -> str:
+    payload = json.dumps([stage, version, kind, list(user_prompts)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def begin_week(year: str, week: str, versions: Dict[str, str], reuse: bool = True, out_dir: str = STAGE_OUTPUTS_DIR) -> int:
+    """
+    Activate the cache of the current run (see src.utils.run_context) for
+    one week with the current stage versions.
+    With reuse=True the previous run's outputs are loaded (those of stages
+    whose version still matches). Returns the number of usable entries.
+    """
+    entries = {}
+    path = _week_path(out_dir, year, week)
+    if reuse and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            stored = json.load(f).get("entries", {})
+        entries = {k: e for k, e in stored.items() if versions.get(e["stage"]) == e["version"]}
+    cache = _cache()
+    with cache.lock:
+        cache.versions = dict(versions)
+        cache.previous = entries
+        cache.entries = dict(entries)
+        cache.stats.clear()
+    return len(entries)
+
+
+def lookup(stage: str, kind: str, user_prompts: List[str]):
+    """The stored output of this exact call, or None."""
+    cache = _cache()
+    version = cache.versions.get(stage)
+    if version is None:
+        return None
+    key = _key(stage, version, kind, user_prompts)
+    with cache.lock:
+        entry = cache.previous.get(key)
+        cache.stats[stage]["hits" if entry is not None else "misses"] += 1
+    return None if entry is None else entry["output"]
+
+
+def store(stage: str, kind: str, user_prompts: List[str], output) -> None:
+    """Remember an accepted output (a string or a JSON-able dict)."""
+    cache = _cache()
+    version = cache.versions.get(stage)
+    if version is None:
+        return
+    key = _key(stage, version, kind, user_prompts)
+    with cache.lock:
+        cache.entries[key] = {"stage": stage, "version": version, "output": output}
+
+
+def save_week(year: str, week: str, out_dir: str = STAGE_OUTPUTS_DIR) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    path = _week_path(out_dir, year, week)
+    cache = _cache()
+    with cache.lock:
+        payload = {"stage_versions": cache.versions, "entries": cache.entries}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Per-stage hits / misses of the current week."""
+    cache = _cache()
+    with cache.lock:
+        return {stage: dict(s) for stage, s in sorted(cache.stats.items())}
+
+
+def calls_reused() -> int:
+    cache = _cache()
+    with cache.lock:
+        return sum(s["hits"] for s in cache.stats.values())
@@ -0,0 +1,89 @@
+"""
+Read the consolidated row traces of a run (<log_dir>/traces.jsonl.gz).
+
+    python -m src.trace_tool logs/2025/week_05 --row 12
+    python -m src.trace_tool logs/2025/week_05 --row 12 --json
+    python -m src.trace_tool logs/2025/week_05 --summary
+
+Weeks labeled before the trace file existed still have one
+observation_<row>.txt per row; --row falls back to it.
+"""
+import os
+import json
+import gzip
+import argparse
+from collections import Counter
+from typing import Iterator, List, Optional
+
+# same name as src.utils.TRACE_FNAME; not imported so the tool runs without API credentials
+TRACE_FNAME = "traces.jsonl.gz"
+
+
+def iter_traces(log_dir: str) -> Iterator[dict]:
+    """Every trace record of the folder, oldest first (tolerates a truncated tail)."""
+    path = os.path.join(log_dir, TRACE_FNAME)
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, json.JSONDecodeError):
+            # run killed mid-write: keep what was flushed
+            return
+
+
+def row_traces(log_dir: str, row, last_run_only: bool = False) -> List[dict]:
+    """Trace records of one row; optionally only those of the latest run that traced it."""
+    records = [r for r in iter_traces(log_dir) if str(r.get("row")) == str(row)]
+    if last_run_only and records:
+        last = records[-1]["run_id"]
+        records = [r for r in records if r["run_id"] == last]
+    return records
+
+
+def legacy_row_text(log_dir: str, row) -> Optional[str]:
+    path = os.path.join(log_dir, f"observation_{row}.txt")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def format_trace(record: dict) -> str:
+    lines = [f"--- row {record.get('row')} | run {record.get('run_id')} | ts {record.get('ts')}"]
+    for key, value in record.items():
+        if key in ("row", "run_id", "ts"):
+            continue
+        lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Extract row traces from a run's log folder")
+    p.add_argument("log_dir", help="e.g. logs/2025/week_05")
+    p.add_argument("--row", default=None, help="row index to extract")
+    p.add_argument("--last-run", action="store_true", help="only the latest run that traced the row")
+    p.add_argument("--json", action="store_true", help="print raw JSON records")
+    p.add_argument("--summary", action="store_true", help="count rows per outcome")
+    args = p.parse_args()
+
+    if args.summary:
+        outcomes = Counter(r.get("outcome") for r in iter_traces(args.log_dir))
+        print(json.dumps(dict(outcomes), indent=2, ensure_ascii=False))
+        return
+    if args.row is None:
+        p.error("--row or --summary is required")
+
+    records = row_traces(args.log_dir, args.row, args.last_run)
+    if not records:
+        legacy = legacy_row_text(args.log_dir, args.row)
+        print(legacy if legacy is not None else f"No trace for row {args.row} in {args.log_dir}")
+        return
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False) if args.json else format_trace(record))
+
+
+if __name__ == "__main__":
+    _cli()
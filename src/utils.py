@@ -2,7 +2,7 @@ import unicodedata
 import os
 from openai import OpenAI
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
 from functools import partial
 from typing import Iterable, List, TypeVar, Callable, Sequence
 import time
@@ -11,8 +11,17 @@ import json
 import threading
 import datetime
 import functools
+import contextvars
+import contextlib
+import queue
+import uuid
+import gzip
+import atexit
+from collections import OrderedDict
 
-_timing_lock = threading.Lock()
+from src.llm_metrics import CallLog, record_call, current_row, recent_latency_percentile
+
+_runs_lock = threading.Lock()
 
 T = TypeVar("T")
 R = TypeVar("R")
@@ -20,16 +29,35 @@ R = TypeVar("R")
 load_dotenv()
 
 MAX_WORKERS = os.cpu_count() or 1
-CLIENT = OpenAI()
+# Point the pipeline at an OpenAI-compatible endpoint (e.g. the local stand-in
+# server in src/loadtest) by setting LLM_BASE_URL. Unset -> default OpenAI API.
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL") or None
+CLIENT = OpenAI(base_url=LLM_BASE_URL)
 MODEL = "gpt-4o-mini"
 MODEL_REASON = "o4-mini"
 
+# Request hedging: once a call runs past the HEDGE_PERCENTILE of the recent
+# latencies of its stage on that model, send a duplicate and keep the first
+# answer. Hedges are capped at HEDGE_BUDGET x total requests. Off unless LLM_HEDGE=1.
+HEDGE_ENABLED = os.environ.get("LLM_HEDGE", "0") == "1"
+HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 95))
+HEDGE_BUDGET = float(os.environ.get("LLM_HEDGE_BUDGET", 0.05))
+HEDGE_MIN_SAMPLES = 20
+
+# Ceiling on LLM requests in flight at once (hedges included)
+MAX_INFLIGHT_LLM = int(os.environ.get("LLM_MAX_INFLIGHT", 2 * MAX_WORKERS))
+
+# Distinct strings memoized by normalize_name (piece names, job types, systems...)
+NORMALIZE_CACHE_SIZE = 65536
+
 # --------------------------------------------------------------------- #
 # Text helpers
 # --------------------------------------------------------------------- #
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_name(text: str) -> str:
     """
     Remove accents, strip, lowercase + capitalize first letter.
+    Memoized: the same few thousand strings come back in every LLM response.
     Examples
     --------
     >>> normalize_name("  MOTÓR  ")
@@ -50,58 +78,535 @@ def skip_logistics(JobObject : list) -> list:
 # --------------------------------------------------------------------- #
 # Concurrency helpers
 # --------------------------------------------------------------------- #
+class _Task:
+    """
+    One unit of work on the WorkScheduler. Whoever claims it first (a pool
+    worker or the waiting parent) runs it, inside the submitter's context.
+    """
+    __slots__ = ("fn", "args", "ctx", "result", "error", "done", "_claimed", "_claim_lock")
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.ctx = contextvars.copy_context()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self._claimed = False
+        self._claim_lock = threading.Lock()
+
+    def claim(self) -> bool:
+        with self._claim_lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+            return True
+
+    def run(self):
+        try:
+            self.result = self.ctx.run(self.fn, *self.args)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def get(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class WorkScheduler:
+    """
+    One bounded pool shared by every level of the pipeline (rows, and the
+    jobs inside each row).
+    A parent waiting on its children first runs every child no worker has
+    picked up yet (caller-runs), so it only ever waits on tasks that are
+    actively running: nested maps cannot deadlock the pool, and the thread
+    count stays at max_workers + the threads that call map().
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._active = 0
+        self.peak_active = 0
+
+    def _ensure_workers(self):
+        with self._lock:
+            while len(self._threads) < self.max_workers:
+                t = threading.Thread(target=self._worker, name=f"labeler-worker-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            if task.claim():
+                self._run(task)
+
+    def _run(self, task: _Task):
+        with self._lock:
+            self._active += 1
+            self.peak_active = max(self.peak_active, self._active)
+        try:
+            task.run()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def submit(self, fn, *args) -> _Task:
+        self._ensure_workers()
+        task = _Task(fn, args)
+        self._queue.put(task)
+        return task
+
+    def map(
+        self,
+        fn: Callable[[T], R],
+        items: Sequence[T],
+        max_parallel: int = None,
+        order: Sequence[int] = None,
+        on_result: Callable[[int, R], None] = None,
+    ) -> List[R]:
+        """
+        Order-preserving map. At most `max_parallel` items of this map run at
+        once: that many runner tasks pull the next item from a shared cursor.
+        `order` sets the dispatch order (item indices); results always come
+        back in the original order. `on_result(index, result)` is called from
+        the worker as soon as each item finishes (it must be thread-safe).
+        When an item raises, no further item is started; map waits for the
+        items already running and then re-raises, so nothing of this map is
+        still calling `fn` / `on_result` once the caller sees the error.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        cursor = iter(order if order is not None else range(len(items)))
+        cursor_lock = threading.Lock()
+        failed = threading.Event()
+
+        def runner():
+            while True:
+                with cursor_lock:
+                    i = None if failed.is_set() else next(cursor, None)
+                if i is None:
+                    return
+                try:
+                    results[i] = fn(items[i])
+                    if on_result is not None:
+                        on_result(i, results[i])
+                except BaseException:
+                    failed.set()
+                    raise
+
+        n_runners = min(len(items), max_parallel or len(items))
+        tasks = [self.submit(runner) for _ in range(n_runners)]
+        for task in tasks:  # caller-runs: never block on work nobody started
+            if task.claim():
+                self._run(task)
+        for task in tasks:  # let every runner drain before raising
+            task.done.wait()
+        for task in tasks:
+            task.get()
+        return results
+
+
+SCHEDULER = WorkScheduler(MAX_WORKERS)
+
 def map_parallel(
     fn: Callable[[T], R],
     items: Sequence[T],
     max_workers: int = MAX_WORKERS,
+    cost: Callable[[T], float] = None,
+    on_result: Callable[[int, R], None] = None,
 ) -> List[R]:
     """
-    Simple thread-pool map that preserves order.
+    Order-preserving map on the shared bounded scheduler.
+    `max_workers` caps how many items of this call run at once.
+    With `cost`, the most expensive items are dispatched first (longest
+    processing time first), so long rows do not start last and become the tail.
+    `on_result(index, result)` streams each result as soon as it is ready.
     """
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        return list(pool.map(fn, items))
+    order = None
+    if cost is not None:
+        costs = [cost(item) for item in items]
+        order = sorted(range(len(costs)), key=costs.__getitem__, reverse=True)
+    return SCHEDULER.map(fn, items, max_parallel=max_workers, order=order, on_result=on_result)
 
 # --------------------------------------------------------------------- #
 # LLM helpers
 # --------------------------------------------------------------------- #
 
-def call_llm(client, model, system_prompt, user_prompts):
-    messages = [{"role": "system", "content": system_prompt}] + [{"role": "user", "content": up} for up in user_prompts]
-    return client.chat.completions.create(model=model, messages=messages).choices[0].message.content.strip()
+_hedge_pool = ThreadPoolExecutor(max_workers=2 * MAX_WORKERS, thread_name_prefix="llm-hedge")
+_hedge_lock = threading.Lock()
+_hedge_counts = {"requests": 0, "hedges": 0}
+_llm_slots = threading.BoundedSemaphore(MAX_INFLIGHT_LLM)
+_inflight_lock = threading.Lock()
+_inflight = {"current": 0, "peak": 0}
 
-def call_llm_structured(client, model, system_prompt, user_prompts, response_format):
-    messages = [{"role": "system", "content": system_prompt}] + [{"role": "user", "content": up} for up in user_prompts]
-    if model == MODEL_REASON:
-        # For reasoning models, we use a different endpoint
-        return client.beta.chat.completions.parse(
+def _limited(send):
+    """
+    Wrap a request so it holds one of the MAX_INFLIGHT_LLM slots while on the wire.
+    """
+    def run():
+        with _llm_slots:
+            with _inflight_lock:
+                _inflight["current"] += 1
+                _inflight["peak"] = max(_inflight["peak"], _inflight["current"])
+            try:
+                return send()
+            finally:
+                with _inflight_lock:
+                    _inflight["current"] -= 1
+    return run
+
+def concurrency_stats() -> dict:
+    """
+    Scheduler size, peak concurrently running tasks and peak in-flight LLM requests.
+    """
+    with _inflight_lock:
+        peak_inflight = _inflight["peak"]
+    return {
+        "workers": SCHEDULER.max_workers,
+        "peak_active_tasks": SCHEDULER.peak_active,
+        "max_inflight_llm": MAX_INFLIGHT_LLM,
+        "peak_inflight_llm": peak_inflight,
+    }
+
+def configure_hedging(enabled: bool = None, percentile: float = None, budget: float = None):
+    """
+    Override the LLM_HEDGE* settings at runtime.
+    """
+    global HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_BUDGET
+    if enabled is not None:
+        HEDGE_ENABLED = enabled
+    if percentile is not None:
+        HEDGE_PERCENTILE = percentile
+    if budget is not None:
+        HEDGE_BUDGET = budget
+
+def _take_hedge_budget() -> bool:
+    with _hedge_lock:
+        if _hedge_counts["hedges"] + 1 > HEDGE_BUDGET * _hedge_counts["requests"]:
+            return False
+        _hedge_counts["hedges"] += 1
+        return True
+
+def _hedged_request(stage, model, send, on_loser):
+    """
+    Run send() and, if it outlives the latency threshold of `model` on the
+    stage and the budget allows, race it against a duplicate. Returns
+    (response, hedged).
+    The slower request is cancelled if it has not started yet; otherwise its
+    response is discarded (a sync HTTP call cannot be aborted) and
+    on_loser(future, sent_at) is called once it completes, so its billed
+    tokens are still recorded.
+    """
+    with _hedge_lock:
+        _hedge_counts["requests"] += 1
+    threshold = None
+    if HEDGE_ENABLED and stage is not None:
+        threshold = recent_latency_percentile(stage, model, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    if threshold is None:
+        return send(), False
+
+    sent_at = {}
+    primary = _hedge_pool.submit(send)
+    sent_at[primary] = time.perf_counter()
+    try:
+        return primary.result(timeout=threshold), False
+    except FuturesTimeout:
+        pass
+    if not _take_hedge_budget():
+        return primary.result(), False
+
+    hedge = _hedge_pool.submit(send)
+    sent_at[hedge] = time.perf_counter()
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                loser = hedge if fut is primary else primary
+                if not loser.cancel():
+                    loser.add_done_callback(lambda f: on_loser(f, sent_at[f]))
+                return fut.result(), True
+    # both failed: surface the primary's error
+    on_loser(hedge, sent_at[hedge])
+    return primary.result(), True
+
+def _chat_completion(client, model, messages, stage=None, response_format=None, **kwargs):
+    """
+    Run one chat completion (plain or structured parse), hedged when enabled,
+    and record its stage, row, token usage and latency in src.llm_metrics.
+    """
+    if response_format is None:
+        send = partial(client.chat.completions.create, model=model, messages=messages, **kwargs)
+    else:
+        send = partial(
+            client.beta.chat.completions.parse,
             model=model,
             messages=messages,
             response_format=response_format,
+            **kwargs,
+        )
+    send = _limited(send)
+    calls = llm_calls()
+    ctx = contextvars.copy_context()   # row tag of the call, for losers recorded from the hedge pool
+
+    def record_loser(fut, sent_at):
+        error = fut.exception()
+        usage = None if error is not None else fut.result().usage
+        ctx.run(
+            record_call, calls, stage, model, usage, time.perf_counter() - sent_at,
+            error=None if error is None else type(error).__name__, hedge_loser=True,
+        )
+
+    start = time.perf_counter()
+    try:
+        response, hedged = _hedged_request(stage, model, send, record_loser)
+    except Exception as e:
+        record_call(calls, stage, model, None, time.perf_counter() - start, error=type(e).__name__)
+        raise
+    record_call(calls, stage, model, response.usage, time.perf_counter() - start, hedged=hedged)
+    return response
+
+def build_messages(system_prompt, user_prompts, examples=()):
+    """
+    Assemble the chat messages with the static part first, so every call of a
+    stage shares a byte-identical prefix that provider-side prompt caching can reuse:
+    1. system prompt
+    2. task instruction (user_prompts[0])
+    3. few-shot examples as real user / assistant turns
+    4. the variable content (user_prompts[1:])
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if user_prompts:
+        messages.append({"role": "user", "content": user_prompts[0]})
+    for example_user, example_assistant in examples:
+        messages.append({"role": "user", "content": example_user})
+        messages.append({"role": "assistant", "content": example_assistant})
+    messages += [{"role": "user", "content": up} for up in user_prompts[1:]]
+    return messages
+
+def call_llm(client, model, system_prompt, user_prompts, examples=(), stage=None):
+    messages = build_messages(system_prompt, user_prompts, examples)
+    return _chat_completion(client, model, messages, stage=stage).choices[0].message.content.strip()
+
+def call_llm_structured(client, model, system_prompt, user_prompts, response_format, examples=(), stage=None):
+    messages = build_messages(system_prompt, user_prompts, examples)
+    if model == MODEL_REASON:
+        # For reasoning models, we use a different endpoint
+        return _chat_completion(
+            client, model, messages,
+            stage=stage,
+            response_format=response_format,
             reasoning_effort='low',
         ).choices[0].message.parsed
         
     else:
-        return client.beta.chat.completions.parse(
-            model=model,
-            messages=messages,
+        return _chat_completion(
+            client, model, messages,
+            stage=stage,
             response_format=response_format,
         ).choices[0].message.parsed
 
 # --------------------------------------------------------------------- #
 # Logging helpers
 # --------------------------------------------------------------------- #
-def get_log_dir():
+TRACE_FNAME = "traces.jsonl.gz"
+
+
+class TraceWriter:
+    """
+    Queue-backed writer of one gzip-compressed JSONL file. Callers only
+    enqueue; a background thread serializes, compresses and appends, and
+    flushes whenever the queue has been idle for a second.
+    Re-opening an existing file appends a new gzip member (still one valid file).
+    """
+    _STOP = object()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._drain, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: dict) -> None:
+        self._queue.put(record)
+
+    def _drain(self) -> None:
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            while True:
+                try:
+                    record = self._queue.get(timeout=1.0)
+                except queue.Empty:
+                    f.flush()
+                    continue
+                if record is self._STOP:
+                    return
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self) -> None:
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+
+class RunContext:
+    """
+    Per-run logging state: log dir, run id, open append handles, timing
+    entries and the row trace writer, plus the run's named state (see
+    `state`). Carried through a ContextVar (see `run_context`), so runs in
+    the same process never write to each other's folders or state.
+    """
+    MAX_OPEN_FILES = 64
+    TIMINGS_FLUSH_S = 5.0   # buffered timing entries reach disk at most this late
+
+    def __init__(self, log_dir: str, run_id: str = None):
+        self.log_dir = log_dir
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self._handles = OrderedDict()   # fname -> open file, least recently used first
+        self._timings = {}              # json fname -> entries not written yet
+        self._timings_timer = None      # pending flush of self._timings
+        self._tracer = None             # TraceWriter, opened on the first trace
+        self._state = {}                # name -> per-run object, see state()
+        self._lock = threading.Lock()
+        os.makedirs(log_dir, exist_ok=True)
+
+    def state(self, name: str, factory: Callable[[], T]) -> T:
+        """Per-run object `name` (e.g. the week's stage cache), created with factory() on first use."""
+        with self._lock:
+            value = self._state.get(name)
+            if value is None:
+                value = self._state[name] = factory()
+            return value
+
+    def trace(self, record: dict) -> None:
+        """Append a structured record to <log_dir>/traces.jsonl.gz."""
+        tracer = self._tracer
+        if tracer is None:
+            with self._lock:
+                if self._tracer is None:
+                    self._tracer = TraceWriter(self.path(TRACE_FNAME))
+                tracer = self._tracer
+        tracer.write({"ts": round(time.time(), 3), "run_id": self.run_id, **record})
+
+    def path(self, fname: str) -> str:
+        return os.path.join(self.log_dir, fname)
+
+    def write(self, fname: str, content: str) -> None:
+        """Append a line to <log_dir>/<fname>, keeping the file open (line-buffered) for the next write."""
+        with self._lock:
+            f = self._handles.pop(fname, None)
+            if f is None:
+                f = open(self.path(fname), "a", encoding="utf-8", buffering=1)
+                if len(self._handles) >= self.MAX_OPEN_FILES:
+                    self._handles.popitem(last=False)[1].close()
+            self._handles[fname] = f
+            f.write(content + "\n")
+
+    def append_timing(self, json_fname: str, entry: dict) -> None:
+        """
+        Add an entry to the JSON list <log_dir>/<json_fname>. Entries are
+        buffered and written together at most TIMINGS_FLUSH_S later (and on close).
+        """
+        with self._lock:
+            self._timings.setdefault(json_fname, []).append(entry)
+            if self._timings_timer is None:
+                self._timings_timer = threading.Timer(self.TIMINGS_FLUSH_S, self._scheduled_flush)
+                self._timings_timer.daemon = True
+                self._timings_timer.start()
+
+    def _scheduled_flush(self) -> None:
+        with self._lock:
+            self._timings_timer = None
+            self._flush_timings()
+
+    def _flush_timings(self) -> None:
+        """Write the buffered timing entries, after any the file already holds."""
+        for json_fname, entries in self._timings.items():
+            out_path = self.path(json_fname)
+            previous = []
+            if os.path.exists(out_path):
+                with open(out_path, "r", encoding="utf-8") as f:
+                    previous = json.load(f)
+            with open(out_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(previous + entries, f, indent=2, ensure_ascii=False)
+            os.replace(out_path + ".tmp", out_path)
+        self._timings.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            for f in self._handles.values():
+                f.close()
+            self._handles.clear()
+            if self._timings_timer is not None:
+                self._timings_timer.cancel()
+                self._timings_timer = None
+            self._flush_timings()
+            if self._tracer is not None:
+                self._tracer.close()
+                self._tracer = None
+
+
+_run_context: contextvars.ContextVar = contextvars.ContextVar("run_context", default=None)
+_default_runs = {}   # log dir -> RunContext used outside any run_context()
+
+
+@atexit.register
+def _close_default_runs() -> None:
+    for ctx in _default_runs.values():
+        ctx.close()
+
+
+@contextlib.contextmanager
+def run_context(log_dir: str, run_id: str = None):
     """
-    Lazy-load the log directory from the LOG_DIR env var
-    (falling back to logs/default if unset), and ensure it exists.
+    Route every log helper called inside the block (and in tasks submitted
+    from it) to `log_dir`.
     """
+    ctx = RunContext(log_dir, run_id)
+    token = _run_context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _run_context.reset(token)
+        ctx.close()
+
+
+def current_run() -> RunContext:
+    """
+    The active RunContext; outside run_context() falls back to the LOG_DIR
+    env var (or logs/default).
+    """
+    ctx = _run_context.get()
+    if ctx is not None:
+        return ctx
     log_dir = os.environ.get("LOG_DIR", os.path.join("logs", "default"))
-    os.makedirs(log_dir, exist_ok=True)
-    return log_dir
+    with _runs_lock:
+        ctx = _default_runs.get(log_dir)
+        if ctx is None:
+            ctx = _default_runs[log_dir] = RunContext(log_dir)
+    return ctx
+
+
+def get_log_dir():
+    """
+    Log directory of the current run (created once, when the run starts).
+    """
+    return current_run().log_dir
+
+def llm_calls() -> CallLog:
+    """
+    LLM calls recorded in the current run (see src.llm_metrics).
+    """
+    return current_run().state("llm_calls", CallLog)
 
 def get_logger(fname: str) -> logging.Logger:
     """
-    Return a logger that writes to <LOG_DIR>/<fname>.
+    Return a logger that writes to <log_dir>/<fname>.
     """
     log_dir = get_log_dir()
     log_path = os.path.join(log_dir, fname)
@@ -122,21 +627,27 @@ def get_logger(fname: str) -> logging.Logger:
 
 def store_in_txt(fname:str, content: str):
     """
-    Store content in a text file at <LOG_DIR>/<fname>.
+    Store content in a text file at <log_dir>/<fname>.
     If the file already exists, append to it.
     """
-    log_dir = get_log_dir()
-    out_path = os.path.join(log_dir, fname)
-    with open(out_path, "a", encoding="utf-8") as f:
-        f.write(content + "\n")
-    # print(f"Stored content in {out_path}")
+    current_run().write(fname, content)
 
-def timeit(json_fname: str):
+def log_trace(row, **fields):
+    """
+    Record what happened to one row in the run's consolidated trace file
+    (read it back with `python -m src.trace_tool`).
     """
-    Measure runtime, append an entry to LOG_DIR/json_fname, and
+    current_run().trace({"row": row, **fields})
+
+def timeit(json_fname: str, label: str = None):
+    """
+    Measure runtime, append an entry to <log_dir>/json_fname, and
     print "row X ran in Y.s" if we detect a row-index arg.
+    `label` replaces the function name in the entry and the message.
     """
     def decorator(fn):
+        name = label or fn.__name__
+
         @functools.wraps(fn)
         def wrapper(*args, **kwargs):
             # --- detect row index if passed as first positional arg ---
@@ -162,464 +673,34 @@ def timeit(json_fname: str):
                     row_idx = f"{first[0]}_{first[1]}"
                     
             # --- build JSON entry ---
+            # tag every LLM call made inside fn with this row
+            token = current_row.set(row_idx) if row_idx is not None else None
             start = time.perf_counter()
-            result = fn(*args, **kwargs)
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                if token is not None:
+                    current_row.reset(token)
             elapsed = round(time.perf_counter() - start, 2)
 
             entry = {
                 "timestamp": datetime.datetime.now().isoformat(),
                 "elapsed_s": elapsed,
-                "function" : fn.__name__
+                "function" : name
             }
             if row_idx is not None:
                 entry["row"] = row_idx
                 
 
             # --- write to JSON file ---
-            out_path = os.path.join(get_log_dir(), json_fname)
-            with _timing_lock:
-                if os.path.exists(out_path):
-                    with open(out_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                else:
-                    data = []
-                data.append(entry)
-                with open(out_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+            current_run().append_timing(json_fname, entry)
 
             # --- print for notebook/CLI ---
             if row_idx is not None:
-                print(f"{fn.__name__!r} row {row_idx} ran in {elapsed}s")
+                print(f"{name!r} row {row_idx} ran in {elapsed}s")
             else:
-                print(f"{fn.__name__!r} ran in {elapsed}s")
+                print(f"{name!r} ran in {elapsed}s")
 
             return result
         return wrapper
     return decorator
-
-# --------------------------------------------------------------------- #
-# know_pieces
-# --------------------------------------------------------------------- #
-
-know_pieces = {
-    '' : {
-        'system': 'Sin especificar',
-        'subsystem': 'Sin especificar',
-        'component': 'Sin especificar',
-        'is_critical': False,
-        'detail': None
-    },
-    'Aceite hidraulico' : {
-        'system': 'Hidraulico',
-        'subsystem': 'Fluido',
-        'component': 'Aceite',
-        'is_critical': False,
-        'detail': 'Aceite hidraulico'
-    },
-    'Aceite de transmision' : {
-        'system': 'Tren de fuerza',
-        'subsystem': 'Transmision',
-        'component': 'Aceite',
-        'is_critical': False,
-        'detail': 'Aceite de transmision'
-    },
-    'Acumuladores de direccion' : {
-        'system': 'Direccion',
-        'subsystem': 'General',
-        'component': 'Acumuladores',
-        'is_critical': False,
-        'detail': 'Acumuladores de direccion'
-    },
-    'Aire acondicionado' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Aire acondicionado',
-        'is_critical': False,
-        'detail': None
-    },
-    'Alternador' : {
-        'system': 'Motor',
-        'subsystem': 'Electrico',
-        'component': 'Alternador',
-        'is_critical': False,
-        'detail': None
-    },
-    'Antenas' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Antena',
-        'is_critical': False,
-        'detail': None
-    },
-    'Arnes izquierdo de luz' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Arnes de luz',
-        'is_critical': False,
-        'detail': 'Arnes izquierdo de luz'
-    },
-    'Asientos' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Asiento',
-        'is_critical': False,
-        'detail': None
-    },
-    'Bateria' : {
-        'system': 'Equipo',
-        'subsystem': 'General',
-        'component': 'Bateria',
-        'is_critical': False,
-        'detail': None
-    },
-    'Cabina' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Cabina',
-        'is_critical': False,
-        'detail': None
-    },
-    'Cable' : {
-        'system': 'Equipo',
-        'subsystem': 'Electrico',
-        'component': 'Cable',
-        'is_critical': False,
-        'detail': None
-    },
-    'Conector' : {
-        'system': 'Equipo',
-        'subsystem': 'Electrico',
-        'component': 'Conector',
-        'is_critical': False,
-        'detail': None
-    },
-    'Direccion' : {
-        'system': 'Direccion',
-        'subsystem': 'Direccion',
-        'component': 'Direccion',
-        'is_critical': False,
-        'detail': None
-    },
-    'Ducto de enfriamiento de transmision' : {
-        'system': 'Tren de fuerza',
-        'subsystem': 'Transmision',
-        'component': 'Ducto de enfriamiento',
-        'is_critical': False,
-        'detail': 'Ducto de enfriamiento de transmision'
-    },
-    'Equipo' : {
-        'system': 'Equipo',
-        'subsystem': 'General',
-        'component': 'Equipo',
-        'is_critical': False,
-        'detail': None
-    },
-    'Espejos':{
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Espejos',
-        'is_critical': False,
-        'detail': None
-    },
-    'Filtros' : {
-        'system': 'Hidraulico',
-        'subsystem': 'General',
-        'component': 'Filtro',
-        'is_critical': False,
-        'detail': None
-    },
-    'Filtros de aire' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Filtro',
-        'is_critical': False,
-        'detail': 'Filtro de aire'
-    },
-    'Filtros de cabina' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Filtro',
-        'is_critical': False,
-        'detail': 'Filtro de cabina'
-    },
-    'Filtros de diferencial' : {
-        'system': 'Tren de fuerza',
-        'subsystem': 'Diferencial',
-        'component': 'Filtro',
-        'is_critical': False,
-        'detail': 'Filtro de diferencial'
-    },
-    'Filtros de motor' : {
-        'system': 'Motor',
-        'subsystem': 'Lubricacion',
-        'component': 'Filtro',
-        'is_critical': False,
-        'detail': 'Filtro de motor'
-    },
-    'Flexibles' : {
-        'system': 'Equipo',
-        'subsystem': 'General',
-        'component': 'Flexible',
-        'is_critical': False,
-        'detail': None
-    },
-    'Foco inferior derecho' : {
-        'system': 'Equipo',
-        'subsystem': 'Electrico',
-        'component': 'Foco',
-        'is_critical': False,
-        'detail': 'Foco inferior derecho'
-    },
-    'Frenos' : {
-        'system': 'Frenado',
-        'subsystem': 'Frenos',
-        'component': 'Freno',
-        'is_critical': True,
-        'detail': None
-    },
-    'Lineas de refrigeracion de turbos' : {
-        'system': 'Motor',
-        'subsystem': 'Aire',
-        'component': 'Refrigeracion de turbo',
-        'is_critical': False,
-        'detail': 'Linea de refrigeracion de turbos',
-    },
-    'Llantas' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': None
-    },
-    'Llantas posicion 1' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 1',
-    },
-    'Llantas posicion 2' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 2',
-    },
-    'Llantas posicion 3' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 3',
-    },
-    'Llantas posicion 4' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 4',
-    },
-    'Llantas posicion 5' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 5',
-    },
-    'Llantas posicion 6' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 6',
-    },
-    'Llantas posicion 7' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 7',
-    },
-    'Llantas posicion 8' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Llanta',
-        'is_critical': False,
-        'detail': 'Posicion 8',
-    },
-    'Mandos finales' : {
-        'system': 'Tren de fuerza',
-        'subsystem': 'Diferencial',
-        'component': 'Mando final',
-        'is_critical': True,
-        'detail': None
-    },
-    'Mangueras' : {
-        'system': 'Hidraulico',
-        'subsystem': 'General',
-        'component': 'Manguera',
-        'is_critical': False,
-        'detail': None
-    },
-    'Mangueras de acumuladores de direccion' : {
-        'system': 'Direccion',
-        'subsystem': 'General',
-        'component': 'Mangueras de acumuladores',
-        'is_critical': False,
-        'detail': 'Mangueras de acumuladores de direccion'
-    },
-    'Manguera de enfriamiento de freno' : {
-        'system': 'Frenado',
-        'subsystem': 'General',
-        'component': 'Manguera de enfriamiento',
-        'is_critical': False,
-        'detail': 'Manguera de enfriamiento de freno'
-    },
-    'Manguera de refrigeracion del turbo' : {
-        'system': 'Motor',
-        'subsystem': 'Refrigeracion',
-        'component': 'Manguera de refrigeracion',
-        'is_critical': False,
-        'detail': 'Manguera de refrigeracion del turbo'
-    },
-    'Manifolds de inyectores' : {
-        'system': 'Motor',
-        'subsystem': 'Combustible',
-        'component': 'Manifold de inyectores',
-        'is_critical': False,
-        'detail': None
-    },
-    'Masas' : {
-        'system': 'Tren de fuerza',
-        'subsystem': 'Diferencial',
-        'component': 'Masas',
-        'is_critical': False,
-        'detail': None
-    },
-    'Motor' : {
-        'system': 'Motor',
-        'subsystem': 'Motor',
-        'component': 'Motor',
-        'is_critical': True,
-        'detail': None
-    },
-    'Neumaticos' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': None
-    },
-    'Neumatico posicion 1' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 1',
-    },
-    'Neumatico posicion 2' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 2',
-    },
-    'Neumatico posicion 3' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 3',
-    },
-    'Neumatico posicion 4' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 4',
-    },
-    'Neumatico posicion 5' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 5',
-    },
-    'Neumatico posicion 6' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 6',
-    },
-    'Neumatico posicion 7' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 7',
-    },
-    'Neumatico posicion 8' : {
-        'system': 'Equipo',
-        'subsystem': 'Neumaticos',
-        'component': 'Neumatico',
-        'is_critical': True,
-        'detail': 'Posicion 8',
-    },
-    'Radio' : {
-        'system': 'Equipo',
-        'subsystem': 'Cabina',
-        'component': 'Radio',
-        'is_critical': False,
-        'detail': None
-    },
-    'Rejillas magneticas de la transmision' : {
-        'system': 'Tren de fuerza',
-        'subsystem': 'Transmision',
-        'component': 'Rejilla magnetica',
-        'is_critical': False,
-        'detail': 'Rejillas magneticas de la transmision'
-    },
-    'Sistemas digitales' : {
-        'system': 'Equipo',
-        'subsystem': 'Electrico',
-        'component': 'Sistema digital',
-        'is_critical': False,
-        'detail': None
-    },
-    'Suspensiones delanteras' : {
-        'system': 'Equipo',
-        'subsystem': 'Suspensiones',
-        'component': 'Suspension',
-        'is_critical': True,
-        'detail': 'Suspension delantera',
-    },
-    'Tapon de masas diferenciales' : {
-        'system': 'Tren de fuerza',
-        'subsystem': 'Diferencial',
-        'component': 'Tapon de masas',
-        'is_critical': False,
-        'detail': 'Tapon de masas diferenciales'
-    },
-    'Tanque de combustible' : {
-        'system': 'Motor',
-        'subsystem': 'Combustible',
-        'component': 'Tanque',
-        'is_critical': True,
-        'detail': 'Tanque de combustible'
-    },
-    'Tercera viga tolva' : {
-            'system': 'Equipo',
-            'subsystem': 'Tolva',
-            'component': 'Viga',
-            'is_critical': False,
-            'detail': 'Tercera viga de tolva'
-        },
-    'Vigas soporte' : {
-        'system': 'Equipo',
-        'subsystem': 'General',
-        'component': 'Viga',
-        'is_critical': False,
-        'detail': 'Vigas soporte',
-    },
-}
@@ -0,0 +1,148 @@
+"""
+Backlog worker: claims weeks from the shared manifest and labels each one
+in its own process.
+
+Every claimed week gets a fresh spawned process whose stdout/stderr go to
+logs/<year>/week_<week>/worker.log, so a crashing or hung week never takes
+the worker (or another week) down with it.
+The parent renews the week's lease while the child runs; when a worker
+dies, its lease expires and another worker picks the week up again.
+
+    python -m src.worker --slots 2              # this machine, two weeks at a time
+    python -m src.worker --db /shared/manifest.sqlite --shared --poll 60
+
+Scale out by starting more workers against the same manifest file. Workers
+on one machine can use the default WAL journal. Workers on several machines
+need the data dir on a filesystem with working POSIX locks, and every one of
+them must run with --shared (MANIFEST_SHARED=1): WAL does not work over
+network filesystems, so the manifest, the record store and the reliability
+buckets then use the rollback journal (see src.sqlite_db). Many NFS/SMB setups do not lock reliably; when
+in doubt, keep all workers on one host.
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+from typing import Dict, Tuple
+
+import src.manifest as manifest
+import src.sqlite_db as sqlite_db
+
+LEASE_SECONDS = 300.0
+HEARTBEAT_SECONDS = 30.0
+
+
+def _run_week(db_path: str, year: str, week: str, worker: str, lease_s: float, labeler_kwargs: dict) -> None:
+    """Child process entry point: label one week claimed by `worker`."""
+    from src.orchestrator import setup_log_dir
+
+    log_dir = setup_log_dir(year, week)
+    os.makedirs(log_dir, exist_ok=True)
+    log = open(os.path.join(log_dir, "worker.log"), "a", encoding="utf-8", buffering=1)
+    sys.stdout = sys.stderr = log
+
+    conn = manifest.connect(db_path)
+    ok = manifest.run_claimed(conn, year, week, worker=worker, lease_s=lease_s, **labeler_kwargs)
+    conn.close()
+    log.close()
+    sys.exit(0 if ok else 1)
+
+
+def run_worker(
+    db_path: str = manifest.MANIFEST_PATH,
+    slots: int = 1,
+    poll_s: float = None,
+    sync: bool = True,
+    lease_s: float = LEASE_SECONDS,
+    heartbeat_s: float = HEARTBEAT_SECONDS,
+    **labeler_kwargs,
+) -> int:
+    """
+    Claim and label weeks, `slots` at a time, until the backlog is empty
+    (or forever, re-checking every `poll_s` seconds). Returns weeks finished.
+    """
+    ctx = mp.get_context("spawn")
+    conn = manifest.connect(db_path)
+    worker = manifest.worker_name()
+    if sync:
+        print(f"Manifest synced: {manifest.sync_inputs(conn)}")
+
+    running: Dict[Tuple[str, str], mp.Process] = {}
+    finished = 0
+    while True:
+        # fill free slots
+        while len(running) < slots:
+            claimed = manifest.claim(conn, worker, lease_s=lease_s)
+            if claimed is None:
+                break
+            year, week = claimed
+            proc = ctx.Process(target=_run_week, args=(db_path, year, week, worker, lease_s, labeler_kwargs), daemon=False)
+            proc.start()
+            running[claimed] = proc
+            print(f"{worker} claimed {year}-{week} (pid {proc.pid}) ⏳")
+
+        if not running:
+            if poll_s is None:
+                break
+            time.sleep(poll_s)
+            if sync:
+                manifest.sync_inputs(conn)
+            continue
+
+        # wait a heartbeat, then renew leases and reap finished weeks
+        deadline = time.monotonic() + heartbeat_s
+        while time.monotonic() < deadline and all(p.is_alive() for p in running.values()):
+            time.sleep(min(1.0, heartbeat_s))
+        for (year, week), proc in list(running.items()):
+            if proc.is_alive():
+                if manifest.heartbeat(conn, year, week, worker, lease_s):
+                    continue
+                status = manifest.week_status(conn, year, week)
+                if not (status and status["claimed_by"] == worker and status["status"] != "running"):
+                    print(f"Lease lost on {year}-{week}, stopping it ❌")
+                    proc.terminate()
+                    proc.join()
+                    del running[(year, week)]
+                    continue
+                # the child already recorded its outcome and is exiting
+                proc.join(timeout=heartbeat_s)
+                if proc.is_alive():
+                    proc.terminate()
+            proc.join()
+            del running[(year, week)]
+            status = manifest.week_status(conn, year, week)
+            if proc.exitcode != 0 and status and status["status"] == "running":
+                # the child died before recording an outcome
+                manifest.mark_failed(conn, year, week, f"worker process exited with code {proc.exitcode}", worker)
+            done = proc.exitcode == 0 or bool(status and status["status"] == "done" and status["claimed_by"] == worker)
+            finished += done
+            print(f"{year}-{week} {'done ✅' if done else 'failed ❌'}")
+    conn.close()
+    return finished
+
+
+def _cli():
+    p = argparse.ArgumentParser(description="Label pending weeks from the shared manifest")
+    p.add_argument("--db", default=manifest.MANIFEST_PATH, help="manifest SQLite file")
+    p.add_argument("--slots", type=int, default=1, help="weeks running at once on this worker")
+    p.add_argument("--poll", type=float, default=None, help="keep polling every N seconds instead of exiting")
+    p.add_argument("--no-sync", action="store_true", help="do not scan data/to_process for new weeks")
+    p.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    p.add_argument("--heartbeat", type=float, default=HEARTBEAT_SECONDS)
+    p.add_argument("--fast", action="store_true", help="single-call simple records with full-chain fallback")
+    p.add_argument("--shared", action="store_true", help="data dir on a network filesystem: rollback journal instead of WAL")
+    args = p.parse_args()
+    if args.shared:
+        # read by every sqlite_db.connect, here and in the spawned week processes
+        os.environ[sqlite_db.SHARED_ENV] = "1"
+
+    finished = run_worker(
+        args.db, slots=args.slots, poll_s=args.poll, sync=not args.no_sync,
+        lease_s=args.lease, heartbeat_s=args.heartbeat, fast_mode=args.fast,
+    )
+    print(f"Weeks labeled: {finished} ✅")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import src.reliability as reliability
+
+
+def _record(start, end, detention_type="Falla funcional", unit="T_14"):
+    return {
+        "unit_id": unit,
+        "start_time": start,
+        "end_time": end,
+        "detention_type": detention_type,
+        "jobs": [{"system": "Motor", "component": "Alternador", "critical_change": True}],
+    }
+
+
+class NaTHoursTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = reliability.connect(os.path.join(self.tmp.name, "reliability.sqlite"))
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_detentions_with_nat_hours_are_left_out(self):
+        records = [
+            _record("2020-02-03 08:00:00", "2020-02-03 10:00:00"),
+            _record("2020-02-04 08:00:00", "NaT"),   # open-ended
+            _record("NaT", "2020-02-05 10:00:00"),
+            _record("2020-02-06 08:00:00", "2020-02-06 09:30:00"),
+        ]
+        reliability.update_week(self.conn, "2020", "05", records)
+
+        unit = reliability.totals(self.conn, "units")["T_14"]
+        self.assertEqual(unit["detentions"], 2)
+        self.assertEqual(unit["failures"], 2)
+        self.assertEqual(unit["downtime_h"], 3.5)
+        self.assertEqual(unit["first_failure"], "2020-02-03 08:00:00")
+        self.assertEqual(unit["last_failure"], "2020-02-06 08:00:00")
+        self.assertEqual(reliability.metrics(unit), {"mtbf_h": 72.0, "mttr_h": 1.75})
+
+    def test_week_of_only_nat_hours_writes_no_buckets(self):
+        self.assertEqual(reliability.update_week(self.conn, "2020", "05", [_record("2020-02-04 08:00:00", "NaT")]), 0)
+        self.assertEqual(reliability.labeled_weeks(self.conn), [])
+
+
+if __name__ == "__main__":
+    unittest.main()